@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from flask import current_app
+
+
+def normalize_feedback_text(text):
+    """
+    规范化反馈文本：统一全角/半角、大小写，去掉空白和标点，使近似重复的反馈得到相同的键
+    """
+    text = unicodedata.normalize('NFKC', text).lower()
+    return ''.join(
+        ch for ch in text
+        if not ch.isspace() and not unicodedata.category(ch).startswith('P')
+    )
+
+
+class AnalysisCache:
+    """
+    反馈分析结果缓存：进程内LRU加SQLite持久化，按规范化后的反馈文本和提示词/模型版本做键
+
+    内存层容量为ANALYSIS_CACHE_MEMORY_SIZE，持久层最多保留ANALYSIS_CACHE_MAX_ENTRIES条，
+    超过ANALYSIS_CACHE_TTL秒的结果视为过期。多个进程可以共享同一个SQLite文件。
+
+    内存层和SQLite分别加锁，读写SQLite时不阻塞内存层的查询；持久层命中时更新的最近访问时间
+    先记在内存中，每ANALYSIS_CACHE_TOUCH_BATCH条或下次写入时批量写回。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()  # 保护内存层和统计
+        self._db_lock = threading.Lock()  # 保护SQLite连接和待写回的访问时间
+        self._memory = OrderedDict()  # key -> (result, create_time)
+        self._conn = None
+        self._puts_since_prune = 0
+        self._pending_touches = {}  # key -> 尚未写回的最近访问时间
+        self._stats = {
+            'memoryHits': 0,
+            'diskHits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0
+        }
+        # 未命中时实际调用大模型的累计耗时和token数（按反馈条数平摊），用于估算命中节省的开销
+        self._llm_seconds = 0.0
+        self._llm_tokens = 0
+        self._llm_calls = 0
+
+    def make_key(self, feedback_text, version):
+        normalized = normalize_feedback_text(feedback_text)
+        return hashlib.sha256(f'{version}\x00{normalized}'.encode('utf-8')).hexdigest()
+
+    def get(self, feedback_text, version):
+        """
+        查询缓存，未命中或已过期时返回None
+        """
+        if not current_app.config.get('ANALYSIS_CACHE_ENABLED', True):
+            return None
+
+        key = self.make_key(feedback_text, version)
+        now = time.time()
+        ttl = current_app.config.get('ANALYSIS_CACHE_TTL', 30 * 24 * 3600)
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                result, create_time = entry
+                if now - create_time < ttl:
+                    self._memory.move_to_end(key)
+                    self._stats['memoryHits'] += 1
+                    return dict(result)
+                del self._memory[key]
+
+        with self._db_lock:
+            conn = self._connection()
+            row = conn.execute(
+                'SELECT result, create_time FROM analysis_cache WHERE cache_key = ?', (key,)
+            ).fetchone()
+            if row is not None and now - row[1] < ttl:
+                self._pending_touches[key] = now
+                if len(self._pending_touches) >= current_app.config.get('ANALYSIS_CACHE_TOUCH_BATCH', 100):
+                    self._flush_touches(conn)
+                    conn.commit()
+            elif row is not None:
+                conn.execute('DELETE FROM analysis_cache WHERE cache_key = ?', (key,))
+                conn.commit()
+                row = None
+
+        with self._lock:
+            if row is None:
+                self._stats['misses'] += 1
+                return None
+            result = json.loads(row[0])
+            self._remember(key, result, row[1])
+            self._stats['diskHits'] += 1
+            return dict(result)
+
+    def put(self, feedback_text, version, result):
+        """
+        保存一条分析结果
+        """
+        if not current_app.config.get('ANALYSIS_CACHE_ENABLED', True):
+            return
+
+        key = self.make_key(feedback_text, version)
+        now = time.time()
+        with self._lock:
+            self._remember(key, result, now)
+            self._stats['stores'] += 1
+
+        with self._db_lock:
+            conn = self._connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO analysis_cache (cache_key, result, create_time, access_time) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(result, ensure_ascii=False), now, now)
+            )
+            # 待写回的访问时间与新条目在同一个事务中提交
+            self._flush_touches(conn)
+            conn.commit()
+
+            # 定期按最近访问时间淘汰超出容量的持久化条目
+            self._puts_since_prune += 1
+            if self._puts_since_prune >= 1000:
+                self._puts_since_prune = 0
+                self._prune(conn)
+
+    def record_llm_call(self, seconds, tokens=0, items=1):
+        """
+        记录一次未命中缓存时的大模型调用开销，批量调用时items为本次分析的反馈条数
+        """
+        with self._lock:
+            self._llm_seconds += seconds
+            self._llm_tokens += tokens
+            self._llm_calls += items
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            hits = stats['memoryHits'] + stats['diskHits']
+            lookups = hits + stats['misses']
+            avg_seconds = self._llm_seconds / self._llm_calls if self._llm_calls else 0.0
+            avg_tokens = self._llm_tokens / self._llm_calls if self._llm_calls else 0.0
+            stats.update({
+                'hits': hits,
+                'hitRate': round(hits / lookups, 4) if lookups else 0.0,
+                'memoryEntries': len(self._memory),
+                'avgLlmSeconds': round(avg_seconds, 3),
+                'estimatedSavedSeconds': round(hits * avg_seconds, 1),
+                'estimatedSavedTokens': int(hits * avg_tokens)
+            })
+            return stats
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        with self._db_lock:
+            self._pending_touches.clear()
+            conn = self._connection()
+            conn.execute('DELETE FROM analysis_cache')
+            conn.commit()
+
+    def _remember(self, key, result, create_time):
+        self._memory[key] = (result, create_time)
+        self._memory.move_to_end(key)
+        while len(self._memory) > current_app.config.get('ANALYSIS_CACHE_MEMORY_SIZE', 10000):
+            self._memory.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _flush_touches(self, conn):
+        # 批量写回持久层命中的最近访问时间，由调用方提交
+        if self._pending_touches:
+            conn.executemany(
+                'UPDATE analysis_cache SET access_time = ? WHERE cache_key = ?',
+                [(access_time, key) for key, access_time in self._pending_touches.items()]
+            )
+            self._pending_touches.clear()
+
+    def _prune(self, conn):
+        max_entries = current_app.config.get('ANALYSIS_CACHE_MAX_ENTRIES', 200000)
+        ttl = current_app.config.get('ANALYSIS_CACHE_TTL', 30 * 24 * 3600)
+        conn.execute('DELETE FROM analysis_cache WHERE create_time < ?', (time.time() - ttl,))
+        conn.execute(
+            'DELETE FROM analysis_cache WHERE cache_key IN ('
+            'SELECT cache_key FROM analysis_cache ORDER BY access_time DESC LIMIT -1 OFFSET ?)',
+            (max_entries,)
+        )
+        conn.commit()
+
+    def _connection(self):
+        if self._conn is None:
+            path = current_app.config.get('ANALYSIS_CACHE_PATH')
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS analysis_cache ('
+                'cache_key TEXT PRIMARY KEY, result TEXT NOT NULL, '
+                'create_time REAL NOT NULL, access_time REAL NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_analysis_cache_access ON analysis_cache(access_time)')
+            self._conn.commit()
+        return self._conn
+
+
+# 创建全局的分析结果缓存
+analysis_cache = AnalysisCache()
@@ -0,0 +1,253 @@
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from sqlalchemy import and_, delete, func, insert, or_, select
+from database import db, increment_counts, Feedback, Problem, FeedbackStat, ProblemStat
+
+# 报表中的问题类型和严重程度顺序
+TYPE_LABELS = ['技术问题', '服务态度', '价格异议', '功能建议', '其他']
+SEVERITY_LABELS = ['高', '中', '低']
+
+# 汇总的时间桶粒度
+PERIODS = ('day', 'week', 'month')
+
+# 未指定日期范围时，报表统计最近的天数
+DEFAULT_REPORT_DAYS = 30
+
+# 未指定趋势粒度时，范围超过这些天数分别按周、按月展示趋势
+WEEKLY_TREND_DAYS = 92
+MONTHLY_TREND_DAYS = 731
+
+
+def bucket_start(day, period):
+    """
+    返回day所在时间桶的第一天：按天为当天，按周为周一，按月为每月1日
+    """
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def bucket_end(start, period):
+    """
+    返回以start开始的时间桶的最后一天
+    """
+    if period == 'week':
+        return start + timedelta(days=6)
+    if period == 'month':
+        next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return next_month - timedelta(days=1)
+    return start
+
+
+def decompose_range(start_date, end_date):
+    """
+    把日期范围拆分为尽量少的完整时间桶：范围内完整的月用月桶，其余完整的周用周桶，剩下的用天桶。
+    一年的范围最多约四十个桶，报表读取的汇总行数与范围内的反馈量无关。
+
+    返回:
+        [(period, bucket_date), ...]
+    """
+    buckets = []
+    day = start_date
+    while day <= end_date:
+        for period in ('month', 'week', 'day'):
+            if bucket_start(day, period) == day and bucket_end(day, period) <= end_date:
+                buckets.append((period, day))
+                day = bucket_end(day, period) + timedelta(days=1)
+                break
+    return buckets
+
+
+class AnalyticsEngine:
+    """
+    反馈统计引擎：导入反馈时在同一事务中增量累加按天、周、月汇总的统计行，
+    报表把任意日期范围拆成完整的月/周/天桶后读取汇总行，不再扫描原始反馈表
+    """
+
+    def backfill(self):
+        """
+        汇总表为空而已有反馈时（升级前导入的数据），根据原始反馈生成一次汇总行，由init-db调用
+
+        返回:
+            原始反馈按天和问题分组后的组数，不需要回填时返回0
+        """
+        if FeedbackStat.query.first() is None and Feedback.query.first() is not None:
+            return self.rebuild()
+        return 0
+
+    def record(self, entries):
+        """
+        累加一批反馈的统计（不提交事务，由调用方与反馈写入一起提交）
+
+        参数:
+            entries: [(反馈日期, problem_id, 问题类型, 严重程度), ...]
+        """
+        if not entries:
+            return
+        feedback_counts = Counter()
+        problem_counts = Counter()
+        for day, problem_id, problem_type, severity in entries:
+            feedback_counts[(day, problem_type, severity)] += 1
+            problem_counts[(day, problem_id)] += 1
+        self._write(feedback_counts, problem_counts, increment_counts)
+
+    def report(self, start_date=None, end_date=None, top_n=10, granularity=None):
+        """
+        计算日期范围内的问题类型分布、反馈量趋势、严重程度分布和高频问题
+
+        参数:
+            start_date, end_date: 起止日期（包含），默认为截至今天的最近DEFAULT_REPORT_DAYS天
+            top_n: 高频问题条数
+            granularity: 趋势的粒度day/week/month，默认按范围长度自动选择
+
+        返回:
+            报表字典，格式与 /api/analysis/report 一致
+        """
+        if end_date is None:
+            end_date = date.today()
+        if start_date is None:
+            start_date = end_date - timedelta(days=DEFAULT_REPORT_DAYS - 1)
+        if start_date > end_date:
+            start_date, end_date = end_date, start_date
+        if granularity not in PERIODS:
+            days = (end_date - start_date).days + 1
+            granularity = 'month' if days > MONTHLY_TREND_DAYS else 'week' if days > WEEKLY_TREND_DAYS else 'day'
+
+        # 趋势的每个点各自拆分为完整的时间桶，分布和高频问题使用整个范围的拆分结果
+        trend_points = []
+        day = start_date
+        while day <= end_date:
+            point_end = min(bucket_end(bucket_start(day, granularity), granularity), end_date)
+            trend_points.append((day, decompose_range(day, point_end)))
+            day = point_end + timedelta(days=1)
+        buckets = [bucket for _, point_buckets in trend_points for bucket in point_buckets]
+
+        bucket_counts = defaultdict(int)
+        type_counts = Counter()
+        severity_counts = Counter()
+        rows = db.session.execute(
+            select(FeedbackStat.period, FeedbackStat.bucket_date, FeedbackStat.problem_type,
+                   FeedbackStat.severity, FeedbackStat.feedback_count)
+            .where(self._in_buckets(FeedbackStat, buckets))
+        )
+        for period, bucket_date, problem_type, severity, count in rows:
+            bucket_counts[(period, bucket_date)] += count
+            type_counts[problem_type] += count
+            severity_counts[severity] += count
+
+        problem_total = func.sum(ProblemStat.feedback_count).label('total')
+        top_rows = db.session.execute(
+            select(Problem.summary, Problem.type, Problem.severity, problem_total)
+            .join(Problem, Problem.id == ProblemStat.problem_id)
+            .where(self._in_buckets(ProblemStat, buckets))
+            .group_by(ProblemStat.problem_id, Problem.summary, Problem.type, Problem.severity)
+            .order_by(problem_total.desc(), ProblemStat.problem_id)
+            .limit(top_n)
+        ).all()
+
+        return {
+            'startDate': start_date.strftime('%Y-%m-%d'),
+            'endDate': end_date.strftime('%Y-%m-%d'),
+            'typeDistribution': self._distribution(type_counts, TYPE_LABELS),
+            'severityDistribution': self._distribution(severity_counts, SEVERITY_LABELS),
+            'timeTrend': {
+                'granularity': granularity,
+                'dates': [point_start.strftime('%Y-%m-%d') for point_start, _ in trend_points],
+                'counts': [
+                    sum(bucket_counts[bucket] for bucket in point_buckets)
+                    for _, point_buckets in trend_points
+                ]
+            },
+            'highFrequencyProblems': [
+                {
+                    'rank': rank,
+                    'summary': summary,
+                    'count': int(total),
+                    'type': problem_type,
+                    'severity': severity
+                }
+                for rank, (summary, problem_type, severity, total) in enumerate(top_rows, 1)
+            ]
+        }
+
+    def rebuild(self):
+        """
+        根据原始反馈重新生成全部汇总行（回填），用于首次部署或修复统计数据
+
+        返回:
+            原始反馈按天和问题分组后的组数
+        """
+        feedback_day = func.date(Feedback.create_time)
+        rows = db.session.execute(
+            select(feedback_day, Feedback.problem_id, Problem.type, Problem.severity, func.count())
+            .join(Problem, Problem.id == Feedback.problem_id)
+            .group_by(feedback_day, Feedback.problem_id, Problem.type, Problem.severity)
+        ).all()
+
+        db.session.execute(delete(FeedbackStat))
+        db.session.execute(delete(ProblemStat))
+        feedback_counts = Counter()
+        problem_counts = Counter()
+        for day, problem_id, problem_type, severity, count in rows:
+            day = date.fromisoformat(day) if isinstance(day, str) else day
+            feedback_counts[(day, problem_type, severity)] += count
+            problem_counts[(day, problem_id)] += count
+        self._write(feedback_counts, problem_counts, self._insert)
+        db.session.commit()
+        return len(rows)
+
+    def _write(self, feedback_counts, problem_counts, write):
+        # 每条按天的计数同时累加到所在的周桶和月桶
+        feedback_rows = Counter()
+        problem_rows = Counter()
+        for period in PERIODS:
+            for (day, problem_type, severity), count in feedback_counts.items():
+                feedback_rows[(period, bucket_start(day, period), problem_type, severity)] += count
+            for (day, problem_id), count in problem_counts.items():
+                problem_rows[(period, bucket_start(day, period), problem_id)] += count
+
+        write(
+            FeedbackStat,
+            [
+                {'period': period, 'bucket_date': bucket_date, 'problem_type': problem_type,
+                 'severity': severity, 'feedback_count': count}
+                for (period, bucket_date, problem_type, severity), count in feedback_rows.items()
+            ],
+            ('period', 'bucket_date', 'problem_type', 'severity')
+        )
+        write(
+            ProblemStat,
+            [
+                {'period': period, 'bucket_date': bucket_date, 'problem_id': problem_id, 'feedback_count': count}
+                for (period, bucket_date, problem_id), count in problem_rows.items()
+            ],
+            ('period', 'bucket_date', 'problem_id')
+        )
+
+    def _in_buckets(self, model, buckets):
+        by_period = defaultdict(list)
+        for period, bucket_date in buckets:
+            by_period[period].append(bucket_date)
+        return or_(*(
+            and_(model.period == period, model.bucket_date.in_(bucket_dates))
+            for period, bucket_dates in by_period.items()
+        ))
+
+    def _insert(self, model, rows, key_columns):
+        if rows:
+            db.session.execute(insert(model), rows)
+
+    def _distribution(self, counts, labels):
+        # 固定顺序的标签在前，其余出现过的标签按数量排在后面
+        extra = sorted((label for label in counts if label not in labels), key=lambda label: -counts[label])
+        ordered = labels + extra
+        return {
+            'labels': ordered,
+            'values': [int(counts.get(label, 0)) for label in ordered]
+        }
+
+
+# 创建全局的统计引擎
+analytics = AnalyticsEngine()
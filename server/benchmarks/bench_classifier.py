@@ -0,0 +1,63 @@
+"""
+快速分类器测试：统计一组反馈中置信度达到阈值、可以跳过大模型的比例，以及每条的分类耗时
+
+用法（在server目录下执行）:
+    python benchmarks/bench_classifier.py --lines 20000 --threshold 0.6 0.8 0.9
+    python benchmarks/bench_classifier.py --file feedbacks.txt
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 生成测试反馈用的片段：明确的问题描述、含糊的表达和混合多种问题的描述
+CLEAR_PHRASES = ['app闪退', '无法登录', '验证码收不到', '客服态度差', '没人回复', '太贵了', '乱收费',
+                 '希望增加夜间模式', '建议添加导出功能', '页面白屏']
+VAGUE_PHRASES = ['用着一般', '还行吧', '有点问题', '说不清楚', '体验不太好', '今天又试了一次']
+
+
+def random_feedback(rng):
+    parts = rng.sample(CLEAR_PHRASES, rng.choice([0, 1, 1, 2])) + rng.sample(VAGUE_PHRASES, rng.choice([0, 1, 2]))
+    rng.shuffle(parts)
+    return '，'.join(parts) or rng.choice(VAGUE_PHRASES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='快速分类器测试')
+    parser.add_argument('--lines', type=int, default=20000, help='生成的反馈条数')
+    parser.add_argument('--file', help='使用文本文件中的反馈（每行一条）代替生成的反馈')
+    parser.add_argument('--threshold', type=float, nargs='+', default=[0.6, 0.8, 0.9], help='要比较的置信度阈值')
+    args = parser.parse_args()
+
+    # 导入app时会初始化数据库，使用临时SQLite数据库
+    os.environ['DATABASE_URI'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench_classifier.db")}'
+    os.environ['DB_AUTO_INIT'] = 'true'
+    from app import create_app
+    app = create_app()
+    from feedback_classifier import feedback_classifier
+
+    if args.file:
+        with open(args.file, encoding='utf-8') as f:
+            feedbacks = [line.strip() for line in f if line.strip()]
+    else:
+        rng = random.Random(42)
+        feedbacks = [random_feedback(rng) for _ in range(args.lines)]
+
+    feedback_classifier.classify('预热')
+    start = time.perf_counter()
+    confidences = [feedback_classifier.classify(text)[1] for text in feedbacks]
+    elapsed = time.perf_counter() - start
+    print(f'{len(feedbacks)} 条反馈, 平均每条 {elapsed / len(feedbacks) * 1e6:.1f}us')
+
+    print(f'{"阈值":>6} {"快速路径":>10} {"交给大模型":>10}')
+    for threshold in args.threshold:
+        fast = sum(1 for confidence in confidences if confidence >= threshold)
+        print(f'{threshold:>6.2f} {fast / len(feedbacks):>10.1%} {(len(feedbacks) - fast) / len(feedbacks):>10.1%}')
+
+
+if __name__ == '__main__':
+    main()
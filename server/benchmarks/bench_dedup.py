@@ -0,0 +1,97 @@
+"""
+近似重复反馈检测测试：导入含有大量标点、空格、全角/半角差异副本的反馈，
+比较开启和关闭去重时的模拟接口请求数和耗时，并测量单条反馈计算指纹和查询索引的开销
+
+用法（在server目录下执行）:
+    python benchmarks/bench_dedup.py --unique 50 --copies 10 --latency 0.2 --concurrency 8
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mock_llm_server import MockLLMHandler, start_mock_llm_server
+
+TOPICS = ['登录', '支付', '闪退', '物流', '客服', '发票', '退款', '注册', '搜索', '推送']
+
+
+def make_variant(text, rng):
+    """
+    生成一条反馈的副本：随机添加标点、空格，或替换为全角字符
+    """
+    choice = rng.randrange(4)
+    if choice == 0:
+        return text + rng.choice(['！！', '。', '...', '??'])
+    if choice == 1:
+        return ' '.join(text)
+    if choice == 2:
+        return text.replace('，', ', ').upper()
+    return ''.join(chr(ord(ch) + 0xFEE0) if '!' <= ch <= '~' else ch for ch in text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='近似重复反馈检测测试')
+    parser.add_argument('--unique', type=int, default=50, help='不同反馈的条数')
+    parser.add_argument('--copies', type=int, default=10, help='每条反馈的副本数（含原文）')
+    parser.add_argument('--latency', type=float, default=0.2, help='模拟接口的单次响应延迟（秒）')
+    parser.add_argument('--concurrency', type=int, default=8, help='LLM分析并发数')
+    args = parser.parse_args()
+
+    server, api_url = start_mock_llm_server(args.latency)
+
+    # 必须在导入app之前设置，保证应用连接到模拟接口和临时SQLite数据库
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_dedup.db')
+    os.environ['LLM_API_URL'] = api_url
+    os.environ['DATABASE_URI'] = f'sqlite:///{db_path}'
+    os.environ['DB_AUTO_INIT'] = 'true'
+    os.environ['ANALYSIS_CACHE_ENABLED'] = 'false'
+    os.environ['FAST_PATH_ENABLED'] = 'false'
+
+    from app import create_app
+    app = create_app()
+    from feedback_dedup import feedback_deduplicator
+    from ingest import ingest_feedbacks
+
+    rng = random.Random(0)
+    print(f'不同反馈 {args.unique} 条，每条 {args.copies} 个副本，模拟接口延迟 {args.latency * 1000:.0f}ms')
+    print(f'{"去重":>6} {"耗时(s)":>10} {"请求数":>8} {"成功":>6} {"重复":>6}')
+    try:
+        for enabled in (False, True):
+            app.config['DEDUP_ENABLED'] = enabled
+            feedback_deduplicator.clear()
+            run = 'on' if enabled else 'off'
+            feedbacks = []
+            for i in range(args.unique):
+                text = f'[{run}-{i}] 使用{TOPICS[i % len(TOPICS)]}功能时，第{i}次遇到问题：页面报错code{i * 7919}，希望尽快修复'
+                feedbacks.append(text)
+                feedbacks.extend(make_variant(text, rng) for _ in range(args.copies - 1))
+            rng.shuffle(feedbacks)
+
+            requests_before = MockLLMHandler.request_count
+            with app.app_context():
+                start = time.perf_counter()
+                stats = ingest_feedbacks(feedbacks, concurrency=args.concurrency, batch=False)
+                elapsed = time.perf_counter() - start
+            requests_made = MockLLMHandler.request_count - requests_before
+            print(f'{run:>6} {elapsed:>10.2f} {requests_made:>8} {stats["success"]:>6} {stats["duplicates"]:>6}')
+
+        # 指纹计算和索引查询的单条开销
+        samples = [f'第{i}条测试反馈：{TOPICS[i % len(TOPICS)]}功能异常，错误码{i * 31}' for i in range(5000)]
+        with app.app_context():
+            start = time.perf_counter()
+            fingerprints = [feedback_deduplicator.fingerprint(text) for text in samples]
+            fingerprint_us = (time.perf_counter() - start) / len(samples) * 1e6
+            start = time.perf_counter()
+            for fingerprint, max_distance in fingerprints:
+                feedback_deduplicator.find(fingerprint, max_distance)
+            find_us = (time.perf_counter() - start) / len(samples) * 1e6
+        print(f'指纹计算 {fingerprint_us:.1f}us/条，索引查询 {find_us:.1f}us/条（索引 {feedback_deduplicator.stats()["indexed"]} 条）')
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
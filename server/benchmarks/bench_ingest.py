@@ -0,0 +1,62 @@
+"""
+批量导入吞吐量测试：对本地模拟的chat-completions接口，比较不同并发度下每秒处理的反馈条数
+
+用法（在server目录下执行）:
+    python benchmarks/bench_ingest.py --lines 200 --latency 0.2 --concurrency 1 4 8 16 32 --mode single batch
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mock_llm_server import MockLLMHandler, start_mock_llm_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量导入吞吐量测试')
+    parser.add_argument('--lines', type=int, default=200, help='每轮导入的反馈条数')
+    parser.add_argument('--latency', type=float, default=0.2, help='模拟接口的单次响应延迟（秒）')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8, 16, 32], help='要测试的并发度')
+    parser.add_argument('--mode', nargs='+', choices=['single', 'batch'], default=['single', 'batch'], help='逐条分析或批量分析')
+    args = parser.parse_args()
+
+    server, api_url = start_mock_llm_server(args.latency)
+
+    # 必须在导入app之前设置，保证应用连接到模拟接口和临时SQLite数据库
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_ingest.db')
+    os.environ['LLM_API_URL'] = api_url
+    os.environ['DATABASE_URI'] = f'sqlite:///{db_path}'
+    os.environ['DB_AUTO_INIT'] = 'true'
+    # 每轮的反馈内容不同，关闭分析缓存以测量真实的请求开销
+    os.environ['ANALYSIS_CACHE_ENABLED'] = 'false'
+    # 测试反馈会被关键词快速分类命中，关闭快速分类使每条反馈都调用模拟接口
+    os.environ['FAST_PATH_ENABLED'] = 'false'
+    # 测试反馈只有编号不同，关闭近似重复检测
+    os.environ['DEDUP_ENABLED'] = 'false'
+
+    from app import create_app
+    app = create_app()
+    from ingest import ingest_feedbacks
+
+    print(f'模拟接口延迟: {args.latency * 1000:.0f}ms, 每轮 {args.lines} 条')
+    print(f'{"模式":>6} {"并发度":>6} {"耗时(s)":>10} {"条/秒":>10} {"请求数":>8} {"成功":>6} {"失败":>6}')
+    try:
+        for mode in args.mode:
+            for concurrency in args.concurrency:
+                feedbacks = [f'{mode}第{concurrency}轮第{i}条反馈：无法登录系统，页面一直转圈' for i in range(args.lines)]
+                requests_before = MockLLMHandler.request_count
+                with app.app_context():
+                    start = time.perf_counter()
+                    stats = ingest_feedbacks(feedbacks, concurrency=concurrency, batch=(mode == 'batch'))
+                    elapsed = time.perf_counter() - start
+                requests_made = MockLLMHandler.request_count - requests_before
+                print(f'{mode:>6} {concurrency:>6} {elapsed:>10.2f} {stats["total"] / elapsed:>10.1f} '
+                      f'{requests_made:>8} {stats["success"]:>6} {stats["failed"]:>6}')
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
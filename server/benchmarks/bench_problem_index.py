@@ -0,0 +1,116 @@
+"""
+相似问题索引测试：在大量问题上构建索引，统计单次相似问题查询的耗时，
+以及改动一个字后的已有摘要能否找回原问题（召回率）
+
+摘要默认按Zipf分布取字（与真实中文一样，少数常用字出现在大部分摘要中），
+--text uniform为均匀随机取字（每个字的倒排表都很短，查询耗时会明显偏低）
+
+用法（在server目录下执行）:
+    python benchmarks/bench_problem_index.py --problems 100000 --queries 1000 --matcher tfidf embedding
+    python benchmarks/bench_problem_index.py --max-df 1.0    # 不裁剪高频n-gram，用于对比
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 常用汉字范围内随机取字，模拟问题摘要
+ALPHABET = [chr(code) for code in range(0x4e00, 0x4e00 + 3000)]
+
+
+# 第r个常用字的出现概率与1/r成正比
+ZIPF_WEIGHTS = [1.0 / rank for rank in range(1, len(ALPHABET) + 1)]
+
+
+def random_summary(rng, text='zipf'):
+    length = rng.randint(6, 20)
+    if text == 'uniform':
+        return ''.join(rng.choice(ALPHABET) for _ in range(length))
+    return ''.join(rng.choices(ALPHABET, weights=ZIPF_WEIGHTS, k=length))
+
+
+def perturb(summary, rng):
+    # 随机替换一个字，模拟同一问题的不同表述
+    i = rng.randrange(len(summary))
+    return summary[:i] + rng.choice(ALPHABET) + summary[i + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='相似问题索引测试')
+    parser.add_argument('--problems', type=int, default=100000, help='索引中的问题数')
+    parser.add_argument('--queries', type=int, default=1000, help='查询次数')
+    parser.add_argument('--text', choices=['zipf', 'uniform'], default='zipf', help='摘要的取字分布')
+    parser.add_argument('--max-df', type=float, default=None, help='查询时跳过的高频n-gram的文档频率比例（SIMILARITY_MAX_DF）')
+    parser.add_argument('--matcher', nargs='+', choices=['tfidf', 'embedding'], default=['tfidf'], help='要测试的匹配方式')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_problem_index.db')
+    os.environ['DATABASE_URI'] = f'sqlite:///{db_path}'
+    os.environ['DB_AUTO_INIT'] = 'true'
+    # 不读写向量缓存文件，测量完整的构建耗时
+    os.environ['EMBEDDING_CACHE_PATH'] = ''
+    if args.max_df is not None:
+        os.environ['SIMILARITY_MAX_DF'] = str(args.max_df)
+
+    from app import create_app
+    app = create_app()
+    from database import db, Problem
+    from problem_index import ProblemIndex
+    from embedding_index import EmbeddingProblemIndex
+
+    rng = random.Random(42)
+    with app.app_context():
+        now = datetime.now()
+        summaries = [random_summary(rng, args.text) for _ in range(args.problems)]
+        db.session.execute(db.insert(Problem), [
+            {
+                'summary': summary,
+                'description': '',
+                'type': '其他',
+                'severity': '中',
+                'create_time': now,
+                'update_time': now
+            }
+            for summary in summaries
+        ])
+        db.session.commit()
+
+        queries = [random_summary(rng, args.text) for _ in range(args.queries)]
+        # 召回测试：problem_id从1开始与summaries的下标对应
+        targets = rng.sample(range(args.problems), min(args.queries, args.problems))
+        recall_queries = [(target + 1, perturb(summaries[target], rng)) for target in targets]
+        for matcher in args.matcher:
+            index = ProblemIndex() if matcher == 'tfidf' else EmbeddingProblemIndex()
+            start = time.perf_counter()
+            index.load()
+            print(f'[{matcher}] 构建索引: {len(index)} 个问题, 耗时 {time.perf_counter() - start:.2f}s')
+
+            latencies = []
+            for query in queries:
+                start = time.perf_counter()
+                index.find_similar(query)
+                latencies.append((time.perf_counter() - start) * 1000)
+            latencies.sort()
+            print(f'[{matcher}] 查询耗时: p50 {latencies[len(latencies) // 2]:.3f}ms, '
+                  f'p99 {latencies[int(len(latencies) * 0.99) - 1]:.3f}ms, '
+                  f'平均 {sum(latencies) / len(latencies):.3f}ms')
+
+            hits = sum(1 for problem_id, query in recall_queries if (index.search(query, limit=1) or [(None,)])[0][0] == problem_id)
+            print(f'[{matcher}] 改动一个字后找回原问题: {hits / len(recall_queries):.1%}')
+
+            # 批量匹配：一次矩阵乘法为一块反馈打分
+            if hasattr(index, 'find_similar_batch'):
+                start = time.perf_counter()
+                for offset in range(0, len(queries), 100):
+                    index.find_similar_batch(queries[offset:offset + 100])
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f'[{matcher}] 批量匹配（每批100条）: 平均每条 {elapsed / len(queries):.3f}ms')
+
+
+if __name__ == '__main__':
+    main()
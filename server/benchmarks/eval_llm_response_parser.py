@@ -0,0 +1,85 @@
+"""
+大模型回复解析的语料测试：用llm_response_corpus.jsonl中收集的回复（代码块、说明文字、尾随逗号、
+全角引号、截断输出等）检查解析结果，并与原来按首尾括号截取的解析方式比较解析成功率。
+有语料的解析结果与预期不符时以非0状态码退出。
+
+语料每行一条：kind为object（单条分析）或array（批量分析）；expect为null表示应解析失败，
+object语料的expect为解析结果应包含的字段，array语料的expect为应解析出的id列表
+
+用法（在server目录下执行）:
+    python benchmarks/eval_llm_response_parser.py
+    python benchmarks/eval_llm_response_parser.py --corpus my_corpus.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def legacy_parse(text, kind):
+    # 原来的解析方式：从第一个左括号截取到最后一个右括号
+    opener, closer = ('{', '}') if kind == 'object' else ('[', ']')
+    try:
+        if opener in text and closer in text:
+            return json.loads(text[text.find(opener):text.rfind(closer) + 1])
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='大模型回复解析的语料测试')
+    parser.add_argument('--corpus', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'llm_response_corpus.jsonl'),
+                        help='语料文件（JSON Lines）')
+    args = parser.parse_args()
+
+    # 导入app时会初始化数据库，使用临时SQLite数据库
+    os.environ['DATABASE_URI'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "eval_parser.db")}'
+    os.environ['DB_AUTO_INIT'] = 'true'
+    from app import create_app
+    app = create_app()
+    from llm_interface import llm_interface
+    from llm_response_parser import llm_response_parser
+
+    with open(args.corpus, encoding='utf-8') as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+
+    mismatches = []
+    legacy_success = 0
+    for case in cases:
+        text, kind, expect = case['text'], case['kind'], case['expect']
+        if kind == 'object':
+            result = llm_response_parser.parse_object(text, llm_interface._validate_analysis)
+            ok = result is None if expect is None else (
+                result is not None and all(result.get(key) == value for key, value in expect.items())
+            )
+        else:
+            items = llm_interface._parse_batch_results(text)
+            result = sorted(items) or None
+            ok = result == expect
+
+        legacy = legacy_parse(text, kind)
+        if kind == 'object' and isinstance(legacy, dict):
+            legacy = llm_interface._validate_analysis(legacy)
+        if (legacy is not None) == (expect is not None):
+            legacy_success += 1
+        if not ok:
+            mismatches.append((case['name'], expect, result))
+
+    stats = llm_response_parser.stats()
+    expected_success = sum(1 for case in cases if case['expect'] is not None)
+    print(f'语料 {len(cases)} 条, 其中应解析成功 {expected_success} 条')
+    print(f'解析器: 直接解析 {stats["parsed"]}, 修复后解析 {stats["repaired"]}, '
+          f'结构不合法 {stats["schemaRejected"]}, 失败 {stats["failed"]}, 成功率 {stats["successRate"]:.1%}')
+    print(f'与预期一致: 解析器 {len(cases) - len(mismatches)}/{len(cases)}, 原解析方式 {legacy_success}/{len(cases)}')
+    for name, expect, result in mismatches:
+        print(f'不一致: {name}, 预期 {expect}, 实际 {result}')
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
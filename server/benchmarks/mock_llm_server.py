@@ -0,0 +1,93 @@
+"""
+本地模拟的chat-completions接口，用于在不访问真实大模型的情况下做性能测试
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    # 每次请求的模拟延迟（秒），由start_mock_llm_server设置
+    latency = 0.2
+    # 收到的请求数
+    request_count = 0
+    _count_lock = threading.Lock()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        with self._count_lock:
+            MockLLMHandler.request_count += 1
+        time.sleep(self.latency)
+
+        prompt = payload.get('messages', [{}])[-1].get('content', '')
+        # 批量提示词中每条反馈的格式为"[编号] 反馈内容"
+        items = re.findall(r'^\s*\[(\d+)\] (.*)$', prompt, re.MULTILINE)
+        if items:
+            content = json.dumps([
+                dict(self.analysis_for(text), id=int(item_id)) for item_id, text in items
+            ], ensure_ascii=False)
+        else:
+            content = json.dumps(self.analysis_for(prompt), ensure_ascii=False)
+        if payload.get('stream'):
+            self.send_stream(content)
+            return
+        body = json.dumps({
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}}]
+        }, ensure_ascii=False).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_stream(self, content):
+        # 流式输出：按SSE格式分段发送回复内容，最后发送用量和[DONE]
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for start in range(0, len(content), 8):
+            chunk = {'choices': [{'index': 0, 'delta': {'content': content[start:start + 8]}, 'finish_reason': None}]}
+            self.wfile.write(f'data: {json.dumps(chunk, ensure_ascii=False)}\n\n'.encode('utf-8'))
+            self.wfile.flush()
+        final = {'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}], 'usage': {'total_tokens': len(content)}}
+        self.wfile.write(f'data: {json.dumps(final)}\n\ndata: [DONE]\n\n'.encode('utf-8'))
+        self.close_connection = True
+
+    @staticmethod
+    def analysis_for(text):
+        return {
+            'type': '技术问题' if '登录' in text else '其他',
+            'summary': f'模拟摘要{abs(hash(text)) % 1000}',
+            'severity': '中',
+            'entities': [],
+            'sentiment': '中性'
+        }
+
+    def log_message(self, format, *args):
+        # 压测时不输出访问日志
+        pass
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    # 高并发压测时默认的监听队列太短，会出现连接被重置
+    request_queue_size = 256
+    daemon_threads = True
+
+
+def start_mock_llm_server(latency=0.2, handler=MockLLMHandler):
+    """
+    在后台线程启动模拟服务
+
+    返回:
+        (server, api_url)，测试结束后调用server.shutdown()
+    """
+    handler.latency = latency
+    server = MockLLMServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    api_url = f'http://127.0.0.1:{server.server_address[1]}/v1/chat/completions'
+    return server, api_url
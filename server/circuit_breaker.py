@@ -0,0 +1,121 @@
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+
+
+class CircuitBreaker:
+    """
+    大模型调用的熔断器：连续失败LLM_BREAKER_FAILURE_THRESHOLD次后打开，打开期间不再发送请求，
+    分析改用本地的关键词分类和截断摘要（降级模式）。
+
+    打开LLM_BREAKER_RESET_SECONDS秒后进入半开状态，只放行一个探测请求：成功则关闭熔断器，
+    失败则重新打开并再等待一个周期。熔断状态保存在进程内。
+
+    只有传输错误（连接失败、超时）和429/5xx计为失败，400/401/413等请求本身的错误不影响熔断状态。
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None      # time.monotonic()
+        self._open_time = None      # 打开时的本地时间，用于展示
+        self._probe_in_flight = False
+        self._last_error = None
+        self._stats = {
+            'trips': 0,
+            'rejected': 0,
+            'degradedAnalyses': 0
+        }
+
+    def allow_request(self):
+        """
+        请求前调用，返回False时调用方应直接走降级路径
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < current_app.config.get('LLM_BREAKER_RESET_SECONDS', 30):
+                    self._stats['rejected'] += 1
+                    return False
+                self._state = self.HALF_OPEN
+            # 半开状态同一时间只放行一个探测请求
+            if self._probe_in_flight:
+                self._stats['rejected'] += 1
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+            self._opened_at = None
+            self._open_time = None
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._last_error = error
+            threshold = current_app.config.get('LLM_BREAKER_FAILURE_THRESHOLD', 5)
+            if self._state == self.HALF_OPEN:
+                # 探测失败，重新等待一个周期
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            elif self._state == self.CLOSED and threshold > 0 and self._consecutive_failures >= threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._open_time = datetime.now()
+                self._stats['trips'] += 1
+                print(f'大模型连续失败 {self._consecutive_failures} 次，进入降级模式: {error}')
+            self._probe_in_flight = False
+
+    def record_ignored(self):
+        """
+        请求失败但不是大模型服务故障（如400/401/413）时调用：不计入连续失败次数，
+        半开状态下不关闭熔断器，下一个请求继续作为探测请求
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_degraded(self, count=1):
+        """
+        记录在降级模式下由本地分析处理的反馈条数
+        """
+        with self._lock:
+            self._stats['degradedAnalyses'] += count
+
+    def is_open(self):
+        with self._lock:
+            return self._state != self.CLOSED
+
+    def reset(self):
+        """
+        手动关闭熔断器
+        """
+        self.record_success()
+
+    def status(self):
+        with self._lock:
+            status = dict(self._stats)
+            status.update({
+                'state': self._state,
+                'degraded': self._state != self.CLOSED,
+                'consecutiveFailures': self._consecutive_failures,
+                'lastError': self._last_error,
+                'openTime': self._open_time.strftime('%Y-%m-%d %H:%M:%S') if self._open_time else None,
+                'retryIn': None
+            })
+            if self._state == self.OPEN:
+                remaining = current_app.config.get('LLM_BREAKER_RESET_SECONDS', 30) - (time.monotonic() - self._opened_at)
+                status['retryIn'] = round(max(0.0, remaining), 1)
+        status['failureThreshold'] = current_app.config.get('LLM_BREAKER_FAILURE_THRESHOLD', 5)
+        status['resetSeconds'] = current_app.config.get('LLM_BREAKER_RESET_SECONDS', 30)
+        return status
@@ -0,0 +1,360 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+import zlib
+import numpy as np
+from sqlalchemy import event, inspect
+from flask import current_app
+from database import Problem
+from problem_index import extract_ngrams
+
+# 计算相似度时每次转换为float32参与矩阵乘法的行数，限制临时内存占用
+SCORE_BLOCK_ROWS = 65536
+
+
+class HashingEmbedder:
+    """
+    字符n-gram哈希向量化：把一元到三元字符n-gram哈希到固定维度，词频取对数后做L2归一化。
+    不依赖任何模型文件，可离线使用，同一文本在任何进程中得到相同的向量。
+    """
+
+    def __init__(self, dim=256):
+        self.dim = dim
+        self.name = f'hashing-{dim}'
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for gram, tf in extract_ngrams(text or '', sizes=(1, 2, 3)).items():
+                hashed = zlib.crc32(gram.encode('utf-8'))
+                # 最高位决定符号，减小哈希冲突带来的偏差
+                sign = -1.0 if hashed & 0x80000000 else 1.0
+                vectors[row, hashed % self.dim] += sign * (1.0 + math.log(tf))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class SentenceTransformerEmbedder:
+    """
+    本地CPU句向量模型（需要安装sentence-transformers并提前下载模型）
+    """
+
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+        self._model = SentenceTransformer(model_name, device='cpu')
+        self.dim = self._model.get_sentence_embedding_dimension()
+        self.name = f'sentence-transformers:{model_name}'
+
+    def embed(self, texts):
+        vectors = self._model.encode(list(texts), batch_size=64, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def summary_hash(summary):
+    """
+    摘要文本的64位哈希，与向量一起缓存，用于判断缓存的向量是否对应当前的摘要
+    """
+    return int.from_bytes(hashlib.blake2b((summary or '').encode('utf-8'), digest_size=8).digest(), 'little', signed=True)
+
+
+def create_embedder():
+    """
+    按配置EMBEDDING_BACKEND创建向量化器，句向量模型不可用时退回哈希向量化
+    """
+    backend = current_app.config.get('EMBEDDING_BACKEND', 'hashing')
+    if backend == 'sentence-transformers':
+        try:
+            return SentenceTransformerEmbedder(current_app.config.get('EMBEDDING_MODEL'))
+        except Exception as e:
+            print(f'加载句向量模型失败，改用哈希向量化: {e}')
+    return HashingEmbedder(current_app.config.get('EMBEDDING_DIM', 256))
+
+
+class EmbeddingProblemIndex:
+    """
+    问题摘要的向量索引：向量以float16矩阵保存，相似度为分块的向量化余弦相似度（向量已归一化，即点积）。
+
+    接口与ProblemIndex一致，可通过配置PROBLEM_MATCHER=embedding替换默认的TF-IDF匹配。
+    配置EMBEDDING_CACHE_PATH时，加载后把向量保存为.npy文件，下次启动以内存映射方式读取，只需为新问题计算向量。
+    缓存中每个向量附带摘要的哈希，摘要被修改或问题id被删除后复用时哈希不一致，重新计算向量。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._embedder = None
+        self._loaded = False
+        self._last_refresh = 0.0
+        self._reset(0)
+
+    def _reset(self, dim):
+        self._size = 0
+        self._capacity = 1024
+        self._vectors = np.zeros((self._capacity, dim), dtype=np.float16)
+        self._row_problem_ids = np.zeros(self._capacity, dtype=np.int64)
+        self._row_hashes = np.zeros(self._capacity, dtype=np.int64)
+        self._row_alive = np.zeros(self._capacity, dtype=bool)
+        self._problem_rows = {}
+        self._dead_rows = 0
+        self._max_problem_id = 0
+
+    def __len__(self):
+        return len(self._problem_rows)
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            with self._lock:
+                if self._embedder is None:
+                    self._embedder = create_embedder()
+        return self._embedder
+
+    def add(self, problem_id, summary):
+        """
+        新增或更新一个问题的摘要向量
+        """
+        vector = self.embedder.embed([summary or ''])
+        with self._lock:
+            self._remove_row(problem_id)
+            self._append_rows([problem_id], vector, [summary_hash(summary)])
+            if self._dead_rows > 1024 and self._dead_rows > self._size // 2:
+                self._compact()
+
+    def remove(self, problem_id):
+        with self._lock:
+            self._remove_row(problem_id)
+
+    def find_similar(self, summary, threshold=None):
+        """
+        查找与摘要最相似的问题
+
+        返回:
+            (problem_id, score)，没有达到阈值EMBEDDING_SIMILARITY_THRESHOLD的问题时返回None
+        """
+        return self.find_similar_batch([summary], threshold)[0]
+
+    def find_similar_batch(self, summaries, threshold=None):
+        """
+        批量查找最相似的问题，一次矩阵乘法为多条摘要打分
+
+        返回:
+            与输入顺序一致的列表，元素为(problem_id, score)或None
+        """
+        if threshold is None:
+            threshold = current_app.config.get('EMBEDDING_SIMILARITY_THRESHOLD', 0.5)
+        self._ensure_fresh()
+        queries = self.embedder.embed(summaries)
+        with self._lock:
+            best_scores = np.full(len(summaries), -1.0, dtype=np.float32)
+            best_rows = np.full(len(summaries), -1, dtype=np.int64)
+            for start, scores in self._iter_scores(queries):
+                block_best = np.argmax(scores, axis=1)
+                block_scores = scores[np.arange(len(summaries)), block_best]
+                better = block_scores > best_scores
+                best_scores[better] = block_scores[better]
+                best_rows[better] = block_best[better] + start
+            return [
+                (int(self._row_problem_ids[row]), float(score)) if row >= 0 and score >= threshold else None
+                for row, score in zip(best_rows, best_scores)
+            ]
+
+    def search(self, summary, limit=10):
+        """
+        返回与摘要最相似的limit个问题，按相似度降序排列的 [(problem_id, score), ...]
+        """
+        self._ensure_fresh()
+        query = self.embedder.embed([summary or ''])
+        with self._lock:
+            if len(self._problem_rows) == 0:
+                return []
+            scores = np.concatenate([block[0] for _, block in self._iter_scores(query)])
+            limit = min(limit, len(scores))
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.argsort(-scores[top])]
+            return [(int(self._row_problem_ids[row]), float(scores[row])) for row in top if scores[row] > 0]
+
+    def snapshot(self):
+        """
+        返回当前有效的 (problem_id数组, float16向量矩阵) 副本，供离线聚类使用
+        """
+        self._ensure_fresh()
+        with self._lock:
+            rows = np.flatnonzero(self._row_alive[:self._size])
+            return self._row_problem_ids[rows].copy(), self._vectors[rows].copy()
+
+    def load(self):
+        """
+        从数据库全量构建索引，需要在应用上下文中调用
+        """
+        rows = Problem.query.with_entities(Problem.id, Problem.summary).order_by(Problem.id).all()
+        embedder = self.embedder
+        cached = self._load_cache(embedder)
+
+        with self._lock:
+            self._reset(embedder.dim)
+            missing = []
+            for problem_id, summary in rows:
+                hashed = summary_hash(summary)
+                entry = cached.get(problem_id)
+                if entry is not None and entry[1] == hashed:
+                    self._append_rows([problem_id], entry[0][None, :], [hashed])
+                else:
+                    missing.append((problem_id, summary))
+            for start in range(0, len(missing), 1024):
+                batch = missing[start:start + 1024]
+                self._append_rows([problem_id for problem_id, _ in batch],
+                                  embedder.embed([summary for _, summary in batch]),
+                                  [summary_hash(summary) for _, summary in batch])
+            self._loaded = True
+            self._last_refresh = time.monotonic()
+            if missing:
+                self.save()
+
+    def refresh(self):
+        """
+        增量加载其他进程新建的问题（id大于已加载的最大id）
+        """
+        rows = Problem.query.with_entities(Problem.id, Problem.summary).filter(
+            Problem.id > self._max_problem_id
+        ).order_by(Problem.id).all()
+        rows = [(problem_id, summary) for problem_id, summary in rows if problem_id not in self._problem_rows]
+        if rows:
+            vectors = self.embedder.embed([summary for _, summary in rows])
+            with self._lock:
+                self._append_rows([problem_id for problem_id, _ in rows], vectors,
+                                  [summary_hash(summary) for _, summary in rows])
+        self._last_refresh = time.monotonic()
+
+    def save(self):
+        """
+        把当前向量保存到EMBEDDING_CACHE_PATH（未配置时不保存）
+        """
+        path = current_app.config.get('EMBEDDING_CACHE_PATH')
+        if not path:
+            return
+        if not self._loaded:
+            return
+        self._ensure_fresh()
+        with self._lock:
+            rows = np.flatnonzero(self._row_alive[:self._size])
+            problem_ids = self._row_problem_ids[rows].copy()
+            vectors = self._vectors[rows].copy()
+            hashes = self._row_hashes[rows].copy()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.save(f'{path}.tmp.npy', vectors)
+        np.save(f'{path}.ids.tmp.npy', problem_ids)
+        np.save(f'{path}.hashes.tmp.npy', hashes)
+        os.replace(f'{path}.tmp.npy', f'{path}.npy')
+        os.replace(f'{path}.ids.tmp.npy', f'{path}.ids.npy')
+        os.replace(f'{path}.hashes.tmp.npy', f'{path}.hashes.npy')
+        with open(f'{path}.json', 'w', encoding='utf-8') as f:
+            json.dump({'embedder': self.embedder.name, 'count': int(len(problem_ids))}, f)
+
+    def _load_cache(self, embedder):
+        path = current_app.config.get('EMBEDDING_CACHE_PATH')
+        if not path or not os.path.exists(f'{path}.json'):
+            return {}
+        try:
+            with open(f'{path}.json', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('embedder') != embedder.name:
+                return {}
+            # 以内存映射方式读取，只有实际用到的行才会从磁盘读入
+            vectors = np.load(f'{path}.npy', mmap_mode='r')
+            problem_ids = np.load(f'{path}.ids.npy')
+            # 旧版本的缓存没有摘要哈希，无法判断向量是否过期，全部重新计算
+            if not os.path.exists(f'{path}.hashes.npy'):
+                return {}
+            hashes = np.load(f'{path}.hashes.npy')
+            if not len(vectors) == len(problem_ids) == len(hashes):
+                return {}
+            return {
+                int(problem_id): (vectors[row], int(hashes[row]))
+                for row, problem_id in enumerate(problem_ids)
+            }
+        except (OSError, ValueError) as e:
+            print(f'读取问题向量缓存失败: {e}')
+            return {}
+
+    def _ensure_fresh(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+        elif time.monotonic() - self._last_refresh >= current_app.config.get('SIMILARITY_INDEX_REFRESH_SECONDS', 5):
+            self.refresh()
+
+    def _iter_scores(self, queries):
+        # 分块把float16向量转换为float32后与查询做矩阵乘法，失效行的得分置为-1
+        queries = np.asarray(queries, dtype=np.float32)
+        for start in range(0, self._size, SCORE_BLOCK_ROWS):
+            end = min(start + SCORE_BLOCK_ROWS, self._size)
+            scores = queries @ self._vectors[start:end].astype(np.float32).T
+            scores[:, ~self._row_alive[start:end]] = -1.0
+            yield start, scores
+
+    def _append_rows(self, problem_ids, vectors, hashes):
+        while self._size + len(problem_ids) > self._capacity:
+            self._grow()
+        end = self._size + len(problem_ids)
+        self._vectors[self._size:end] = vectors
+        self._row_problem_ids[self._size:end] = problem_ids
+        self._row_hashes[self._size:end] = hashes
+        self._row_alive[self._size:end] = True
+        for offset, problem_id in enumerate(problem_ids):
+            self._problem_rows[problem_id] = self._size + offset
+            self._max_problem_id = max(self._max_problem_id, problem_id)
+        self._size = end
+
+    def _remove_row(self, problem_id):
+        row = self._problem_rows.pop(problem_id, None)
+        if row is not None:
+            self._row_alive[row] = False
+            self._dead_rows += 1
+
+    def _grow(self):
+        self._capacity *= 2
+        vectors = np.zeros((self._capacity, self._vectors.shape[1]), dtype=np.float16)
+        vectors[:self._size] = self._vectors[:self._size]
+        self._vectors = vectors
+        self._row_problem_ids = np.resize(self._row_problem_ids, self._capacity)
+        self._row_hashes = np.resize(self._row_hashes, self._capacity)
+        alive = np.zeros(self._capacity, dtype=bool)
+        alive[:self._size] = self._row_alive[:self._size]
+        self._row_alive = alive
+
+    def _compact(self):
+        rows = np.flatnonzero(self._row_alive[:self._size])
+        problem_ids = self._row_problem_ids[rows].tolist()
+        vectors = self._vectors[rows]
+        hashes = self._row_hashes[rows]
+        max_problem_id = self._max_problem_id
+        self._reset(vectors.shape[1])
+        self._append_rows(problem_ids, vectors, hashes)
+        self._max_problem_id = max_problem_id
+
+
+# 创建全局的问题向量索引
+embedding_index = EmbeddingProblemIndex()
+
+
+# 问题新增或摘要修改时同步更新索引
+@event.listens_for(Problem, 'after_insert')
+def _embed_new_problem(mapper, connection, target):
+    if embedding_index._loaded:
+        embedding_index.add(target.id, target.summary)
+
+
+@event.listens_for(Problem, 'after_update')
+def _embed_updated_problem(mapper, connection, target):
+    if embedding_index._loaded and inspect(target).attrs.summary.history.has_changes():
+        embedding_index.add(target.id, target.summary)
+
+
+@event.listens_for(Problem, 'after_delete')
+def _unembed_deleted_problem(mapper, connection, target):
+    if embedding_index._loaded:
+        embedding_index.remove(target.id)
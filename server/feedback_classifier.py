@@ -0,0 +1,265 @@
+import json
+import threading
+import unicodedata
+from collections import Counter, deque
+from flask import has_app_context, current_app
+
+# 默认关键词词典：字段 -> 标签 -> {关键词: 权重}
+# 权重2为单独出现即可确定标签的强关键词，权重1为需要其他关键词佐证的弱关键词
+DEFAULT_KEYWORDS = {
+    'type': {
+        '技术问题': {
+            '闪退': 2, '崩溃': 2, '登录失败': 2, '无法登录': 2, '登不上': 2, '打不开': 2, '报错': 2,
+            '白屏': 2, '卡死': 2, '验证码': 2, '密码错误': 2, 'bug': 2,
+            '登录': 1, '账号': 1, '密码': 1, '加载': 1, '卡顿': 1, '网络': 1, '系统': 1, '页面': 1
+        },
+        '服务态度': {
+            '客服态度': 2, '服务态度': 2, '态度差': 2, '态度恶劣': 2, '不理人': 2, '没人回复': 2, '爱答不理': 2,
+            '客服': 1, '服务': 1, '响应': 1, '回复': 1, '售后': 1
+        },
+        '价格异议': {
+            '太贵': 2, '价格太高': 2, '乱收费': 2, '收费不合理': 2, '扣费': 2, '多收': 2, '涨价': 2,
+            # 退款投诉多与售后服务有关，只作为弱关键词
+            '价格': 1, '收费': 1, '贵': 1, '费用': 1, '会员费': 1, '退款': 1
+        },
+        '功能建议': {
+            '建议增加': 2, '建议添加': 2, '希望增加': 2, '希望支持': 2, '希望能': 2, '能不能加': 2, '新增功能': 2,
+            '功能': 1, '建议': 1, '希望': 1, '增加': 1, '支持': 1
+        }
+    },
+    'severity': {
+        '高': {'无法': 1, '不能': 1, '失败': 1, '崩溃': 1, '闪退': 1, '打不开': 1, '严重': 1, '丢失': 1},
+        '低': {'建议': 1, '希望': 1, '小问题': 1, '偶尔': 1, '稍微': 1}
+    },
+    'sentiment': {
+        '正面': {'满意': 1, '很好': 1, '不错': 1, '喜欢': 1, '好用': 1, '感谢': 1},
+        '负面': {'不满意': 1, '糟糕': 1, '差': 1, '失望': 1, '垃圾': 1, '投诉': 1, '太慢': 1}
+    }
+}
+
+# 各字段没有命中关键词时使用的标签
+DEFAULT_LABELS = {'type': '其他', 'severity': '中', 'sentiment': '中性'}
+
+# 问题类型最高得分达到该值时证据视为充分（一个强关键词或两个弱关键词）
+TYPE_EVIDENCE_WEIGHT = 2.0
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick多模式匹配自动机：一次扫描文本即可找出词典中的全部关键词
+    """
+
+    def __init__(self, keywords):
+        """
+        参数:
+            keywords: {关键词: 附带的值} 字典
+        """
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]  # 状态 -> [(关键词长度, 附带的值), ...]
+        for keyword, value in keywords.items():
+            self._add(keyword, value)
+        self._build()
+
+    def _add(self, keyword, value):
+        state = 0
+        for ch in keyword:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(keyword), value))
+
+    def _build(self):
+        # 按广度优先计算失败指针，并把失败状态的输出合并到当前状态
+        # 根节点的子状态失败后回到根节点
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text):
+        """
+        返回文本中全部关键词的出现位置 [(起始位置, 结束位置, 附带的值), ...]
+        """
+        matches = []
+        state = 0
+        for position, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for length, value in self._output[state]:
+                matches.append((position + 1 - length, position + 1, value))
+        return matches
+
+
+class FeedbackClassifier:
+    """
+    基于关键词词典的快速分类器：用Aho-Corasick自动机一次扫描反馈文本，按命中关键词的权重
+    给出问题类型、严重程度和情感倾向，并计算置信度。
+
+    置信度达到FAST_PATH_CONFIDENCE的反馈直接使用分类结果，不再调用大模型；
+    其余有歧义的反馈交给大模型分析。词典可通过CLASSIFIER_KEYWORDS_PATH指定的JSON文件覆盖。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._matcher = None
+        self._stats = {
+            'fastPath': 0,
+            'llm': 0,
+            'fallback': 0
+        }
+        self._fast_path_types = Counter()
+
+    def classify(self, feedback_text):
+        """
+        对反馈文本分类
+
+        返回:
+            (分析结果字典, 置信度)，分析结果只包含类型、严重程度、情感倾向和实体，不含摘要
+        """
+        text = unicodedata.normalize('NFKC', feedback_text or '').lower()
+        matches = self._get_matcher().find_all(text)
+
+        # 被同一字段中更长的关键词包含的命中不计入（如“不满意”中的“满意”）
+        spans = {field: [] for field in DEFAULT_LABELS}
+        for start, end, entries in matches:
+            for field in {entry[0] for entry in entries}:
+                spans[field].append((start, end))
+        scores = {field: Counter() for field in DEFAULT_LABELS}
+        for start, end, entries in matches:
+            for field, label, weight in entries:
+                if any(other_start <= start and end <= other_end and (other_start, other_end) != (start, end)
+                       for other_start, other_end in spans[field]):
+                    continue
+                scores[field][label] += weight
+
+        result = {'entities': []}
+        confidence = 1.0
+        for field, default_label in DEFAULT_LABELS.items():
+            label, agreement, best = self._pick(scores[field], default_label)
+            result[field] = label
+            if field == 'type':
+                # 问题类型需要有充分且一致的证据
+                confidence *= agreement * min(1.0, best / TYPE_EVIDENCE_WEIGHT)
+            else:
+                # 严重程度和情感倾向未命中时使用默认值，只有相互矛盾的关键词才降低置信度
+                confidence *= agreement
+        return result, round(confidence, 4)
+
+    def fast_path(self, feedback_text):
+        """
+        置信度达到阈值时返回分类结果并计入快速路径，否则返回None，由调用方交给大模型
+        """
+        if not current_app.config.get('FAST_PATH_ENABLED', True):
+            return None
+        result, confidence = self.classify(feedback_text)
+        if confidence < current_app.config.get('FAST_PATH_CONFIDENCE', 0.8):
+            return None
+        # 关键词只能确定类型、严重程度和情感倾向，不能生成归纳后的问题摘要：
+        # 只有能归入已有问题的反馈才走快速路径，并沿用该问题的摘要，新问题仍由大模型生成摘要
+        summary = self._matched_summary(feedback_text)
+        if summary is None:
+            return None
+        result['summary'] = summary
+        with self._lock:
+            self._stats['fastPath'] += 1
+            self._fast_path_types[result['type']] += 1
+        return result
+
+    def _matched_summary(self, feedback_text):
+        # 需要应用上下文读取相似问题索引，没有时交给大模型
+        if not has_app_context():
+            return None
+        from database import db, Problem
+        from problem_matcher import get_problem_matcher
+        match = get_problem_matcher().find_similar(truncate_summary(feedback_text or ''))
+        if not match:
+            return None
+        problem = db.session.get(Problem, match[0])
+        return problem.summary if problem is not None else None
+
+    def record(self, path, count=1):
+        """
+        记录由大模型（llm）或大模型失败后的关键词兜底（fallback）处理的反馈条数
+        """
+        with self._lock:
+            self._stats[path] += count
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['fastPathTypes'] = dict(self._fast_path_types)
+        total = stats['fastPath'] + stats['llm']
+        stats['fastPathRate'] = round(stats['fastPath'] / total, 4) if total else 0.0
+        return stats
+
+    def reload(self):
+        """
+        重新读取关键词词典
+        """
+        with self._lock:
+            self._matcher = None
+
+    def _get_matcher(self):
+        with self._lock:
+            if self._matcher is None:
+                self._matcher = KeywordMatcher(self._load_keywords())
+            return self._matcher
+
+    def _load_keywords(self):
+        # 合并默认词典和配置文件中的词典，得到 {关键词: [(字段, 标签, 权重), ...]}
+        dictionary = {field: {label: dict(words) for label, words in labels.items()}
+                      for field, labels in DEFAULT_KEYWORDS.items()}
+        path = current_app.config.get('CLASSIFIER_KEYWORDS_PATH')
+        if path:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    for field, labels in json.load(f).items():
+                        for label, words in labels.items():
+                            dictionary.setdefault(field, {}).setdefault(label, {}).update(words)
+            except (OSError, ValueError) as e:
+                print(f'读取分类关键词词典失败: {path}, {e}')
+
+        keywords = {}
+        for field, labels in dictionary.items():
+            if field not in DEFAULT_LABELS:
+                continue
+            for label, words in labels.items():
+                for word, weight in words.items():
+                    word = unicodedata.normalize('NFKC', word).lower()
+                    if word and weight:
+                        keywords.setdefault(word, []).append((field, label, float(weight)))
+        return keywords
+
+    def _pick(self, scores, default_label):
+        # 返回 (得分最高的标签, 该标签得分占全部得分的比例, 最高得分)
+        if not scores:
+            return default_label, 1.0, 0.0
+        label, best = max(scores.items(), key=lambda item: item[1])
+        return label, best / sum(scores.values()), best
+
+
+def truncate_summary(text, max_length=50):
+    """
+    不调用大模型时使用的摘要：超过max_length个字符的文本截断
+    """
+    text = text.strip()
+    if len(text) <= max_length:
+        return text
+    return text[:max_length] + '...'
+
+
+# 创建全局的快速分类器
+feedback_classifier = FeedbackClassifier()
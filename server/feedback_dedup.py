@@ -0,0 +1,200 @@
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+import numpy as np
+from sqlalchemy import event
+from flask import current_app
+from database import Problem
+from analysis_cache import normalize_feedback_text
+
+# SimHash指纹分为4段，每段16位：汉明距离不超过3的两个指纹至少有一段完全相同
+FINGERPRINT_BANDS = 4
+BAND_BITS = 16
+BAND_MASK = (1 << BAND_BITS) - 1
+MAX_SUPPORTED_DISTANCE = FINGERPRINT_BANDS - 1
+
+# 计算指纹时使用的字符n-gram长度
+SHINGLE_SIZE = 3
+
+
+def simhash(normalized_text):
+    """
+    计算规范化文本的64位SimHash指纹：每个字符3-gram哈希为64位，按出现次数加权投票决定每一位
+    """
+    if len(normalized_text) <= SHINGLE_SIZE:
+        shingles = Counter([normalized_text])
+    else:
+        shingles = Counter(normalized_text[i:i + SHINGLE_SIZE] for i in range(len(normalized_text) - SHINGLE_SIZE + 1))
+    hashes = np.array(
+        [hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest() for shingle in shingles],
+        dtype='S8'
+    ).view(np.uint8).reshape(-1, 8)
+    bits = np.unpackbits(hashes, axis=1).astype(np.int32)  # 每行64位，按字节从高位到低位
+    weights = np.fromiter(shingles.values(), dtype=np.int32, count=len(shingles))
+    votes = weights @ (bits * 2 - 1)
+    return int.from_bytes(np.packbits(votes > 0).tobytes(), 'big')
+
+
+class FingerprintIndex:
+    """
+    近期指纹索引：按汉明距离查找相近的指纹，按最近使用淘汰超出容量的条目
+
+    每个指纹按4个16位分段分别建立倒排表，查询时只比较至少一段相同的候选指纹
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        self._entries = OrderedDict()  # 指纹 -> 值
+        self._bands = [{} for _ in range(FINGERPRINT_BANDS)]  # 分段值 -> {指纹, ...}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def find(self, fingerprint, max_distance):
+        """
+        返回汉明距离不超过max_distance（最大为3）的最近指纹对应的值，没有时返回None
+        """
+        value = self._entries.get(fingerprint)
+        if value is not None:
+            self._entries.move_to_end(fingerprint)
+            return value
+        if max_distance <= 0:
+            return None
+        best = None
+        best_distance = max_distance + 1
+        for band, buckets in enumerate(self._bands):
+            for candidate in buckets.get((fingerprint >> (band * BAND_BITS)) & BAND_MASK, ()):
+                distance = (candidate ^ fingerprint).bit_count()
+                if distance < best_distance:
+                    best, best_distance = candidate, distance
+        if best is None:
+            return None
+        self._entries.move_to_end(best)
+        return self._entries[best]
+
+    def add(self, fingerprint, value):
+        """
+        记录指纹，返回因超出容量被淘汰的 [(指纹, 值), ...]
+        """
+        if fingerprint not in self._entries:
+            for band, buckets in enumerate(self._bands):
+                buckets.setdefault((fingerprint >> (band * BAND_BITS)) & BAND_MASK, set()).add(fingerprint)
+        self._entries[fingerprint] = value
+        self._entries.move_to_end(fingerprint)
+        evicted = []
+        while self.capacity and len(self._entries) > self.capacity:
+            old_fingerprint, old_value = self._entries.popitem(last=False)
+            self._discard_bands(old_fingerprint)
+            evicted.append((old_fingerprint, old_value))
+        return evicted
+
+    def remove(self, fingerprint):
+        if self._entries.pop(fingerprint, None) is not None:
+            self._discard_bands(fingerprint)
+
+    def clear(self):
+        self._entries.clear()
+        for buckets in self._bands:
+            buckets.clear()
+
+    def _discard_bands(self, fingerprint):
+        for band, buckets in enumerate(self._bands):
+            key = (fingerprint >> (band * BAND_BITS)) & BAND_MASK
+            bucket = buckets.get(key)
+            if bucket is not None:
+                bucket.discard(fingerprint)
+                if not bucket:
+                    del buckets[key]
+
+
+class FeedbackDeduplicator:
+    """
+    导入前的近似重复反馈检测：规范化文本（全角/半角、大小写、标点和空白）后计算SimHash指纹，
+    与近期已归入问题的反馈指纹比较，汉明距离不超过DEDUP_MAX_DISTANCE的反馈视为重复，
+    直接归入同一个问题，不再调用大模型分析和相似问题匹配。
+
+    规范化后短于DEDUP_MIN_CHARS个字符的反馈只按完全相同去重。
+    指纹索引保存在进程内，最多保留DEDUP_INDEX_SIZE条。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = FingerprintIndex()
+        self._problem_fingerprints = {}  # problem_id -> {指纹, ...}，问题删除时同步移除
+        self._stats = {
+            'checked': 0,
+            'duplicates': 0,
+            'reanalyzed': 0
+        }
+
+    def fingerprint(self, feedback_text):
+        """
+        返回 (指纹, 允许的最大汉明距离)，规范化后为空的文本返回None
+        """
+        normalized = normalize_feedback_text(feedback_text or '')
+        if not normalized:
+            return None
+        if len(normalized) < current_app.config.get('DEDUP_MIN_CHARS', 8):
+            max_distance = 0
+        else:
+            max_distance = min(current_app.config.get('DEDUP_MAX_DISTANCE', 3), MAX_SUPPORTED_DISTANCE)
+        return simhash(normalized), max_distance
+
+    def find(self, fingerprint, max_distance):
+        """
+        查找近期已归入问题的近似重复反馈，返回其problem_id，没有时返回None
+        """
+        with self._lock:
+            self._stats['checked'] += 1
+            return self._index.find(fingerprint, max_distance)
+
+    def record(self, name, count=1):
+        """
+        记录检测到的重复反馈（duplicates），或原反馈处理失败、重复反馈需要重新分析的条数（reanalyzed）
+        """
+        with self._lock:
+            self._stats[name] += count
+
+    def remember(self, fingerprint, problem_id):
+        """
+        记录已写入数据库的反馈指纹及其归入的问题
+        """
+        with self._lock:
+            self._index.capacity = current_app.config.get('DEDUP_INDEX_SIZE', 50000)
+            self._problem_fingerprints.setdefault(problem_id, set()).add(fingerprint)
+            for old_fingerprint, old_problem_id in self._index.add(fingerprint, problem_id):
+                self._forget(old_fingerprint, old_problem_id)
+
+    def remove_problem(self, problem_id):
+        with self._lock:
+            for fingerprint in self._problem_fingerprints.pop(problem_id, ()):
+                self._index.remove(fingerprint)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['indexed'] = len(self._index)
+        stats['duplicateRate'] = round(stats['duplicates'] / stats['checked'], 4) if stats['checked'] else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._index.clear()
+            self._problem_fingerprints.clear()
+
+    def _forget(self, fingerprint, problem_id):
+        fingerprints = self._problem_fingerprints.get(problem_id)
+        if fingerprints is not None:
+            fingerprints.discard(fingerprint)
+            if not fingerprints:
+                del self._problem_fingerprints[problem_id]
+
+
+# 创建全局的重复反馈检测器
+feedback_deduplicator = FeedbackDeduplicator()
+
+
+# 问题被删除（如重新聚类合并）后，不再把重复反馈归入该问题
+@event.listens_for(Problem, 'after_delete')
+def _forget_deleted_problem(mapper, connection, target):
+    feedback_deduplicator.remove_problem(target.id)
@@ -0,0 +1,144 @@
+import csv
+import io
+import json
+import os
+
+# 支持的导入文件格式
+SUPPORTED_FORMATS = ('txt', 'csv', 'xlsx', 'jsonl')
+
+# 探测文本编码时读取的字节数
+SNIFF_BYTES = 64 * 1024
+
+
+def detect_format(filename, file_format=None):
+    """
+    确定导入文件格式，未指定时按扩展名判断，无法识别的按纯文本处理
+    """
+    if file_format:
+        file_format = file_format.lower()
+        if file_format not in SUPPORTED_FORMATS:
+            raise ValueError(f'不支持的文件格式: {file_format}')
+        return file_format
+    ext = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    if ext == 'json':
+        ext = 'jsonl'
+    return ext if ext in SUPPORTED_FORMATS else 'txt'
+
+
+def detect_encoding(binary_file):
+    """
+    探测文本文件编码：带BOM的按utf-8-sig，能按UTF-8解码的按utf-8，否则按GB18030（兼容GBK导出的文件）
+    """
+    position = binary_file.tell()
+    head = binary_file.read(SNIFF_BYTES)
+    binary_file.seek(position)
+    if head.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig'
+    try:
+        head.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError as e:
+        # 只是读取的末尾截断在多字节字符中间时，仍按UTF-8处理
+        if e.start >= len(head) - 3 and e.reason == 'unexpected end of data':
+            return 'utf-8'
+        return 'gb18030'
+
+
+def iter_feedback_lines(file_path, file_format='txt', column=None, has_header=True):
+    """
+    以流式方式读取导入文件，逐条产出反馈文本，内存占用与文件大小无关
+
+    参数:
+        file_path: 文件路径
+        file_format: txt、csv、xlsx或jsonl
+        column: csv/xlsx为列名或从0开始的列序号，jsonl为字段名（默认content）
+        has_header: csv/xlsx第一行是否为表头
+
+    返回:
+        生成器，产出去除首尾空白后的非空反馈文本
+    """
+    if file_format == 'xlsx':
+        yield from _clean(_select_column(_iter_xlsx_rows(file_path), column, has_header))
+        return
+
+    with open(file_path, 'rb') as binary_file:
+        encoding = detect_encoding(binary_file)
+        # TextIOWrapper按块增量解码，不会把整个文件读入内存
+        text_file = io.TextIOWrapper(binary_file, encoding=encoding, errors='replace', newline='')
+        if file_format == 'csv':
+            values = _select_column(csv.reader(text_file), column, has_header)
+        elif file_format == 'jsonl':
+            values = _iter_jsonl_values(text_file, column)
+        else:
+            values = text_file
+        yield from _clean(values)
+
+
+def _clean(values):
+    for value in values:
+        if value is None:
+            continue
+        value = str(value).strip()
+        if value:
+            # 单元格内的换行合并为空格，一条反馈始终占一行
+            yield ' '.join(value.splitlines())
+
+
+def _select_column(rows, column, has_header):
+    rows = iter(rows)
+    index = 0
+    if has_header:
+        header = next(rows, None)
+        if header is None:
+            return
+        if column not in (None, ''):
+            index = _column_index(header, column)
+    elif column not in (None, ''):
+        try:
+            index = int(column)
+        except ValueError:
+            raise ValueError('文件没有表头时只能按列序号选择列')
+    for row in rows:
+        if index < len(row):
+            yield row[index]
+
+
+def _column_index(header, column):
+    names = [str(name).strip() if name is not None else '' for name in header]
+    if str(column).strip() in names:
+        return names.index(str(column).strip())
+    try:
+        return int(column)
+    except ValueError:
+        raise ValueError(f'文件中不存在列: {column}')
+
+
+def _iter_jsonl_values(text_file, field):
+    field = field or 'content'
+    for line_number, line in enumerate(text_file, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            print(f'JSONL第{line_number}行解析失败，已跳过')
+            continue
+        if isinstance(record, dict):
+            yield record.get(field)
+        elif isinstance(record, str):
+            yield record
+
+
+def _iter_xlsx_rows(file_path):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('导入xlsx文件需要安装openpyxl')
+    # 只读模式逐行读取，不会把整个工作表加载到内存
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield row
+    finally:
+        workbook.close()
@@ -0,0 +1,39 @@
+"""
+gunicorn配置：gunicorn -c gunicorn.conf.py wsgi:app
+
+主进程预加载应用（相似度索引、关键词词典等只加载一次，fork后由工作进程共享），
+每个工作进程使用多个线程处理请求；参数从.env中的SERVER_*读取。
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 监听地址，工作进程数（0表示CPU核数加1）和每个工作进程的线程数
+bind = os.environ.get('SERVER_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('SERVER_WORKERS', 0)) or (os.cpu_count() or 1) + 1
+threads = int(os.environ.get('SERVER_THREADS', 8))
+worker_class = 'gthread'
+# 请求超过该秒数无响应时重启工作进程；流式导入的连接会持续较长时间
+timeout = int(os.environ.get('SERVER_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+# 处理一定数量的请求后重启工作进程，释放可能累积的内存（0表示不重启）
+max_requests = int(os.environ.get('SERVER_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+preload_app = True
+accesslog = os.environ.get('SERVER_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+
+# fork只会复制调用fork的线程，主进程不启动后台线程，由每个工作进程各自启动
+def post_worker_init(worker):
+    from wsgi import app
+    from database import db
+    from routes import start_background_tasks
+
+    # 丢弃从主进程继承的数据库连接，工作进程各自建立连接池
+    with app.app_context():
+        db.engine.dispose(close=False)
+    start_background_tasks(app)
@@ -0,0 +1,658 @@
+import queue
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy import insert, select
+from flask import current_app
+from database import db, Feedback, Problem, FeedbackExample
+from analytics import analytics
+from response_cache import response_cache
+from report_summary import report_summarizer
+from llm_interface import llm_interface
+from problem_matcher import get_problem_matcher
+from problem_index import problem_index
+from embedding_index import embedding_index
+from problem_counters import problem_counters
+from feedback_dedup import feedback_deduplicator, FingerprintIndex
+
+
+def analyze_feedbacks(feedbacks, concurrency=None, batch=None):
+    """
+    并发调用大模型分析多条反馈，按输入顺序逐条产出结果
+
+    参数:
+        feedbacks: 反馈文本的可迭代对象
+        concurrency: 同时进行的LLM请求数，默认读取配置IMPORT_CONCURRENCY
+        batch: 是否把多条反馈合并到一次请求中分析，默认读取配置IMPORT_BATCH_MODE
+
+    返回:
+        生成器，依次产出 (feedback_text, analysis_result, error)，分析失败时analysis_result为None
+    """
+    if concurrency is None:
+        concurrency = current_app.config.get('IMPORT_CONCURRENCY', 8)
+    concurrency = max(1, int(concurrency))
+    if batch is None:
+        batch = current_app.config.get('IMPORT_BATCH_MODE', True)
+
+    if batch:
+        groups = llm_interface.iter_batches(feedbacks)
+        analyze = llm_interface.analyze_feedback_batch
+    else:
+        groups = ([feedback_text] for feedback_text in feedbacks)
+        analyze = _analyze_single
+
+    # 并发数为1时直接串行处理，避免线程池开销
+    if concurrency == 1:
+        for group in groups:
+            try:
+                yield from _group_results(group, analyze(group), None)
+            except Exception as e:
+                yield from _group_results(group, None, e)
+        return
+
+    app = current_app._get_current_object()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='llm-analyze') as executor:
+        # 只保留有限数量的在途请求，既能填满并发度，又不会一次性为全部输入创建future
+        pending = deque()
+        try:
+            for group in groups:
+                pending.append((group, executor.submit(_in_app_context, app, analyze, group)))
+                if len(pending) >= concurrency * 2:
+                    yield from _take_results(pending.popleft())
+            while pending:
+                yield from _take_results(pending.popleft())
+        finally:
+            # 调用方提前停止时取消尚未开始的请求
+            for _, future in pending:
+                future.cancel()
+
+
+def iter_analysis_events(feedbacks, concurrency=None):
+    """
+    并发分析一组反馈，按完成顺序产出事件，供交互式的流式导入使用
+
+    参数:
+        feedbacks: 反馈文本列表
+        concurrency: 同时进行的LLM请求数，默认读取配置IMPORT_CONCURRENCY
+
+    返回:
+        生成器，产出 ('delta', index, 回复片段)（大模型流式输出时）和
+        ('result', index, analysis_result, error)，每条反馈恰好产出一个result事件
+    """
+    if concurrency is None:
+        concurrency = current_app.config.get('IMPORT_CONCURRENCY', 8)
+    events = queue.Queue()
+
+    def analyze(index, feedback_text):
+        try:
+            result = llm_interface.analyze_feedback(
+                feedback_text,
+                on_delta=lambda content: events.put(('delta', index, content))
+            )
+            events.put(('result', index, result, None))
+        except Exception as e:
+            events.put(('result', index, None, e))
+
+    app = current_app._get_current_object()
+    executor = ThreadPoolExecutor(max_workers=max(1, int(concurrency)), thread_name_prefix='llm-stream')
+    try:
+        for index, feedback_text in enumerate(feedbacks):
+            executor.submit(_in_app_context, app, analyze, index, feedback_text)
+        remaining = len(feedbacks)
+        while remaining:
+            event = events.get()
+            if event[0] == 'result':
+                remaining -= 1
+            yield event
+    finally:
+        # 客户端断开时取消尚未开始的分析
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_import_events(feedbacks, concurrency=None):
+    """
+    交互式的流式导入：与ingest_feedbacks相同，近似重复的反馈不调用大模型，直接归入原反馈所在的问题；
+    其余反馈并发分析，分析完成的反馈立即写入数据库
+
+    参数:
+        feedbacks: 反馈文本列表
+        concurrency: 同时进行的LLM请求数，默认读取配置IMPORT_CONCURRENCY
+
+    返回:
+        生成器，产出 ('delta', index, 回复片段) 和 ('result', index, analysis_result, error, problem_id, duplicate)，
+        每条反馈恰好产出一个result事件；重复反馈的analysis_result取自归入的问题
+    """
+    entries = deque()
+    unique = list(_unique_feedbacks(feedbacks, entries))
+    entries = list(entries)
+    originals = [index for index, entry in enumerate(entries) if entry[2] is None]  # unique中的位置 -> 输入下标
+    waiting = {}  # 本次导入中原反馈的指纹 -> [等待原反馈写入的重复反馈下标, ...]
+
+    # 与近期已归入问题的反馈重复的反馈直接写入
+    for index, (feedback_text, _, duplicate) in enumerate(entries):
+        if duplicate is None:
+            continue
+        if duplicate[0] == 'problem':
+            yield _store_duplicate_event(index, feedback_text, duplicate[1])
+        else:
+            waiting.setdefault(duplicate[1], []).append(index)
+
+    for event in iter_analysis_events(unique, concurrency):
+        if event[0] == 'delta':
+            yield 'delta', originals[event[1]], event[2]
+            continue
+        _, position, result, error = event
+        index = originals[position]
+        feedback_text, fingerprint, _ = entries[index]
+        problem_id = None
+        if error is None:
+            try:
+                problem_id = store_feedback(feedback_text, result)
+            except Exception as e:
+                error = e
+        yield 'result', index, result, error, problem_id, False
+
+        # 原反馈写入后归入同一问题；原反馈处理失败时，重复反馈改为自行分析
+        for duplicate_index in waiting.pop(fingerprint, []):
+            duplicate_text = entries[duplicate_index][0]
+            if problem_id is not None:
+                yield _store_duplicate_event(duplicate_index, duplicate_text, problem_id)
+            else:
+                feedback_deduplicator.record('reanalyzed')
+                yield _analyze_and_store_event(duplicate_index, duplicate_text)
+
+
+def _store_duplicate_event(index, feedback_text, problem_id):
+    try:
+        store_feedback(feedback_text, {}, match=(problem_id, 1.0))
+        problem = db.session.get(Problem, problem_id)
+        result = {'type': problem.type, 'summary': problem.summary, 'severity': problem.severity}
+        return 'result', index, result, None, problem_id, True
+    except Exception as e:
+        return 'result', index, None, e, None, True
+
+
+def _analyze_and_store_event(index, feedback_text):
+    try:
+        result = llm_interface.analyze_feedback(feedback_text)
+        return 'result', index, result, None, store_feedback(feedback_text, result), False
+    except Exception as e:
+        return 'result', index, None, e, None, False
+
+
+def _in_app_context(app, func, *args):
+    # 分析线程需要应用上下文：快速分类要查询相似问题索引
+    with app.app_context():
+        return func(*args)
+
+
+def forget_problem(problem_id):
+    """
+    问题已被其他进程合并删除（删除事件只在执行删除的进程中触发），从本进程的相似问题索引和指纹索引中移除
+    """
+    problem_index.remove(problem_id)
+    embedding_index.remove(problem_id)
+    feedback_deduplicator.remove_problem(problem_id)
+
+
+def _analyze_single(group):
+    return [llm_interface.analyze_feedback(group[0])]
+
+
+def _take_results(item):
+    group, future = item
+    try:
+        results = future.result()
+    except Exception as e:
+        return _group_results(group, None, e)
+    return _group_results(group, results, None)
+
+
+def _group_results(group, results, error):
+    if error is not None:
+        return [(feedback_text, None, error) for feedback_text in group]
+    return list(zip(group, results, [None] * len(group)))
+
+
+class FeedbackChunkWriter:
+    """
+    按块缓冲反馈写入：新问题立即插入以便同一块中后续的反馈能匹配到它，
+    反馈和反馈示例在flush时用executemany批量插入，问题的反馈次数按问题聚合后各原子累加一次，
+    按天汇总的统计行在同一事务中累加
+    """
+
+    def __init__(self):
+        self.feedback_rows = []
+        self.example_rows = []
+        self.count_deltas = Counter()  # problem_id -> 本块中新增的反馈数
+        self.new_problem_ids = []
+        self.stat_entries = []  # (反馈日期, problem_id)
+        self.problem_attrs = {}  # problem_id -> (问题类型, 严重程度)
+        self.live_problem_ids = set()  # 本事务中已确认存在的问题
+
+    def add_many(self, items):
+        """
+        缓冲多条反馈的写入：先用一次批量相似度计算把每条反馈与已有问题匹配，
+        未匹配到的再逐条查找，以便归并到本块中前面新建的问题
+
+        参数:
+            items: [(反馈文本, 分析结果), ...]
+
+        返回:
+            每条反馈归入的problem_id列表
+        """
+        if not items:
+            return []
+        matches = get_problem_matcher().find_similar_batch(
+            [analysis_result.get('summary', '') for _, analysis_result in items]
+        )
+        self.lock_problems({match[0] for match in matches if match})
+        return [
+            self.add(feedback_text, analysis_result, match)
+            for (feedback_text, analysis_result), match in zip(items, matches)
+        ]
+
+    def add(self, feedback_text, analysis_result, match=None):
+        """
+        匹配或创建问题，并缓冲一条反馈的写入
+
+        参数:
+            match: 预先计算的匹配结果(problem_id, score)，为None时在这里查找；
+                   该问题已被删除时按摘要重新查找，没有摘要（近似重复的反馈）时抛出ValueError
+
+        返回:
+            反馈归入的problem_id
+        """
+        now = datetime.now()
+
+        # 从分析结果中提取信息
+        problem_type = analysis_result.get('type', '其他')
+        summary = analysis_result.get('summary', '')
+        severity = analysis_result.get('severity', '中')
+
+        # 通过相似度索引查找已有的类似问题
+        if match is None:
+            match = self._find_match(summary)
+        elif not self.lock_problems([match[0]]):
+            if not summary:
+                raise ValueError(f'反馈归入的问题已被删除: {match[0]}')
+            match = self._find_match(summary)
+        if match:
+            # 如果有类似问题，累计反馈次数，flush时统一更新
+            problem_id = match[0]
+            self.count_deltas[problem_id] += 1
+        else:
+            # 如果没有类似问题，创建新问题
+            problem = Problem(
+                summary=summary,
+                description=feedback_text,
+                type=problem_type,
+                severity=severity,
+                feedback_count=1,
+                status='pending',
+                create_time=now,
+                update_time=now
+            )
+            db.session.add(problem)
+            db.session.flush()  # 获取problem.id，同时触发相似度索引更新
+            problem_id = problem.id
+            self.new_problem_ids.append(problem_id)
+            self.live_problem_ids.add(problem_id)
+            self.problem_attrs[problem_id] = (problem_type, severity)
+
+        # 缓冲反馈和反馈示例
+        self.feedback_rows.append({
+            'content': feedback_text,
+            'status': 'pending',
+            'problem_id': problem_id,
+            'create_time': now,
+            'update_time': now
+        })
+        self.example_rows.append({
+            'problem_id': problem_id,
+            'content': feedback_text,
+            'create_time': now
+        })
+        self.stat_entries.append((now.date(), problem_id))
+        return problem_id
+
+    def lock_problems(self, problem_ids):
+        """
+        确认问题仍然存在并加共享锁，提交前不会被重新聚类合并删除；已被删除的问题从本进程的索引中移除
+
+        返回:
+            仍然存在的problem_id集合
+        """
+        missing = set(problem_ids) - self.live_problem_ids
+        if missing:
+            found = set(db.session.execute(
+                select(Problem.id).where(Problem.id.in_(missing)).with_for_update(read=True)
+            ).scalars())
+            self.live_problem_ids |= found
+            for problem_id in missing - found:
+                forget_problem(problem_id)
+        return self.live_problem_ids.intersection(problem_ids)
+
+    def _find_match(self, summary):
+        # 索引中可能还有其他进程已删除的问题，移除后重新查找，直到找到仍然存在的问题或没有匹配
+        while True:
+            match = get_problem_matcher().find_similar(summary)
+            if not match or self.lock_problems([match[0]]):
+                return match
+
+    def flush(self):
+        """
+        把缓冲的写入发送到数据库（不提交事务）
+        """
+        if self.feedback_rows:
+            db.session.execute(insert(Feedback), self.feedback_rows)
+        if self.example_rows:
+            db.session.execute(insert(FeedbackExample), self.example_rows)
+        problem_counters.increment(self.count_deltas)
+        self._record_stats()
+        self.feedback_rows = []
+        self.example_rows = []
+        self.count_deltas = Counter()
+        self.stat_entries = []
+
+    def _record_stats(self):
+        # 统计按问题的类型和严重程度归类，已有问题的属性一次查询取出
+        missing = {problem_id for _, problem_id in self.stat_entries} - self.problem_attrs.keys()
+        if missing:
+            rows = db.session.execute(
+                select(Problem.id, Problem.type, Problem.severity).where(Problem.id.in_(missing))
+            )
+            for problem_id, problem_type, severity in rows:
+                self.problem_attrs[problem_id] = (problem_type, severity)
+        analytics.record([
+            (day, problem_id) + self.problem_attrs[problem_id]
+            for day, problem_id in self.stat_entries
+            if problem_id in self.problem_attrs
+        ])
+
+    def discard(self):
+        """
+        事务回滚后调用：丢弃缓冲的写入，并把本块中新建的问题从相似度索引中移除
+        """
+        matcher = get_problem_matcher()
+        for problem_id in self.new_problem_ids:
+            matcher.remove(problem_id)
+        self.__init__()
+
+
+def store_feedback(feedback_text, analysis_result, commit=True, match=None):
+    """
+    将一条已分析的反馈写入数据库，并归并到相似问题或创建新问题
+
+    参数:
+        feedback_text: 客户反馈文本
+        analysis_result: analyze_feedback返回的分析结果字典
+        commit: 是否立即提交事务，为False时由调用方统一提交
+        match: 预先确定的归属问题(problem_id, score)，为None时按摘要查找相似问题
+
+    返回:
+        反馈归入的problem_id
+    """
+    writer = FeedbackChunkWriter()
+    try:
+        problem_id = writer.add(feedback_text, analysis_result, match)
+        writer.flush()
+        if commit:
+            db.session.commit()
+            response_cache.invalidate('feedback', 'problems')
+            if match is None:
+                _remember_fingerprint(feedback_text, problem_id)
+        return problem_id
+    except Exception:
+        db.session.rollback()
+        writer.discard()
+        raise
+
+
+def process_feedback(feedback_text):
+    """
+    分析并保存单条反馈
+    """
+    analysis_result = llm_interface.analyze_feedback(feedback_text)
+    store_feedback(feedback_text, analysis_result)
+
+
+class ImportAborted(Exception):
+    """
+    before_commit抛出此异常时回滚当前块并停止导入，不再逐条重试
+    """
+
+
+def ingest_feedbacks(feedbacks, concurrency=None, on_progress=None, should_stop=None, batch=None, before_commit=None):
+    """
+    批量导入反馈：先按文本指纹找出近似重复的反馈，其余反馈的LLM分析并发执行，
+    数据库写入按输入顺序在当前线程完成，每IMPORT_CHUNK_SIZE条提交一次
+
+    与近期导入的反馈或本次导入中前面的反馈近似重复的反馈不调用大模型，直接归入原反馈所在的问题
+
+    参数:
+        feedbacks: 反馈文本的可迭代对象
+        concurrency: LLM分析并发数，默认读取配置IMPORT_CONCURRENCY
+        on_progress: 每处理完一条反馈后调用 on_progress(success)，与该条反馈在同一事务中提交
+        should_stop: 返回True时停止导入，用于取消任务
+        batch: 是否批量分析，默认读取配置IMPORT_BATCH_MODE
+        before_commit: 每次提交写入的反馈前调用，抛出ImportAborted时回滚并停止导入（如导入任务已被其他进程接管）
+
+    返回:
+        导入统计字典 {'total', 'success', 'failed', 'duplicates'}
+    """
+    chunk_size = max(1, current_app.config.get('IMPORT_CHUNK_SIZE', 100))
+    stats = {
+        'total': 0,
+        'success': 0,
+        'failed': 0,
+        'duplicates': 0
+    }
+    resolved = {}  # 本次导入中已提交的原反馈指纹 -> problem_id
+    entries = deque()  # 按输入顺序排队的 (反馈文本, 指纹, 重复来源)
+
+    chunk = []
+    results = analyze_feedbacks(_unique_feedbacks(feedbacks, entries), concurrency, batch)
+    try:
+        for item in _merge_duplicates(results, entries):
+            if should_stop and should_stop():
+                break
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                _commit_chunk(chunk, on_progress, stats, resolved, before_commit)
+                chunk = []
+    finally:
+        # 提前停止时关闭生成器，等待在途的分析请求结束
+        results.close()
+    # 已分析完成的剩余反馈照常写入
+    if chunk:
+        _commit_chunk(chunk, on_progress, stats, resolved, before_commit)
+
+    return stats
+
+
+def _unique_feedbacks(feedbacks, entries):
+    """
+    计算每条反馈的指纹并查找近似重复，按输入顺序记入entries，只产出需要分析的反馈
+
+    重复来源为 ('problem', problem_id)（近期已归入问题的反馈）或 ('pending', 指纹)（本次导入中前面的反馈）
+    """
+    enabled = current_app.config.get('DEDUP_ENABLED', True)
+    pending_index = FingerprintIndex()  # 本次导入中需要分析的反馈，指纹 -> 指纹
+    live_problem_ids = set()  # 已确认仍然存在的重复来源问题
+    for feedback_text in feedbacks:
+        fingerprint = feedback_deduplicator.fingerprint(feedback_text) if enabled else None
+        duplicate = None
+        if fingerprint is not None:
+            fingerprint, max_distance = fingerprint
+            problem_id = feedback_deduplicator.find(fingerprint, max_distance)
+            while problem_id is not None and problem_id not in live_problem_ids:
+                # 指纹索引中的问题可能已被其他进程合并删除，移除后重新查找，都已删除时该反馈照常分析
+                if db.session.execute(select(Problem.id).where(Problem.id == problem_id)).scalar() is None:
+                    forget_problem(problem_id)
+                    problem_id = feedback_deduplicator.find(fingerprint, max_distance)
+                else:
+                    live_problem_ids.add(problem_id)
+            if problem_id is not None:
+                duplicate = ('problem', problem_id)
+            else:
+                original = pending_index.find(fingerprint, max_distance)
+                if original is not None:
+                    duplicate = ('pending', original)
+                else:
+                    pending_index.add(fingerprint, fingerprint)
+            if duplicate is not None:
+                feedback_deduplicator.record('duplicates')
+        entries.append((feedback_text, fingerprint, duplicate))
+        if duplicate is None:
+            yield feedback_text
+
+
+def _merge_duplicates(results, entries):
+    """
+    把跳过分析的重复反馈按输入顺序插回分析结果中
+
+    返回:
+        生成器，依次产出 (反馈文本, 分析结果, 错误, 指纹, 重复来源)，重复反馈的分析结果为None
+    """
+    for feedback_text, analysis_result, error in results:
+        while True:
+            entry_text, fingerprint, duplicate = entries.popleft()
+            if duplicate is None:
+                break
+            yield entry_text, None, None, fingerprint, duplicate
+        yield feedback_text, analysis_result, error, fingerprint, None
+    while entries:
+        entry_text, fingerprint, duplicate = entries.popleft()
+        yield entry_text, None, None, fingerprint, duplicate
+
+
+def _commit_chunk(chunk, on_progress, stats, resolved, before_commit=None):
+    """
+    在一个事务中写入一块反馈；整块写入失败时回滚并逐条重试，避免一条坏数据拖累整块
+
+    参数:
+        chunk: [(反馈文本, 分析结果, 错误, 指纹, 重复来源), ...]
+        resolved: 本次导入中已提交的原反馈指纹 -> problem_id，提交后更新
+        before_commit: 每次提交前调用，抛出ImportAborted时回滚并向上抛出
+    """
+    def commit():
+        if before_commit:
+            before_commit()
+        db.session.commit()
+
+    # 原反馈分析失败时，引用它的重复反馈改为自行分析
+    analyzed = {item[3] for item in chunk if item[2] is None and item[4] is None}
+    chunk = [_resolve_orphan(item, resolved, analyzed) for item in chunk]
+
+    writer = FeedbackChunkWriter()
+    written = {}  # 本块写入的原反馈指纹 -> problem_id
+    try:
+        originals = [item for item in chunk if item[2] is None and item[4] is None]
+        problem_ids = writer.add_many([(item[0], item[1]) for item in originals])
+        for item, problem_id in zip(originals, problem_ids):
+            if item[3] is not None:
+                written.setdefault(item[3], problem_id)
+        # 重复反馈直接归入原反馈所在的问题，不再做相似问题匹配
+        for feedback_text, _, error, _, duplicate in chunk:
+            if error is None and duplicate is not None:
+                writer.add(feedback_text, {}, (_duplicate_problem_id(duplicate, resolved, written), 1.0))
+        if on_progress:
+            for item in chunk:
+                on_progress(item[2] is None)
+        writer.flush()
+        commit()
+    except ImportAborted:
+        db.session.rollback()
+        writer.discard()
+        raise
+    except Exception as e:
+        db.session.rollback()
+        writer.discard()
+        print(f'批量写入反馈失败，改为逐条写入: {e}')
+        written = {}
+        for item in chunk:
+            if item[4] is not None and item[4][0] == 'pending':
+                item = _resolve_orphan(item, resolved, written)
+            feedback_text, analysis_result, error, fingerprint, duplicate = item
+            stats['total'] += 1
+            if error is None:
+                try:
+                    match = None
+                    if duplicate is not None:
+                        match = (_duplicate_problem_id(duplicate, resolved, written), 1.0)
+                    problem_id = store_feedback(feedback_text, analysis_result or {}, commit=False, match=match)
+                    if on_progress:
+                        on_progress(True)
+                    commit()
+                    if duplicate is None and fingerprint is not None:
+                        written.setdefault(fingerprint, problem_id)
+                    stats['success'] += 1
+                    stats['duplicates'] += duplicate is not None
+                    continue
+                except ImportAborted:
+                    db.session.rollback()
+                    raise
+                except Exception as store_error:
+                    db.session.rollback()
+                    error = store_error
+            print(f'处理反馈失败: {error}')
+            stats['failed'] += 1
+            if on_progress:
+                on_progress(False)
+                commit()
+        _publish_fingerprints(written, resolved)
+        response_cache.invalidate('feedback', 'problems')
+        return
+
+    # 已提交的原反馈指纹加入索引，后续的重复反馈可以直接归入对应问题
+    _publish_fingerprints(written, resolved)
+    # 仪表盘和报表的缓存响应已过期，新反馈足够多时提前更新分析总结
+    response_cache.invalidate('feedback', 'problems')
+    report_summarizer.notify_feedback(len(chunk))
+    for _, _, error, _, duplicate in chunk:
+        stats['total'] += 1
+        if error is None:
+            stats['success'] += 1
+            stats['duplicates'] += duplicate is not None
+        else:
+            print(f'处理反馈失败: {error}')
+            stats['failed'] += 1
+
+
+def _resolve_orphan(item, resolved, written):
+    """
+    引用本次导入中前面反馈的重复反馈，原反馈没有写入时调用大模型自行分析，转为普通反馈
+    """
+    feedback_text, _, error, fingerprint, duplicate = item
+    if error is not None or duplicate is None or duplicate[0] != 'pending':
+        return item
+    if duplicate[1] in resolved or duplicate[1] in written:
+        return item
+    feedback_deduplicator.record('reanalyzed')
+    try:
+        return feedback_text, llm_interface.analyze_feedback(feedback_text), None, fingerprint, None
+    except Exception as e:
+        return feedback_text, None, e, fingerprint, None
+
+
+def _duplicate_problem_id(duplicate, resolved, written):
+    kind, key = duplicate
+    if kind == 'problem':
+        return key
+    return written[key] if key in written else resolved[key]
+
+
+def _publish_fingerprints(written, resolved):
+    for fingerprint, problem_id in written.items():
+        resolved[fingerprint] = problem_id
+        feedback_deduplicator.remember(fingerprint, problem_id)
+
+
+def _remember_fingerprint(feedback_text, problem_id):
+    # 逐条写入的反馈同样加入指纹索引
+    if not current_app.config.get('DEDUP_ENABLED', True):
+        return
+    fingerprint = feedback_deduplicator.fingerprint(feedback_text)
+    if fingerprint is not None:
+        feedback_deduplicator.remember(fingerprint[0], problem_id)
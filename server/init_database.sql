@@ -55,9 +55,69 @@ CREATE TABLE IF NOT EXISTS analysis_results (
     content TEXT NOT NULL,
     start_date DATE,
     end_date DATE,
+    input_hash VARCHAR(64),
     create_time DATETIME NOT NULL,
     update_time DATETIME NOT NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+-- 已有数据库升级时执行：ALTER TABLE analysis_results ADD COLUMN input_hash VARCHAR(64);
+
+-- 创建导入任务表
+CREATE TABLE IF NOT EXISTS import_jobs (
+    id VARCHAR(32) PRIMARY KEY,
+    source VARCHAR(20) NOT NULL,
+    file_path VARCHAR(500) NOT NULL,
+    file_format VARCHAR(10) NOT NULL DEFAULT 'txt',
+    column_name VARCHAR(100),
+    has_header BOOLEAN NOT NULL DEFAULT TRUE,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    total INT NOT NULL DEFAULT 0,
+    processed INT NOT NULL DEFAULT 0,
+    success_count INT NOT NULL DEFAULT 0,
+    failed_count INT NOT NULL DEFAULT 0,
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    message TEXT,
+    run_start_processed INT NOT NULL DEFAULT 0,
+    owner VARCHAR(32),
+    start_time DATETIME,
+    finish_time DATETIME,
+    create_time DATETIME NOT NULL,
+    update_time DATETIME NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 创建按天/周/月汇总的反馈统计表（导入反馈时增量更新）
+CREATE TABLE IF NOT EXISTS feedback_stats (
+    period VARCHAR(10) NOT NULL,
+    bucket_date DATE NOT NULL,
+    problem_type VARCHAR(50) NOT NULL,
+    severity VARCHAR(20) NOT NULL,
+    feedback_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (period, bucket_date, problem_type, severity)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 创建按天/周/月汇总的问题反馈数表
+CREATE TABLE IF NOT EXISTS problem_stats (
+    period VARCHAR(10) NOT NULL,
+    bucket_date DATE NOT NULL,
+    problem_id INT NOT NULL,
+    feedback_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (period, bucket_date, problem_id),
+    FOREIGN KEY (problem_id) REFERENCES problems(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 创建问题反馈次数分片表（开启计数分片时导入反馈累加到分片，后台定期合并到problems.feedback_count）
+CREATE TABLE IF NOT EXISTS problem_counter_shards (
+    problem_id INT NOT NULL,
+    shard INT NOT NULL,
+    feedback_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (problem_id, shard),
+    FOREIGN KEY (problem_id) REFERENCES problems(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 创建后台任务锁表（多个工作进程之间只有一个执行同一任务）
+CREATE TABLE IF NOT EXISTS task_locks (
+    name VARCHAR(100) PRIMARY KEY,
+    expire_time DATETIME NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- 插入一些示例数据
 INSERT INTO problems (summary, description, type, severity, feedback_count, status, create_time, update_time)
@@ -92,8 +152,16 @@ VALUES (
 -- 创建索引以提高查询性能
 CREATE INDEX idx_feedback_status ON feedbacks(status);
 CREATE INDEX idx_feedback_problem_id ON feedbacks(problem_id);
+CREATE INDEX idx_feedback_examples_problem_id ON feedback_examples(problem_id, id);
 CREATE INDEX idx_problems_status ON problems(status);
 CREATE INDEX idx_problems_type ON problems(type);
+CREATE INDEX idx_problems_feedback_count ON problems(feedback_count DESC, id);
+
+-- 关键词搜索使用的全文索引（ngram分词支持中文）
+CREATE FULLTEXT INDEX ft_problems_text ON problems(summary, description) WITH PARSER ngram;
+CREATE FULLTEXT INDEX ft_feedback_examples_content ON feedback_examples(content) WITH PARSER ngram;
+CREATE INDEX idx_import_jobs_status ON import_jobs(status);
+CREATE INDEX idx_analysis_results_range ON analysis_results(analysis_type, start_date, end_date);
 
 -- 显示创建的数据库和表信息
 SELECT '数据库初始化完成' AS message;
@@ -0,0 +1,336 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import islice
+from flask import current_app
+from database import db, ImportJob
+from ingest import ingest_feedbacks, ImportAborted
+from llm_interface import llm_interface
+from feedback_reader import detect_format, iter_feedback_lines
+
+# 已结束的任务状态
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+
+# 运行中的任务检查其他进程发来的取消请求的间隔（秒）
+CANCEL_POLL_INTERVAL = 2
+
+
+def iter_job_lines(job):
+    """
+    以流式方式读取任务内容文件，逐条产出反馈文本
+    """
+    return iter_feedback_lines(job.file_path, job.file_format, job.column_name, job.has_header)
+
+
+def job_to_dict(job):
+    """
+    将导入任务转换为接口返回的字典，包含处理速率（条/秒）和预计剩余时间（秒）
+    """
+    rate = 0.0
+    if job.start_time:
+        end_time = job.finish_time or datetime.now()
+        elapsed = (end_time - job.start_time).total_seconds()
+        if elapsed > 0:
+            rate = (job.processed - (job.run_start_processed or 0)) / elapsed
+
+    eta = None
+    if job.status in ('queued', 'running') and rate > 0:
+        eta = round((job.total - job.processed) / rate, 1)
+
+    return {
+        'jobId': job.id,
+        'source': job.source,
+        'status': job.status,
+        'total': job.total,
+        'processed': job.processed,
+        'success': job.success_count,
+        'failed': job.failed_count,
+        'rate': round(rate, 2),
+        'eta': eta,
+        # 运行中的任务是否正在使用本地降级分析（本进程的大模型熔断器已打开）
+        'degraded': job.status == 'running' and llm_interface.circuit_breaker.is_open(),
+        'message': job.message,
+        'createTime': job.create_time.strftime('%Y-%m-%d %H:%M:%S'),
+        'updateTime': job.update_time.strftime('%Y-%m-%d %H:%M:%S'),
+        'finishTime': job.finish_time.strftime('%Y-%m-%d %H:%M:%S') if job.finish_time else None
+    }
+
+
+class ImportJobManager:
+    """
+    导入任务管理器：把导入内容落盘并记录到import_jobs表，由本地线程池在后台处理
+
+    任务进度与每块反馈在同一事务中提交，进程重启后从已提交的位置继续，不会重复调用大模型。
+    运行任务的进程持有租约：抢占时写入owner，后台线程定期续约（更新update_time），
+    超过IMPORT_JOB_STALE_SECONDS未续约的任务才会被其他进程接管；每块提交前校验owner，
+    租约已被接管时回滚该块并停止，避免同一段反馈被两个进程重复导入
+    """
+
+    def __init__(self):
+        self._app = None
+        self._executor = None
+        self._lock = threading.Lock()
+        self._submitted = set()  # 已提交到本进程线程池、尚未结束的任务
+        self._cancel_events = {}
+        self._leases = {}  # 本进程正在运行的任务 -> 租约标识
+
+    def start(self, app):
+        """
+        启动工作线程池，并在后台定期接管未完成或所属进程已失联的任务；工作线程在app的应用上下文中处理任务
+        """
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._app = app
+            self._executor = ThreadPoolExecutor(
+                max_workers=app.config.get('IMPORT_WORKERS', 2),
+                thread_name_prefix='import-job'
+            )
+        watcher = threading.Thread(target=self._watch, name='import-job-watcher', daemon=True)
+        watcher.start()
+        heartbeat = threading.Thread(target=self._heartbeat, name='import-job-heartbeat', daemon=True)
+        heartbeat.start()
+
+    def submit_text(self, content, source='text'):
+        """
+        提交文本导入任务，content为多行文本，source为任务来源（text或image）
+        """
+        def write(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+        return self._create_job(source, write, 'txt')
+
+    def submit_file(self, file, file_format=None, column=None, has_header=True):
+        """
+        提交文件导入任务
+
+        参数:
+            file: 上传的FileStorage对象，以流的方式保存到磁盘
+            file_format: txt、csv、xlsx或jsonl，默认按文件扩展名判断
+            column: csv/xlsx要导入的列名或列序号，jsonl要导入的字段名
+            has_header: csv/xlsx第一行是否为表头
+        """
+        file_format = detect_format(file.filename, file_format)
+        return self._create_job('file', file.save, file_format, column, has_header)
+
+    def get(self, job_id):
+        return db.session.get(ImportJob, job_id)
+
+    def cancel(self, job_id):
+        """
+        取消任务：排队中的任务直接取消，运行中的任务在处理完当前反馈后停止
+
+        返回:
+            任务对象，不存在时返回None
+        """
+        job = db.session.get(ImportJob, job_id)
+        if not job:
+            return None
+        if job.status == 'queued':
+            job.status = 'cancelled'
+            job.finish_time = datetime.now()
+        elif job.status == 'running':
+            job.cancel_requested = True
+            event = self._cancel_events.get(job_id)
+            if event:
+                event.set()
+        db.session.commit()
+        return job
+
+    def resume_unfinished(self):
+        """
+        接管排队中的任务，以及超过IMPORT_JOB_STALE_SECONDS未续约的运行中任务（其所属进程已退出）
+        """
+        stale_before = datetime.now() - timedelta(seconds=self._app.config.get('IMPORT_JOB_STALE_SECONDS', 120))
+        with self._app.app_context():
+            jobs = ImportJob.query.filter(
+                (ImportJob.status == 'queued') |
+                ((ImportJob.status == 'running') & (ImportJob.update_time < stale_before))
+            ).order_by(ImportJob.create_time).all()
+            job_ids = [job.id for job in jobs]
+        for job_id in job_ids:
+            self._submit(job_id)
+
+    def _create_job(self, source, write, file_format, column=None, has_header=True):
+        job_dir = current_app.config.get('IMPORT_JOB_DIR')
+        os.makedirs(job_dir, exist_ok=True)
+
+        job_id = uuid.uuid4().hex
+        file_path = os.path.join(job_dir, f'{job_id}.{file_format}')
+        write(file_path)
+
+        job = ImportJob(
+            id=job_id,
+            source=source,
+            file_path=file_path,
+            file_format=file_format,
+            column_name=column or None,
+            has_header=has_header,
+            status='queued',
+            create_time=datetime.now(),
+            update_time=datetime.now()
+        )
+        try:
+            # 预先流式扫描一遍得到总条数，同时尽早发现格式或列名错误
+            job.total = sum(1 for _ in iter_job_lines(job))
+        except Exception:
+            os.remove(file_path)
+            raise
+        db.session.add(job)
+        db.session.commit()
+
+        self._submit(job_id)
+        return job
+
+    def _submit(self, job_id):
+        self.start(current_app._get_current_object())
+        with self._lock:
+            if job_id in self._submitted:
+                return
+            self._submitted.add(job_id)
+        self._executor.submit(self._run, job_id)
+
+    def _watch(self):
+        interval = max(1, self._app.config.get('IMPORT_JOB_STALE_SECONDS', 120) // 2)
+        while True:
+            try:
+                self.resume_unfinished()
+            except Exception as e:
+                print(f'接管导入任务失败: {e}')
+            time.sleep(interval)
+
+    def _heartbeat(self):
+        # 为本进程运行中的任务续约；续约失败说明任务已被其他进程接管（或已被取消、删除），通知本进程停止
+        interval = max(1, self._app.config.get('IMPORT_JOB_STALE_SECONDS', 120) // 4)
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                leases = dict(self._leases)
+            if not leases:
+                continue
+            try:
+                with self._app.app_context():
+                    for job_id, owner in leases.items():
+                        renewed = ImportJob.query.filter(
+                            ImportJob.id == job_id, ImportJob.owner == owner, ImportJob.status == 'running'
+                        ).update({'update_time': datetime.now()}, synchronize_session=False)
+                        db.session.commit()
+                        if not renewed:
+                            event = self._cancel_events.get(job_id)
+                            if event:
+                                event.set()
+            except Exception as e:
+                print(f'导入任务续约失败: {e}')
+
+    def _check_lease(self, job, owner):
+        # 在提交所在的事务中用带条件的UPDATE校验并续约，行锁保证提交前租约没有被其他进程接管
+        renewed = ImportJob.query.filter(
+            ImportJob.id == job.id, ImportJob.owner == owner
+        ).update({'update_time': datetime.now()}, synchronize_session=False)
+        if not renewed:
+            raise ImportAborted(f'导入任务已被其他进程接管: {job.id}')
+
+    def _claim(self, job_id, owner):
+        # 用带条件的UPDATE抢占任务，保证多个进程中只有一个能运行同一任务；运行中的任务只在租约过期后才能接管
+        stale_before = datetime.now() - timedelta(seconds=current_app.config.get('IMPORT_JOB_STALE_SECONDS', 120))
+        claimed = ImportJob.query.filter(
+            ImportJob.id == job_id,
+            (ImportJob.status == 'queued') |
+            ((ImportJob.status == 'running') & (ImportJob.update_time < stale_before))
+        ).update({
+            'status': 'running',
+            'owner': owner,
+            'start_time': datetime.now(),
+            'run_start_processed': ImportJob.processed,
+            'update_time': datetime.now()
+        }, synchronize_session=False)
+        db.session.commit()
+        return db.session.get(ImportJob, job_id) if claimed else None
+
+    def _run(self, job_id):
+        event = threading.Event()
+        self._cancel_events[job_id] = event
+        owner = uuid.uuid4().hex
+        try:
+            with self._app.app_context():
+                job = self._claim(job_id, owner)
+                if job is None:
+                    return
+                with self._lock:
+                    self._leases[job_id] = owner
+                try:
+                    self._process(job, event, owner)
+                except ImportAborted as e:
+                    # 租约已被其他进程接管，已回滚的反馈由接管的进程继续导入
+                    db.session.rollback()
+                    print(f'导入任务停止: {e}')
+                except Exception as e:
+                    db.session.rollback()
+                    if not threading.main_thread().is_alive():
+                        # 进程正在退出，保留running状态，重启后由其他进程接管继续处理
+                        return
+                    print(f'导入任务失败: {job_id}, {e}')
+                    job.status = 'failed'
+                    job.message = str(e)
+                    job.finish_time = datetime.now()
+                    try:
+                        self._check_lease(job, owner)
+                        db.session.commit()
+                    except ImportAborted:
+                        db.session.rollback()
+        finally:
+            self._cancel_events.pop(job_id, None)
+            with self._lock:
+                self._leases.pop(job_id, None)
+                self._submitted.discard(job_id)
+
+    def _process(self, job, event, owner):
+        last_poll = [time.monotonic()]
+
+        def should_stop():
+            if event.is_set():
+                return True
+            if time.monotonic() - last_poll[0] >= CANCEL_POLL_INTERVAL:
+                last_poll[0] = time.monotonic()
+                db.session.refresh(job)
+                if job.cancel_requested:
+                    event.set()
+            return event.is_set()
+
+        def on_progress(success):
+            job.processed += 1
+            if success:
+                job.success_count += 1
+            else:
+                job.failed_count += 1
+
+        # 跳过上次运行已提交的行
+        lines = islice(iter_job_lines(job), job.processed, None)
+        ingest_feedbacks(
+            lines, on_progress=on_progress, should_stop=should_stop,
+            before_commit=lambda: self._check_lease(job, owner)
+        )
+
+        db.session.refresh(job)
+        if event.is_set() or job.cancel_requested:
+            job.status = 'cancelled'
+            job.message = '任务已取消'
+        else:
+            job.status = 'completed'
+            job.message = f'成功导入 {job.success_count} 条反馈'
+        job.finish_time = datetime.now()
+        self._check_lease(job, owner)
+        db.session.commit()
+
+        # 任务结束后删除落盘的导入内容
+        try:
+            os.remove(job.file_path)
+        except OSError:
+            pass
+
+
+# 创建全局的导入任务管理器
+job_manager = ImportJobManager()
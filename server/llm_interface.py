@@ -1,72 +1,229 @@
 import os
-import requests
+import re
+import time
 import json
-from app import app
+import html
+import requests
+from flask import current_app
+from analysis_cache import analysis_cache
+from feedback_classifier import feedback_classifier, truncate_summary
+from circuit_breaker import CircuitBreaker
+from llm_response_parser import llm_response_parser
+from llm_transport import llm_transport
+
+# 分析总结中允许保留的标签，属性一律丢弃
+SUMMARY_TAG_PATTERN = re.compile(r'<\s*(/?)\s*(p|strong)\b[^<>]*>', re.IGNORECASE)
+
+
+def sanitize_summary_html(content):
+    """
+    清理分析总结的HTML：总结由大模型根据客户反馈生成，前端以HTML显示，
+    因此转义全部内容，只重新输出不带属性的<p>和<strong>标签，并补全未闭合的标签
+    """
+    parts = []
+    in_paragraph = in_strong = False
+    position = 0
+    for match in SUMMARY_TAG_PATTERN.finditer(content):
+        parts.append(html.escape(content[position:match.start()]))
+        position = match.end()
+        closing, tag = match.group(1), match.group(2).lower()
+        if in_strong and (tag == 'p' or closing):
+            parts.append('</strong>')
+            in_strong = False
+        if tag == 'p':
+            if in_paragraph:
+                parts.append('</p>')
+            in_paragraph = not closing
+            if in_paragraph:
+                parts.append('<p>')
+        elif not closing and not in_strong:
+            parts.append('<strong>')
+            in_strong = True
+    parts.append(html.escape(content[position:]))
+    if in_strong:
+        parts.append('</strong>')
+    if in_paragraph:
+        parts.append('</p>')
+    return ''.join(parts)
+
 
 class LLMInterface:
     """
     大语言模型接口封装类，负责处理与大模型的交互和输出格式管理
     """
     
+    # 反馈分析提示词版本，修改analyze_feedback的提示词后需要更新，使旧的缓存结果失效
+    ANALYSIS_PROMPT_VERSION = 'feedback-analysis-v1'
+    
+    # 分析结果各字段的可选值
+    TYPE_OPTIONS = ('技术问题', '服务态度', '价格异议', '功能建议', '其他')
+    SEVERITY_OPTIONS = ('高', '中', '低')
+    SENTIMENT_OPTIONS = ('正面', '中性', '负面')
+    
+    # 报告总结提示词版本，修改generate_report_summary的提示词后需要更新，使已保存的总结重新生成
+    REPORT_SUMMARY_PROMPT_VERSION = 'report-summary-v1'
+    
+    # 批量分析时每条反馈预留的输出token数和提示词的固定开销
+    BATCH_OUTPUT_TOKENS_PER_ITEM = 120
+    BATCH_PROMPT_OVERHEAD_TOKENS = 300
+    
     def __init__(self):
-        # 从配置中获取API密钥和URL
-        self.api_key = app.config.get('LLM_API_KEY', '')
-        self.api_url = app.config.get('LLM_API_URL', 'https://api.deepseek.com/v1/chat/completions')
-        # 设置请求头 - DeepSeek API使用Bearer认证
-        self.headers = {
+        # 连续调用失败后熔断，熔断期间分析走本地降级路径
+        self.circuit_breaker = CircuitBreaker()
+
+    # API密钥、URL和模型在使用时从配置中读取，导入模块时不读取配置、不创建连接（HTTP会话由传输层在首次请求时创建）
+    @property
+    def api_key(self):
+        return current_app.config.get('LLM_API_KEY', '')
+
+    @property
+    def api_url(self):
+        return current_app.config.get('LLM_API_URL', 'https://api.deepseek.com/v1/chat/completions')
+
+    @property
+    def model(self):
+        return current_app.config.get('LLM_MODEL', 'deepseek-chat')
+
+    @property
+    def headers(self):
+        # DeepSeek API使用Bearer认证
+        return {
             'Content-Type': 'application/json',
             'Authorization': f'Bearer {self.api_key}'
         }
-        
-    def call_llm(self, messages, model='deepseek-chat', temperature=0.7, max_tokens=1000):
+
+    def call_llm(self, messages, model=None, temperature=0.7, max_tokens=1000, stream=None, on_delta=None):
         """
         调用DeepSeek大模型API
         
         参数:
             messages: 消息列表，格式为[{"role": "user", "content": "用户输入"}, ...]
-            model: 模型名称，DeepSeek默认为'deepseek-chat'
+            model: 模型名称，默认读取配置LLM_MODEL（DeepSeek为'deepseek-chat'）
             temperature: 温度参数
             max_tokens: 最大 tokens 数
+            stream: 是否使用流式输出（stream: true，按SSE解析），默认在传入on_delta且配置LLM_STREAM_ENABLED时启用
+            on_delta: 流式输出时每收到一段回复内容调用 on_delta(text)
         
         返回:
-            大模型的回复内容，如果调用失败则返回None
+            大模型的回复内容，如果调用失败或熔断器打开则返回None；流式输出时拼接为与非流式相同格式的字典
         """
+        if stream is None:
+            stream = on_delta is not None and current_app.config.get('LLM_STREAM_ENABLED', True)
+        if not self.circuit_breaker.allow_request():
+            return None
         try:
             # 构建请求体 - DeepSeek API与OpenAI API参数格式类似
             payload = {
-                'model': model,
+                'model': model or self.model,
                 'messages': messages,
                 'temperature': temperature,
                 'max_tokens': max_tokens
             }
+            if stream:
+                payload['stream'] = True
+                payload['stream_options'] = {'include_usage': True}
             
-            # 发送请求
-            response = requests.post(
+            # 通过连接池发送请求，超时、429/5xx重试和限流由传输层处理
+            estimated_tokens = sum(self._estimate_tokens(m.get('content', '')) for m in messages) + max_tokens
+            response = llm_transport.post(
                 self.api_url,
                 headers=self.headers,
-                data=json.dumps(payload)
+                payload=payload,
+                estimated_tokens=estimated_tokens,
+                stream=stream
             )
             
             # 检查响应状态
             if response.status_code == 200:
-                return response.json()
+                result = self._read_stream(response, on_delta) if stream else response.json()
+                self.circuit_breaker.record_success()
+                return result
             else:
                 print(f"DeepSeek API调用失败: {response.status_code}, {response.text}")
+                if response.status_code == 429 or response.status_code >= 500:
+                    self.circuit_breaker.record_failure(f'HTTP {response.status_code}')
+                else:
+                    # 400/401/413等是请求本身的问题，大模型服务可用，不计入熔断
+                    self.circuit_breaker.record_ignored()
                 return None
+        except requests.RequestException as e:
+            # 连接失败、超时等传输错误（传输层已重试）计入熔断
+            print(f"DeepSeek API调用异常: {str(e)}")
+            self.circuit_breaker.record_failure(str(e))
+            return None
         except Exception as e:
             print(f"DeepSeek API调用异常: {str(e)}")
+            self.circuit_breaker.record_ignored()
             return None
+    
+    def _read_stream(self, response, on_delta=None):
+        """
+        读取流式响应的SSE事件（data: {...}，以data: [DONE]结束），拼接回复内容
+        
+        返回:
+            {'choices': [{'message': {...}, 'finish_reason': ...}], 'usage': {...}}
+        """
+        parts = []
+        finish_reason = None
+        usage = {}
+        try:
+            # 按字节分行后再以UTF-8解码：SSE固定使用UTF-8，按文本分行时U+0085等字符也会被当作换行
+            for line in response.iter_lines():
+                line = line.decode('utf-8')
+                if not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                chunk = json.loads(data)
+                usage = chunk.get('usage') or usage
+                for choice in chunk.get('choices') or []:
+                    content = (choice.get('delta') or {}).get('content')
+                    if content:
+                        parts.append(content)
+                        if on_delta:
+                            on_delta(content)
+                    finish_reason = choice.get('finish_reason') or finish_reason
+        finally:
+            response.close()
+        return {
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': ''.join(parts)},
+                'finish_reason': finish_reason
+            }],
+            'usage': usage
+        }
 
-    def analyze_feedback(self, feedback_text):
+    def analyze_feedback(self, feedback_text, on_delta=None):
         """
         分析客户反馈，提取问题类型、摘要等信息
         
         参数:
             feedback_text: 客户反馈文本
+            on_delta: 可选，调用大模型时以流式输出并把每段回复内容传给 on_delta(text)
         
         返回:
             分析结果字典，包含问题类型、摘要、严重程度等信息
         """
+        # 相同（规范化后）的反馈直接使用缓存的分析结果，不再调用大模型
+        cache_version = f'{self.ANALYSIS_PROMPT_VERSION}:{self.model}'
+        cached_result = analysis_cache.get(feedback_text, cache_version)
+        if cached_result is not None:
+            return cached_result
+        
+        # 关键词分类置信度足够高的反馈不调用大模型
+        fast_result = feedback_classifier.fast_path(feedback_text)
+        if fast_result is not None:
+            return fast_result
+        
+        feedback_classifier.record('llm')
+        return self._analyze_uncached(feedback_text, cache_version, on_delta)
+    
+    def _analyze_uncached(self, feedback_text, cache_version, on_delta=None):
+        """
+        调用大模型分析单条反馈，成功解析的结果写入缓存
+        """
         # 构建提示词
         prompt = f"""请分析以下客户反馈，提取相关信息：
         客户反馈：{feedback_text}
@@ -91,28 +248,178 @@ class LLMInterface:
         ]
         
         # 调用大模型
-        response = self.call_llm(messages, temperature=0.5)
+        start_time = time.perf_counter()
+        response = self.call_llm(messages, temperature=0.5, on_delta=on_delta)
         
         if response and 'choices' in response and len(response['choices']) > 0:
-            # 解析DeepSeek的回复
-            try:
-                result_text = response['choices'][0]['message']['content']
-                # 提取JSON部分
-                if '{' in result_text and '}' in result_text:
-                    json_start = result_text.find('{')
-                    json_end = result_text.rfind('}') + 1
-                    result_json = json.loads(result_text[json_start:json_end])
-                    return result_json
-                # 如果没有JSON格式，尝试直接解析
-                return json.loads(result_text)
-            except json.JSONDecodeError:
-                print(f"LLM输出解析失败: {result_text}")
-                # 返回默认的模拟分析结果
-                return self._get_default_analysis(feedback_text)
-        
-        # 如果调用失败，返回默认的模拟分析结果
+            analysis_cache.record_llm_call(
+                time.perf_counter() - start_time,
+                response.get('usage', {}).get('total_tokens', 0)
+            )
+            # 解析DeepSeek的回复：容忍代码块、说明文字和常见的格式错误，并校验字段
+            result_text = response['choices'][0]['message']['content']
+            result_json = llm_response_parser.parse_object(result_text, self._validate_analysis)
+            if result_json is not None:
+                analysis_cache.put(feedback_text, cache_version, result_json)
+                return result_json
+            print(f"LLM输出解析失败: {result_text}")
+        
+        # 调用失败或输出无法解析时，返回本地的分析结果
         return self._get_default_analysis(feedback_text)
     
+    def analyze_feedback_batch(self, feedback_texts):
+        """
+        在一次大模型请求中批量分析多条客户反馈
+        
+        参数:
+            feedback_texts: 客户反馈文本列表，调用方应先用iter_batches按token预算分组
+        
+        返回:
+            与输入顺序一致的分析结果字典列表；批量结果缺失或不合法的条目会单独走analyze_feedback重新分析
+        """
+        cache_version = f'{self.ANALYSIS_PROMPT_VERSION}:{self.model}'
+        results = [analysis_cache.get(text, cache_version) for text in feedback_texts]
+        for i, text in enumerate(feedback_texts):
+            if results[i] is None:
+                results[i] = feedback_classifier.fast_path(text)
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            feedback_classifier.record('llm', len(pending))
+        
+        if len(pending) > 1:
+            items = '\n'.join(f'[{n}] {feedback_texts[i]}' for n, i in enumerate(pending, 1))
+            prompt = f"""请逐条分析以下{len(pending)}条客户反馈，提取相关信息：
+        {items}
+        
+        请按照以下JSON数组格式返回分析结果，每条反馈对应数组中的一个元素，id与反馈编号一致：
+        [
+            {{
+                "id": 反馈编号,
+                "type": "问题类型",
+                "summary": "问题摘要",
+                "severity": "严重程度",
+                "entities": ["实体列表"],
+                "sentiment": "情感倾向"
+            }}
+        ]
+        
+        问题类型选项：技术问题、服务态度、价格异议、功能建议、其他
+        严重程度选项：高、中、低
+        情感倾向选项：正面、中性、负面
+        只返回JSON数组，不要包含其他内容。
+        """
+            
+            messages = [
+                {"role": "system", "content": "你是一个客户反馈分析助手，擅长分析客户反馈内容并提取关键信息。"},
+                {"role": "user", "content": prompt}
+            ]
+            
+            # 调用大模型
+            start_time = time.perf_counter()
+            response = self.call_llm(
+                messages,
+                temperature=0.5,
+                max_tokens=self.BATCH_OUTPUT_TOKENS_PER_ITEM * len(pending) + 100
+            )
+            
+            if response and 'choices' in response and len(response['choices']) > 0:
+                analysis_cache.record_llm_call(
+                    time.perf_counter() - start_time,
+                    response.get('usage', {}).get('total_tokens', 0),
+                    items=len(pending)
+                )
+                result_text = response['choices'][0]['message']['content']
+                for item_id, item in self._parse_batch_results(result_text).items():
+                    if 1 <= item_id <= len(pending):
+                        i = pending[item_id - 1]
+                        results[i] = item
+                        analysis_cache.put(feedback_texts[i], cache_version, item)
+        
+        # 批量结果中缺失或不合法的条目单独分析
+        for i, result in enumerate(results):
+            if result is None:
+                results[i] = self._analyze_uncached(feedback_texts[i], cache_version)
+        return results
+    
+    def iter_batches(self, feedback_texts, batch_size=None, token_budget=None):
+        """
+        按条数上限和token预算把反馈分组，供analyze_feedback_batch使用
+        
+        参数:
+            feedback_texts: 反馈文本的可迭代对象
+            batch_size: 每批最多条数，默认读取配置LLM_BATCH_SIZE
+            token_budget: 每批请求（输入加预留输出）的token预算，默认读取配置LLM_BATCH_TOKEN_BUDGET
+        
+        返回:
+            生成器，依次产出反馈文本列表
+        """
+        if batch_size is None:
+            batch_size = current_app.config.get('LLM_BATCH_SIZE', 20)
+        if token_budget is None:
+            token_budget = current_app.config.get('LLM_BATCH_TOKEN_BUDGET', 6000)
+        
+        batch = []
+        batch_tokens = self.BATCH_PROMPT_OVERHEAD_TOKENS
+        for text in feedback_texts:
+            item_tokens = self._estimate_tokens(text) + self.BATCH_OUTPUT_TOKENS_PER_ITEM
+            if batch and (len(batch) >= batch_size or batch_tokens + item_tokens > token_budget):
+                yield batch
+                batch = []
+                batch_tokens = self.BATCH_PROMPT_OVERHEAD_TOKENS
+            batch.append(text)
+            batch_tokens += item_tokens
+        if batch:
+            yield batch
+    
+    def _estimate_tokens(self, text):
+        # 粗略估算token数：中文等非ASCII字符约1个token，ASCII字符约4个一个token
+        ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+        return (len(text) - ascii_chars) + ascii_chars // 4 + 1
+    
+    def _parse_batch_results(self, result_text):
+        """
+        解析批量分析返回的JSON数组
+        
+        返回:
+            {反馈编号: 分析结果字典}，只包含校验通过的条目
+        """
+        items = llm_response_parser.parse_array(result_text)
+        if items is None:
+            print(f"LLM批量输出解析失败: {result_text}")
+            return {}
+        
+        parsed = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                item_id = int(item.pop('id'))
+            except (KeyError, TypeError, ValueError):
+                continue
+            item = self._validate_analysis(item)
+            if item is not None:
+                parsed[item_id] = item
+        return parsed
+    
+    def _validate_analysis(self, result):
+        """
+        校验单条分析结果，问题类型和摘要必须合法，严重程度和情感倾向不合法时使用默认值
+        
+        返回:
+            校验后的分析结果字典，不合法时返回None
+        """
+        summary = result.get('summary')
+        if result.get('type') not in self.TYPE_OPTIONS or not isinstance(summary, str) or not summary.strip():
+            return None
+        entities = result.get('entities')
+        return {
+            'type': result['type'],
+            'summary': summary.strip(),
+            'severity': result.get('severity') if result.get('severity') in self.SEVERITY_OPTIONS else '中',
+            'entities': entities if isinstance(entities, list) else [],
+            'sentiment': result.get('sentiment') if result.get('sentiment') in self.SENTIMENT_OPTIONS else '中性'
+        }
+    
     def generate_summary(self, text):
         """
         生成文本摘要
@@ -140,40 +447,75 @@ class LLMInterface:
             return response['choices'][0]['message']['content'].strip()
         
         # 如果调用失败，返回默认的模拟摘要
-        if len(text) <= 50:
-            return text
-        return text[:50] + '...'
+        return truncate_summary(text)
     
-    def find_similar_problems(self, summary, existing_problems):
+    def generate_report_summary(self, report, start_date, end_date):
         """
-        查找相似问题
+        根据汇总统计数据生成分析报告的文字总结
         
         参数:
-            summary: 问题摘要
-            existing_problems: 现有问题列表
+            report: analytics.report返回的报表字典
+            start_date, end_date: 报表的起止日期
         
         返回:
-            最相似的问题，如果没有找到则返回None
+            HTML格式的总结（若干<p>段落，已经过sanitize_summary_html清理），调用失败时返回None
         """
-        # 如果没有问题，直接返回None
-        if not existing_problems:
-            return None
+        type_lines = '\n'.join(
+            f'- {label}: {value}条'
+            for label, value in zip(report['typeDistribution']['labels'], report['typeDistribution']['values'])
+        )
+        severity_lines = '\n'.join(
+            f'- {label}: {value}条'
+            for label, value in zip(report['severityDistribution']['labels'], report['severityDistribution']['values'])
+        )
+        trend_lines = '\n'.join(
+            f'- {day}: {count}条'
+            for day, count in zip(report['timeTrend']['dates'], report['timeTrend']['counts'])
+        )
+        problem_lines = '\n'.join(
+            f"{problem['rank']}. {problem['summary']}（{problem['type']}，严重程度{problem['severity']}，{problem['count']}条反馈）"
+            for problem in report['highFrequencyProblems']
+        ) or '无'
+        
+        # 构建提示词
+        prompt = f"""以下是{start_date}至{end_date}期间客户反馈的统计数据：
+        
+        问题类型分布：
+        {type_lines}
+        
+        严重程度分布：
+        {severity_lines}
+        
+        反馈数量趋势（按{report['timeTrend']['granularity']}统计）：
+        {trend_lines}
         
-        # 在实际应用中，这里应该调用大模型进行语义相似度计算
-        # 这里使用简单的关键词匹配作为模拟实现
-        for problem in existing_problems:
-            # 检查是否有共同的关键词
-            problem_words = set(problem.summary.lower())
-            summary_words = set(summary.lower())
-            # 如果有超过3个共同字符，认为是类似问题
-            if len(problem_words.intersection(summary_words)) > 3:
-                return problem
+        高频问题：
+        {problem_lines}
         
+        请根据以上数据撰写一份分析总结，指出主要问题、变化趋势和改进建议。
+        使用3-5个HTML段落（<p>标签），重点内容可使用<strong>标签，不要使用其他标签，不要输出HTML以外的内容。
+        """
+        
+        messages = [
+            {"role": "system", "content": "你是一个客户反馈分析专家，擅长根据统计数据撰写简洁、有洞察的分析总结。"},
+            {"role": "user", "content": prompt}
+        ]
+        
+        # 调用大模型
+        response = self.call_llm(messages, temperature=0.5, max_tokens=800)
+        
+        if response and 'choices' in response and len(response['choices']) > 0:
+            content = response['choices'][0]['message']['content'].strip()
+            # 去掉模型可能添加的代码块标记
+            if content.startswith('```'):
+                content = content.strip('`')
+                content = content[content.find('\n') + 1:] if content.startswith('html') else content
+            return sanitize_summary_html(content.strip()) or None
         return None
     
     def _get_default_analysis(self, feedback_text):
         """
-        获取默认的模拟分析结果
+        大模型调用失败或输出无法解析时的本地分析结果：关键词分类加截断摘要，不再请求大模型
         
         参数:
             feedback_text: 客户反馈文本
@@ -181,36 +523,12 @@ class LLMInterface:
         返回:
             默认的分析结果字典
         """
-        # 示例：根据关键词判断问题类型
-        problem_type = '其他'
-        if '登录' in feedback_text or '账号' in feedback_text or '密码' in feedback_text:
-            problem_type = '技术问题'
-        elif '客服' in feedback_text or '服务' in feedback_text or '响应' in feedback_text:
-            problem_type = '服务态度'
-        elif '价格' in feedback_text or '收费' in feedback_text or '贵' in feedback_text:
-            problem_type = '价格异议'
-        elif '功能' in feedback_text or '建议' in feedback_text or '希望' in feedback_text:
-            problem_type = '功能建议'
-        
-        # 默认严重程度
-        severity = '中'
-        if '无法' in feedback_text or '不能' in feedback_text or '失败' in feedback_text:
-            severity = '高'
-        
-        # 默认情感倾向
-        sentiment = '中性'
-        if '满意' in feedback_text or '很好' in feedback_text or '不错' in feedback_text:
-            sentiment = '正面'
-        elif '不满意' in feedback_text or '糟糕' in feedback_text or '差' in feedback_text:
-            sentiment = '负面'
-        
-        return {
-            'type': problem_type,
-            'summary': self.generate_summary(feedback_text),
-            'severity': severity,
-            'entities': [],
-            'sentiment': sentiment
-        }
+        feedback_classifier.record('fallback')
+        if self.circuit_breaker.is_open():
+            self.circuit_breaker.record_degraded()
+        result, _ = feedback_classifier.classify(feedback_text)
+        result['summary'] = truncate_summary(feedback_text)
+        return result
 
 # 创建全局的LLM接口实例
 llm_interface = LLMInterface()
\ No newline at end of file
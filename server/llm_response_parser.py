@@ -0,0 +1,217 @@
+import json
+import re
+import threading
+
+# 代码块标记，如 ```json ... ```
+FENCE_PATTERN = re.compile(r'```[A-Za-z]*[ \t]*\n?(.*?)(?:```|$)', re.S)
+
+# 字符串外出现时按JSON结构符号处理的全角标点
+FULLWIDTH_PUNCTUATION = {'：': ':', '，': ',', '｛': '{', '｝': '}', '［': '[', '］': ']'}
+
+# 成对的全角引号：开引号 -> 可以结束该字符串的引号
+FULLWIDTH_QUOTES = {'“': '”"', '”': '”"', '＂': '＂"'}
+
+CLOSERS = {'{': '}', '[': ']'}
+
+
+def strip_code_fences(text):
+    """
+    取出代码块中的内容，没有代码块时返回原文
+    """
+    blocks = FENCE_PATTERN.findall(text)
+    return '\n'.join(blocks) if blocks else text
+
+
+def iter_json_candidates(text, openers='{['):
+    """
+    按括号配对扫描文本，依次产出完整的JSON对象/数组片段（跳过字符串中的括号）。
+
+    输出被截断、最外层没有闭合时，截取到最后一个完整的元素并补上闭合括号。
+    """
+    position = 0
+    while position < len(text):
+        start = next((i for i in range(position, len(text)) if text[i] in openers), None)
+        if start is None:
+            return
+        stack = []
+        in_string = False
+        escape = False
+        last_complete = None
+        end = None
+        for i in range(start, len(text)):
+            ch = text[i]
+            if in_string:
+                if escape:
+                    escape = False
+                elif ch == '\\':
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+                continue
+            if ch == '"':
+                in_string = True
+            elif ch in CLOSERS:
+                stack.append(CLOSERS[ch])
+            elif ch in '}]':
+                if not stack or ch != stack[-1]:
+                    break
+                stack.pop()
+                if not stack:
+                    end = i + 1
+                    break
+                if len(stack) == 1:
+                    last_complete = i + 1
+        if end is not None:
+            yield text[start:end]
+            position = end
+        else:
+            if last_complete is not None:
+                yield text[start:last_complete] + CLOSERS[text[start]]
+            position = start + 1
+
+
+def repair_json(text):
+    """
+    修复大模型输出中常见的JSON格式错误：全角引号和标点、单引号字符串、多余的尾随逗号
+    """
+    out = []
+    closing = None  # 当前字符串的结束引号，None表示在字符串外
+    escape = False
+    for ch in text:
+        if closing is not None:
+            if escape:
+                escape = False
+                out.append(ch)
+            elif ch == '\\':
+                escape = True
+                out.append(ch)
+            elif ch in closing:
+                closing = None
+                out.append('"')
+            elif ch == '"':
+                # 全角或单引号字符串中的ASCII双引号需要转义
+                out.append('\\"')
+            else:
+                out.append(ch)
+            continue
+
+        if ch == '"':
+            closing = '"'
+            out.append(ch)
+        elif ch in FULLWIDTH_QUOTES:
+            closing = FULLWIDTH_QUOTES[ch]
+            out.append('"')
+        elif ch == "'":
+            closing = "'"
+            out.append('"')
+        else:
+            ch = FULLWIDTH_PUNCTUATION.get(ch, ch)
+            if ch in '}]':
+                # 去掉闭合括号前的尾随逗号
+                i = len(out) - 1
+                while i >= 0 and out[i].isspace():
+                    i -= 1
+                if i >= 0 and out[i] == ',':
+                    del out[i]
+            out.append(ch)
+    return ''.join(out)
+
+
+class LLMResponseParser:
+    """
+    大模型回复的JSON解析器：去掉代码块标记，按括号配对找出JSON片段，直接解析失败时修复常见错误后重试，
+    并按调用方给出的校验函数检查结构。
+
+    统计直接解析成功、修复后成功、解析失败和结构不合法的回复数，用于观察解析成功率。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {
+            'parsed': 0,
+            'repaired': 0,
+            'failed': 0,
+            'schemaRejected': 0
+        }
+
+    def parse_object(self, text, validate=None):
+        """
+        从回复中取出第一个合法的JSON对象
+
+        参数:
+            text: 大模型回复文本
+            validate: 可选的校验函数，接收解析出的字典，返回校验后的字典或None
+
+        返回:
+            校验后的字典，没有合法对象时返回None
+        """
+        rejected = False
+        for value, repaired in self._iter_values(text, '{'):
+            if not isinstance(value, dict):
+                continue
+            if validate is not None:
+                value = validate(value)
+                if value is None:
+                    rejected = True
+                    continue
+            self._count('repaired' if repaired else 'parsed')
+            return value
+        self._count('schemaRejected' if rejected else 'failed')
+        return None
+
+    def parse_array(self, text):
+        """
+        从回复中取出JSON对象数组（跳过说明文字中如[2]这样不含对象的数组）。
+        回复为 {"results": [...]} 形式或多个独立对象时同样返回列表
+
+        返回:
+            列表，解析失败时返回None
+        """
+        objects = []
+        any_repaired = False
+        for value, repaired in self._iter_values(text, '[{'):
+            if isinstance(value, list) and any(isinstance(item, dict) for item in value):
+                self._count('repaired' if repaired else 'parsed')
+                return value
+            if isinstance(value, dict):
+                lists = [item for item in value.values() if isinstance(item, list)]
+                if len(lists) == 1 and len(value) == 1:
+                    self._count('repaired' if repaired else 'parsed')
+                    return lists[0]
+                objects.append(value)
+                any_repaired = any_repaired or repaired
+        if objects:
+            self._count('repaired' if any_repaired else 'parsed')
+            return objects
+        self._count('failed')
+        return None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        total = sum(stats.values())
+        stats['total'] = total
+        stats['successRate'] = round((stats['parsed'] + stats['repaired']) / total, 4) if total else 0.0
+        return stats
+
+    def _iter_values(self, text, openers):
+        # 依次产出 (解析出的值, 是否经过修复)
+        text = strip_code_fences(text or '')
+        for candidate in iter_json_candidates(text, openers):
+            try:
+                yield json.loads(candidate, strict=False), False
+                continue
+            except json.JSONDecodeError:
+                pass
+            try:
+                yield json.loads(repair_json(candidate), strict=False), True
+            except json.JSONDecodeError:
+                continue
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+
+# 创建全局的回复解析器
+llm_response_parser = LLMResponseParser()
@@ -0,0 +1,201 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+
+# 需要重试的HTTP状态码：限流和服务端临时错误
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """
+    令牌桶限流器，每分钟补充rate_per_minute个令牌，桶容量默认等于每分钟配额
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        """
+        取出amount个令牌，令牌不足时阻塞等待
+
+        返回:
+            等待的秒数
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def adjust(self, amount):
+        """
+        按实际消耗修正令牌数，amount为正表示多扣，允许出现负余额以便后续请求等待
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class LLMTransport:
+    """
+    大模型HTTP传输层：复用连接池的Session、连接/读取超时、429/5xx指数退避重试（遵守Retry-After），
+    以及按请求数（RPM）和token数（TPM）的客户端限流
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session = None
+        self._request_bucket = None
+        self._token_bucket = None
+        self._stats = {
+            'requests': 0,
+            'retries': 0,
+            'failures': 0,
+            'throttledSeconds': 0.0
+        }
+
+    def post(self, url, headers, payload, estimated_tokens=0, stream=False):
+        """
+        发送POST请求，失败时按配置重试
+
+        参数:
+            url: 接口地址
+            headers: 请求头
+            payload: 请求体（dict，序列化为JSON）
+            estimated_tokens: 本次请求预计消耗的token数，用于TPM限流
+            stream: 是否以流式方式读取响应体，为True时调用方负责读取并关闭响应
+
+        返回:
+            requests.Response，重试次数用尽后返回最后一次响应；连接错误重试用尽时抛出异常
+        """
+        session = self._get_session()
+        max_retries = current_app.config.get('LLM_MAX_RETRIES', 3)
+        timeout = (current_app.config.get('LLM_CONNECT_TIMEOUT', 5), current_app.config.get('LLM_READ_TIMEOUT', 60))
+
+        attempt = 0
+        while True:
+            self._throttle(estimated_tokens)
+            with self._lock:
+                self._stats['requests'] += 1
+            try:
+                response = session.post(url, headers=headers, json=payload, timeout=timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= max_retries:
+                    self._count('failures')
+                    raise
+                self._count('retries')
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+                if response.status_code != 200:
+                    self._count('failures')
+                elif not stream:
+                    # 流式响应的token用量在读完响应后才知道，不修正令牌桶
+                    self._record_usage(response, estimated_tokens)
+                return response
+
+            self._count('retries')
+            delay = self._retry_after(response)
+            # 流式响应不会自动读完，重试前关闭以归还连接池中的连接
+            response.close()
+            time.sleep(delay if delay is not None else self._backoff(attempt))
+            attempt += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['throttledSeconds'] = round(stats['throttledSeconds'], 2)
+        stats['poolSize'] = self._pool_size()
+        stats['rateLimitRpm'] = current_app.config.get('LLM_RATE_LIMIT_RPM', 0)
+        stats['rateLimitTpm'] = current_app.config.get('LLM_RATE_LIMIT_TPM', 0)
+        return stats
+
+    def _get_session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    # 连接池大小与导入并发数一致，避免并发请求时反复新建TCP+TLS连接
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self._pool_size(), pool_block=True)
+                    session = requests.Session()
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+                    rpm = current_app.config.get('LLM_RATE_LIMIT_RPM', 0)
+                    tpm = current_app.config.get('LLM_RATE_LIMIT_TPM', 0)
+                    self._request_bucket = TokenBucket(rpm) if rpm > 0 else None
+                    self._token_bucket = TokenBucket(tpm) if tpm > 0 else None
+        return self._session
+
+    def _pool_size(self):
+        return current_app.config.get('LLM_POOL_SIZE') or (
+            current_app.config.get('IMPORT_CONCURRENCY', 8) * current_app.config.get('IMPORT_WORKERS', 2)
+        )
+
+    def _throttle(self, estimated_tokens):
+        waited = 0.0
+        if self._request_bucket:
+            waited += self._request_bucket.acquire(1)
+        if self._token_bucket and estimated_tokens:
+            waited += self._token_bucket.acquire(estimated_tokens)
+        if waited:
+            with self._lock:
+                self._stats['throttledSeconds'] += waited
+
+    def _record_usage(self, response, estimated_tokens):
+        # 按响应中实际的token用量修正TPM令牌桶
+        if not self._token_bucket:
+            return
+        try:
+            total_tokens = response.json().get('usage', {}).get('total_tokens')
+        except ValueError:
+            return
+        if total_tokens:
+            self._token_bucket.adjust(total_tokens - estimated_tokens)
+
+    def _backoff(self, attempt):
+        # 指数退避加全抖动，避免大量并发请求同时重试
+        base = current_app.config.get('LLM_BACKOFF_BASE', 1.0)
+        cap = current_app.config.get('LLM_BACKOFF_MAX', 30.0)
+        return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+    def _retry_after(self, response):
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(max(delay, 0.0), current_app.config.get('LLM_RETRY_AFTER_MAX', 60.0))
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+
+# 创建全局的大模型传输层
+llm_transport = LLMTransport()
@@ -0,0 +1,199 @@
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from ocr_worker import check_engine, recognize_image
+
+# 支持识别的图片扩展名
+IMAGE_EXTENSIONS = ('jpg', 'jpeg', 'png', 'bmp', 'tif', 'tiff', 'webp', 'gif')
+
+
+def _extension(name):
+    return os.path.splitext(name or '')[1].lstrip('.').lower()
+
+
+def iter_upload_images(files):
+    """
+    展开上传的图片和zip压缩包，逐张产出图片内容
+
+    参数:
+        files: 上传的FileStorage对象列表
+
+    返回:
+        生成器，产出 (图片名称, 字节内容)；图片数或单张图片大小超过配置上限时抛出ValueError
+    """
+    max_images = current_app.config.get('OCR_MAX_IMAGES', 50)
+    max_bytes = current_app.config.get('OCR_MAX_IMAGE_BYTES', 20 * 1024 * 1024)
+    count = 0
+
+    def check(name, size):
+        nonlocal count
+        count += 1
+        if count > max_images:
+            raise ValueError(f'单次最多识别 {max_images} 张图片')
+        if size > max_bytes:
+            raise ValueError(f'图片 {name} 超过 {max_bytes // (1024 * 1024)}MB')
+
+    for file in files:
+        if _extension(file.filename) == 'zip':
+            try:
+                archive = zipfile.ZipFile(file.stream)
+            except zipfile.BadZipFile:
+                raise ValueError(f'无法读取压缩包 {file.filename}')
+            with archive:
+                for info in archive.infolist():
+                    # 跳过目录、macOS的资源文件和非图片文件
+                    if info.is_dir() or info.filename.startswith('__MACOSX/') or _extension(info.filename) not in IMAGE_EXTENSIONS:
+                        continue
+                    # 按解压后的大小检查，避免压缩炸弹
+                    check(info.filename, info.file_size)
+                    yield info.filename, archive.read(info)
+        else:
+            data = file.read()
+            check(file.filename, len(data))
+            yield file.filename, data
+
+
+def split_text_lines(text):
+    """
+    把识别出的文本拆分为反馈行，去掉空白行和过短的噪声行
+    """
+    min_chars = current_app.config.get('OCR_MIN_LINE_CHARS', 2)
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        # 中文识别结果中字符之间常带有多余空格
+        line = ' '.join(line.split())
+        if len(line.replace(' ', '')) >= min_chars:
+            lines.append(line)
+    return lines
+
+
+class OCRPipeline:
+    """
+    本地图片文字识别：图片在OCR_WORKERS个子进程中解码一次、按OCR_MAX_SIDE缩小后交给OCR引擎识别，
+    CPU密集的识别不占用Flask工作线程的GIL。
+
+    OCR引擎由OCR_ENGINE配置，默认使用Tesseract（OCR_LANG默认chi_sim+eng），
+    也可以配置为“模块:类名”使用实现了recognize(image)方法的自定义引擎。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._checked_engine = None
+
+    def check_available(self):
+        """
+        检查OCR依赖是否可用，不可用时抛出RuntimeError
+        """
+        engine = current_app.config.get('OCR_ENGINE', 'tesseract')
+        if self._checked_engine != engine:
+            check_engine(engine)
+            self._checked_engine = engine
+
+    def recognize(self, images):
+        """
+        并行识别多张图片
+
+        参数:
+            images: (图片名称, 字节内容) 的可迭代对象
+
+        返回:
+            (识别出的反馈行列表, 识别报告)，报告包含每张图片的行数、错误和各阶段耗时（毫秒）
+        """
+        self.check_available()
+        options = {
+            'engine': current_app.config.get('OCR_ENGINE', 'tesseract'),
+            'lang': current_app.config.get('OCR_LANG', 'chi_sim+eng'),
+            'max_side': current_app.config.get('OCR_MAX_SIDE', 2000)
+        }
+        executor = self._get_executor()
+
+        start = time.perf_counter()
+        futures = []
+        read_seconds = 0.0
+        read_start = time.perf_counter()
+        for name, data in images:
+            read_seconds += time.perf_counter() - read_start
+            try:
+                future = executor.submit(recognize_image, data, options)
+            except BrokenProcessPool:
+                # 进程池在两次请求之间已损坏（子进程崩溃），重建后重新提交
+                self._reset_executor(executor)
+                executor = self._get_executor()
+                future = executor.submit(recognize_image, data, options)
+            futures.append((name, future))
+            read_start = time.perf_counter()
+
+        lines = []
+        items = []
+        totals = {'read': read_seconds, 'decode': 0.0, 'resize': 0.0, 'ocr': 0.0}
+        for name, future in futures:
+            try:
+                text, timings = future.result()
+            except BrokenProcessPool as e:
+                # 子进程崩溃（如Tesseract段错误、内存不足）后进程池不可再用，丢弃以便下次请求重建
+                self._reset_executor(executor)
+                items.append({'name': name, 'lines': 0, 'error': str(e)})
+                continue
+            except Exception as e:
+                items.append({'name': name, 'lines': 0, 'error': str(e)})
+                continue
+            image_lines = split_text_lines(text)
+            lines.extend(image_lines)
+            for stage, seconds in timings.items():
+                totals[stage] += seconds
+            items.append({
+                'name': name,
+                'lines': len(image_lines),
+                'error': None,
+                'timings': {stage: round(seconds * 1000, 1) for stage, seconds in timings.items()}
+            })
+        totals['wall'] = time.perf_counter() - start
+
+        report = {
+            'images': len(items),
+            'failed': sum(1 for item in items if item['error']),
+            'lines': len(lines),
+            'workers': self._max_workers(),
+            # decode/resize/ocr为各子进程耗时之和，wall为识别的实际耗时
+            'timings': {stage: round(seconds * 1000, 1) for stage, seconds in totals.items()},
+            'items': items
+        }
+        return lines, report
+
+    def _max_workers(self):
+        return max(1, current_app.config.get('OCR_WORKERS', 0) or (os.cpu_count() or 2) // 2)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # 使用forkserver启动子进程：在多线程的工作进程中直接fork可能复制到其他线程持有的锁；
+                # spawn和默认的forkserver会在子进程中重新导入主模块及其依赖的全部应用模块，
+                # 因此forkserver只预加载不依赖应用模块的ocr_worker
+                if 'forkserver' in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context('forkserver')
+                    context.set_forkserver_preload(['ocr_worker'])
+                else:
+                    context = multiprocessing.get_context('spawn')
+                self._executor = ProcessPoolExecutor(max_workers=self._max_workers(), mp_context=context)
+            return self._executor
+
+    def _reset_executor(self, executor):
+        """
+        丢弃已损坏的进程池，仅当缓存的仍是该进程池时才清除，避免误关其他线程刚重建的进程池
+        """
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False)
+
+
+# 创建全局的图片识别流水线
+ocr_pipeline = OCRPipeline()
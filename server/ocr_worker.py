@@ -0,0 +1,112 @@
+"""
+在OCR进程池的子进程中执行的图片识别代码。
+
+本模块不导入app等应用模块，子进程只加载图片处理和OCR引擎所需的依赖。
+"""
+import importlib
+import io
+import time
+
+# 子进程中缓存的OCR引擎，{引擎名称: 引擎对象}
+_engines = {}
+
+
+class TesseractEngine:
+    """
+    基于Tesseract的本地OCR引擎（需要安装pytesseract和Tesseract，中文识别需要chi_sim语言包）
+    """
+
+    def __init__(self, lang='chi_sim+eng', config=''):
+        import pytesseract
+        self._pytesseract = pytesseract
+        self.lang = lang
+        self.config = config
+
+    def recognize(self, image):
+        """
+        识别PIL图片中的文字，返回识别出的文本
+        """
+        return self._pytesseract.image_to_string(image, lang=self.lang, config=self.config)
+
+
+# 内置的OCR引擎，OCR_ENGINE也可以配置为“模块:类名”使用自定义引擎（类需要实现recognize(image)方法）
+ENGINES = {
+    'tesseract': TesseractEngine
+}
+
+
+def check_engine(name):
+    """
+    检查图片处理依赖和OCR引擎是否可用，不可用时抛出RuntimeError
+    """
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        raise RuntimeError('图片识别需要安装Pillow')
+    if name == 'tesseract':
+        try:
+            import pytesseract
+            pytesseract.get_tesseract_version()
+        except ImportError:
+            raise RuntimeError('图片识别需要安装pytesseract')
+        except Exception:
+            raise RuntimeError('未找到Tesseract，请安装Tesseract及chi_sim语言包')
+    else:
+        _engine_class(name)
+
+
+def recognize_image(data, options):
+    """
+    解码、缩放并识别一张图片
+
+    参数:
+        data: 图片文件的字节内容
+        options: {'engine', 'lang', 'max_side'}
+
+    返回:
+        (识别出的文本, {'decode', 'resize', 'ocr'}各阶段耗时（秒）)
+    """
+    from PIL import Image, ImageOps
+
+    timings = {}
+    start = time.perf_counter()
+    image = Image.open(io.BytesIO(data))
+    max_side = options.get('max_side') or 0
+    if max_side:
+        # JPEG在解码时直接按1/2、1/4、1/8缩小，大图不需要先完整解码再缩放
+        image.draft('L', (max_side, max_side))
+    image.load()
+    timings['decode'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    image = ImageOps.exif_transpose(image)
+    image = image.convert('L')
+    if max_side and max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+    timings['resize'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    text = _get_engine(options).recognize(image)
+    timings['ocr'] = time.perf_counter() - start
+    return text, timings
+
+
+def _get_engine(options):
+    name = options.get('engine') or 'tesseract'
+    key = (name, options.get('lang'))
+    if key not in _engines:
+        engine_class = _engine_class(name)
+        _engines[key] = engine_class(lang=options['lang']) if options.get('lang') else engine_class()
+    return _engines[key]
+
+
+def _engine_class(name):
+    if name in ENGINES:
+        return ENGINES[name]
+    if ':' in name:
+        module_name, class_name = name.split(':', 1)
+        try:
+            return getattr(importlib.import_module(module_name), class_name)
+        except (ImportError, AttributeError) as e:
+            raise RuntimeError(f'无法加载OCR引擎 {name}: {e}')
+    raise RuntimeError(f'不支持的OCR引擎: {name}')
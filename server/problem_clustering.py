@@ -0,0 +1,187 @@
+import threading
+from datetime import datetime
+import numpy as np
+from sqlalchemy import delete, select, update
+from flask import current_app
+from database import db, increment_counts, Feedback, Problem, FeedbackExample, ProblemStat
+from problem_counters import problem_counters
+from embedding_index import embedding_index
+from response_cache import response_cache
+
+
+def find_duplicate_groups(problem_ids, vectors, threshold, order=None):
+    """
+    找出向量相似度达到阈值的问题组：按order依次取尚未分组的问题作为中心，与中心相似度达到阈值的
+    其余未分组问题归入该组。组内每个问题都与中心相似，相似关系不按传递性链式合并
+
+    参数:
+        problem_ids: problem_id数组
+        vectors: 与problem_ids对应的已归一化向量矩阵
+        threshold: 余弦相似度阈值
+        order: 选取中心的顺序（problem_ids的下标），默认按problem_ids的顺序；
+               按合并时保留问题的优先级排列时，每组的中心就是保留的问题
+
+    返回:
+        [[problem_id, ...], ...]，每组至少两个问题，中心在第一个
+    """
+    count = len(problem_ids)
+    neighbors = [[] for _ in range(count)]
+
+    # 分块计算上三角的相似度矩阵，每块只保留达到阈值的位置，单块得分矩阵不超过约1600万个元素
+    block = max(1, min(1024, 16 * 1024 * 1024 // max(1, count)))
+    for start in range(0, count, block):
+        end = min(start + block, count)
+        scores = vectors[start:end].astype(np.float32) @ vectors[start:].astype(np.float32).T
+        rows, cols = np.nonzero(scores >= threshold)
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            i, j = start + row, start + col
+            if i < j:
+                neighbors[i].append(j)
+                neighbors[j].append(i)
+
+    assigned = [False] * count
+    groups = []
+    for center in (range(count) if order is None else order):
+        if assigned[center]:
+            continue
+        assigned[center] = True
+        group = [int(problem_ids[center])]
+        for other in neighbors[center]:
+            if not assigned[other]:
+                assigned[other] = True
+                group.append(int(problem_ids[other]))
+        if len(group) > 1:
+            groups.append(group)
+    return groups
+
+
+def merge_problems(problem_ids):
+    """
+    把一组重复问题合并到反馈次数最多的问题上：反馈、反馈示例和统计行转移过去，其余问题删除。
+    在一个事务中完成。
+
+    返回:
+        保留的problem_id
+    """
+    # 先把分片中尚未合并的增量计入各问题，再锁定问题行，避免与并发导入的累加交错
+    problem_counters.fold(problem_ids)
+    problems = Problem.query.filter(Problem.id.in_(problem_ids)).with_for_update().all()
+    if len(problems) < 2:
+        return problems[0].id if problems else None
+    problems.sort(key=lambda problem: (-(problem.feedback_count or 0), problem.id))
+    keeper, duplicates = problems[0], problems[1:]
+    duplicate_ids = [problem.id for problem in duplicates]
+
+    db.session.execute(update(Feedback).where(Feedback.problem_id.in_(duplicate_ids)).values(problem_id=keeper.id))
+    db.session.execute(
+        update(FeedbackExample).where(FeedbackExample.problem_id.in_(duplicate_ids)).values(problem_id=keeper.id)
+    )
+
+    # 统计行按时间桶累加到保留的问题上
+    stat_rows = db.session.execute(
+        select(ProblemStat.period, ProblemStat.bucket_date, ProblemStat.feedback_count)
+        .where(ProblemStat.problem_id.in_(duplicate_ids))
+    ).all()
+    db.session.execute(delete(ProblemStat).where(ProblemStat.problem_id.in_(duplicate_ids)))
+    increment_counts(
+        ProblemStat,
+        [
+            {'period': period, 'bucket_date': bucket_date, 'problem_id': keeper.id, 'feedback_count': count}
+            for period, bucket_date, count in stat_rows
+        ],
+        ('period', 'bucket_date', 'problem_id')
+    )
+
+    # 原子累加，不覆盖读取之后其他导入进程对保留问题的累加
+    problem_counters.increment({keeper.id: sum(problem.feedback_count or 0 for problem in duplicates)})
+    keeper.update_time = datetime.now()
+    for problem in duplicates:
+        # 删除时触发索引事件，相似度索引同步移除
+        db.session.delete(problem)
+    db.session.commit()
+    return keeper.id
+
+
+class ProblemReclusterJob:
+    """
+    离线重新聚类任务：在后台线程中用向量相似度找出随时间堆积的重复问题并合并
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._status = {'status': 'idle'}
+
+    def start(self, threshold=None, dry_run=False):
+        """
+        启动任务，已有任务在运行时返回False
+        """
+        if threshold is None:
+            threshold = current_app.config.get('RECLUSTER_THRESHOLD', 0.85)
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._status = {
+                'status': 'running',
+                'threshold': threshold,
+                'dryRun': dry_run,
+                'startTime': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+            # 后台线程没有应用上下文，传入应用对象供线程内创建
+            app = current_app._get_current_object()
+            self._thread = threading.Thread(target=self._run, args=(app, threshold, dry_run),
+                                            name='problem-recluster', daemon=True)
+            self._thread.start()
+        return True
+
+    def status(self):
+        with self._lock:
+            return dict(self._status)
+
+    def run(self, threshold, dry_run=False):
+        """
+        在当前线程中执行一次重新聚类，需要在应用上下文中调用
+
+        返回:
+            {'problems', 'groups', 'merged', 'examples'}，examples为前几组重复问题的id
+        """
+        problem_ids, vectors = embedding_index.snapshot()
+        # 按合并时选择保留问题的规则（反馈次数多的优先）选取每组的中心
+        counts = dict(db.session.execute(select(Problem.id, Problem.feedback_count)).all())
+        order = sorted(range(len(problem_ids)),
+                       key=lambda i: (-(counts.get(int(problem_ids[i])) or 0), int(problem_ids[i])))
+        groups = find_duplicate_groups(problem_ids, vectors, threshold, order)
+        merged = 0
+        if not dry_run:
+            for group in groups:
+                try:
+                    merge_problems(group)
+                    merged += len(group) - 1
+                except Exception as e:
+                    db.session.rollback()
+                    print(f'合并重复问题失败: {group}, {e}')
+            if merged:
+                response_cache.invalidate('feedback', 'problems')
+        embedding_index.save()
+        return {
+            'problems': int(len(problem_ids)),
+            'groups': len(groups),
+            'merged': merged,
+            'examples': groups[:10]
+        }
+
+    def _run(self, app, threshold, dry_run):
+        try:
+            with app.app_context():
+                result = self.run(threshold, dry_run)
+            status = {'status': 'completed', **result}
+        except Exception as e:
+            print(f'重新聚类失败: {e}')
+            status = {'status': 'failed', 'message': str(e)}
+        with self._lock:
+            self._status.update(status)
+            self._status['finishTime'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+# 创建全局的重新聚类任务
+recluster_job = ProblemReclusterJob()
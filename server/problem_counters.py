@@ -0,0 +1,149 @@
+import random
+import threading
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import delete, func, select, update
+from flask import current_app
+from database import db, increment_counts, Problem, ProblemCounterShard
+from response_cache import response_cache
+
+
+class ProblemCounters:
+    """
+    问题反馈次数的并发安全维护：计数一律用 feedback_count = feedback_count + n 的原子UPDATE累加，
+    多个导入进程同时累加同一问题也不会丢失更新；同一事务中按problem_id顺序更新，避免进程间相互死锁。
+
+    COUNTER_SHARDS大于1时，增量改为累加到problem_counter_shards中随机的一个分片行，
+    热门问题的并发导入分散到多行上，不再争抢problems表中同一行的行锁；后台线程每COUNTER_FOLD_INTERVAL秒
+    把分片增量合并到problems.feedback_count，问题列表中的反馈次数最多滞后一个合并周期。
+    """
+
+    def __init__(self):
+        self._app = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stats = {
+            'directUpdates': 0,
+            'shardIncrements': 0,
+            'folds': 0,
+            'foldedRows': 0
+        }
+
+    def start(self, app):
+        """
+        开启计数分片时启动后台合并线程，在app的应用上下文中合并
+        """
+        if app.config.get('COUNTER_SHARDS', 0) <= 1:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._app = app
+            self._thread = threading.Thread(target=self._run, name='counter-fold', daemon=True)
+        self._thread.start()
+
+    def increment(self, deltas, now=None):
+        """
+        在当前事务中累加问题的反馈次数（不提交事务）
+
+        参数:
+            deltas: {problem_id: 增量}
+            now: 问题的更新时间，默认为当前时间
+        """
+        items = sorted((problem_id, delta) for problem_id, delta in deltas.items() if delta)
+        if not items:
+            return
+        shards = current_app.config.get('COUNTER_SHARDS', 0)
+        if shards > 1:
+            increment_counts(
+                ProblemCounterShard,
+                [
+                    {'problem_id': problem_id, 'shard': random.randrange(shards), 'feedback_count': delta}
+                    for problem_id, delta in items
+                ],
+                ('problem_id', 'shard')
+            )
+            self._count('shardIncrements', len(items))
+            return
+        self._update_problems(items, now or datetime.now())
+        self._count('directUpdates', len(items))
+
+    def fold(self, problem_ids=None):
+        """
+        把分片增量合并到problems.feedback_count（不提交事务）
+
+        参数:
+            problem_ids: 只合并这些问题的分片，为None时合并全部
+
+        返回:
+            合并的分片行数
+        """
+        query = select(ProblemCounterShard.problem_id, ProblemCounterShard.shard, ProblemCounterShard.feedback_count)
+        if problem_ids is not None:
+            query = query.where(ProblemCounterShard.problem_id.in_(problem_ids))
+        rows = db.session.execute(
+            query.where(ProblemCounterShard.feedback_count != 0)
+            .order_by(ProblemCounterShard.problem_id, ProblemCounterShard.shard)
+        ).all()
+
+        totals = Counter()
+        for problem_id, shard, count in rows:
+            # 按读到的值相对扣减，合并期间其他进程累加到同一分片的增量保留到下次合并
+            db.session.execute(
+                update(ProblemCounterShard)
+                .where(ProblemCounterShard.problem_id == problem_id, ProblemCounterShard.shard == shard)
+                .values(feedback_count=ProblemCounterShard.feedback_count - count)
+            )
+            totals[problem_id] += count
+        self._update_problems(sorted(totals.items()), datetime.now())
+
+        cleanup = delete(ProblemCounterShard).where(ProblemCounterShard.feedback_count == 0)
+        if problem_ids is not None:
+            cleanup = cleanup.where(ProblemCounterShard.problem_id.in_(problem_ids))
+        db.session.execute(cleanup)
+        self._count('folds')
+        self._count('foldedRows', len(rows))
+        return len(rows)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['shards'] = current_app.config.get('COUNTER_SHARDS', 0)
+        stats['foldInterval'] = current_app.config.get('COUNTER_FOLD_INTERVAL', 5)
+        stats['pendingRows'], stats['pendingFeedback'] = db.session.execute(
+            select(func.count(), func.coalesce(func.sum(ProblemCounterShard.feedback_count), 0))
+        ).one()
+        return stats
+
+    def _update_problems(self, items, now):
+        for problem_id, delta in items:
+            db.session.execute(
+                update(Problem)
+                .where(Problem.id == problem_id)
+                .values(feedback_count=Problem.feedback_count + delta, update_time=now)
+            )
+
+    def _count(self, name, count=1):
+        with self._lock:
+            self._stats[name] += count
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self._app.config.get('COUNTER_FOLD_INTERVAL', 5))
+            self._wakeup.clear()
+            with self._app.app_context():
+                try:
+                    if self.fold():
+                        db.session.commit()
+                        # 问题列表缓存响应中的反馈次数已过期
+                        response_cache.invalidate('problems')
+                    else:
+                        db.session.rollback()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f'合并问题反馈次数失败: {e}')
+
+
+# 创建全局的问题计数器
+problem_counters = ProblemCounters()
@@ -0,0 +1,302 @@
+import math
+import threading
+import time
+from array import array
+from collections import Counter
+import numpy as np
+from sqlalchemy import event, inspect
+from flask import current_app
+from database import Problem
+
+# 倒排表不超过该长度的n-gram总是参与查询，问题数较少时不裁剪
+MIN_PRUNED_POSTINGS = 1000
+
+
+def extract_ngrams(text, sizes=(1, 2)):
+    """
+    提取文本的字符n-gram（默认一元和二元），忽略空白并统一小写
+
+    返回:
+        n-gram到出现次数的Counter
+    """
+    chars = ''.join(text.lower().split())
+    grams = Counter()
+    for n in sizes:
+        for i in range(len(chars) - n + 1):
+            grams[chars[i:i + n]] += 1
+    return grams
+
+
+class ProblemIndex:
+    """
+    问题摘要的字符n-gram TF-IDF相似度索引
+
+    倒排表以紧凑数组保存，查询时用NumPy对命中的倒排表做向量化累加，代价只与查询涉及的n-gram相关，
+    不再逐个比较全部问题。新增或修改问题时通过SQLAlchemy事件增量更新。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self._loaded = False
+        self._last_refresh = 0.0
+
+    def _reset(self):
+        self._gram_ids = {}
+        self._posting_rows = []  # gram id -> array('i')，包含该gram的行号
+        self._posting_tfs = []  # gram id -> array('f')，该gram在对应行中的词频
+        self._size = 0
+        self._capacity = 1024
+        self._row_problem_ids = np.zeros(self._capacity, dtype=np.int64)
+        self._row_norms = np.ones(self._capacity, dtype=np.float32)
+        self._row_alive = np.zeros(self._capacity, dtype=bool)
+        self._problem_rows = {}  # problem_id -> 当前有效的行号
+        self._dead_rows = 0
+        self._max_problem_id = 0
+        self._norms_doc_count = 0  # 上次按当前IDF重算向量模长时的问题数
+
+    def __len__(self):
+        return len(self._problem_rows)
+
+    def add(self, problem_id, summary):
+        """
+        新增或更新一个问题的摘要，旧的行会被标记为失效
+        """
+        with self._lock:
+            self._remove_row(problem_id)
+            self._append_row(problem_id, summary or '')
+            self._max_problem_id = max(self._max_problem_id, problem_id)
+            # 失效行过多时重建，避免倒排表无限膨胀
+            if self._dead_rows > 1024 and self._dead_rows > self._size // 2:
+                self._compact()
+            # 问题数增长后IDF随之变化，按几何间隔重算所有行的模长，均摊代价为常数
+            elif len(self._problem_rows) > self._norms_doc_count * 2 + 8:
+                self._recompute_norms()
+
+    def remove(self, problem_id):
+        with self._lock:
+            self._remove_row(problem_id)
+
+    def find_similar(self, summary, threshold=None):
+        """
+        查找与摘要最相似的问题
+
+        参数:
+            summary: 问题摘要
+            threshold: 余弦相似度阈值，默认读取配置SIMILARITY_THRESHOLD
+
+        返回:
+            (problem_id, score)，没有达到阈值的问题时返回None
+        """
+        if threshold is None:
+            threshold = current_app.config.get('SIMILARITY_THRESHOLD', 0.3)
+        matches = self.search(summary, limit=1)
+        if matches and matches[0][1] >= threshold:
+            return matches[0]
+        return None
+
+    def find_similar_batch(self, summaries, threshold=None):
+        """
+        批量查找最相似的问题，返回与输入顺序一致的列表，元素为(problem_id, score)或None
+        """
+        return [self.find_similar(summary, threshold) for summary in summaries]
+
+    def search(self, summary, limit=10):
+        """
+        返回与摘要最相似的limit个问题，按相似度降序排列的 [(problem_id, score), ...]
+        """
+        self._ensure_fresh()
+        query_grams = extract_ngrams(summary or '')
+        if not query_grams:
+            return []
+
+        with self._lock:
+            size = self._size
+            if size == 0:
+                return []
+
+            terms = []
+            query_norm_sq = 0.0
+            for gram, tf in query_grams.items():
+                gram_id = self._gram_ids.get(gram)
+                idf = self._idf(gram_id)
+                query_weight = tf * idf
+                query_norm_sq += query_weight * query_weight
+                if gram_id is not None:
+                    terms.append((len(self._posting_rows[gram_id]), gram_id, query_weight * idf))
+
+            # 跳过出现在大部分问题中的高频n-gram（如“的”“了”）：它们的IDF很低，对得分影响很小，
+            # 但倒排表几乎覆盖全部问题，会使查询代价随问题总数线性增长。仍计入查询向量的模长
+            max_postings = max(current_app.config.get('SIMILARITY_MAX_DF', 0.02) * len(self._problem_rows), MIN_PRUNED_POSTINGS)
+            kept = [term for term in terms if term[0] <= max_postings]
+            if not kept and terms:
+                kept = [min(terms)]
+
+            rows_parts = []
+            weight_parts = []
+            for _, gram_id, weight in kept:
+                rows_parts.append(np.frombuffer(self._posting_rows[gram_id], dtype=np.int32))
+                weight_parts.append(np.frombuffer(self._posting_tfs[gram_id], dtype=np.float32) * weight)
+
+            if not rows_parts:
+                return []
+
+            # 只在命中的行上累加得分，代价与涉及的倒排表长度成正比，而与问题总数无关
+            candidate_rows, inverse = np.unique(np.concatenate(rows_parts), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(weight_parts))
+            scores /= self._row_norms[candidate_rows] * math.sqrt(query_norm_sq)
+            scores[~self._row_alive[candidate_rows]] = 0.0
+
+            if limit >= len(scores):
+                top = np.argsort(-scores)
+            else:
+                top = np.argpartition(-scores, limit)[:limit]
+                top = top[np.argsort(-scores[top])]
+            return [
+                (int(self._row_problem_ids[candidate_rows[i]]), float(scores[i]))
+                for i in top if scores[i] > 0
+            ]
+
+    def load(self):
+        """
+        从数据库全量构建索引，需要在应用上下文中调用
+        """
+        rows = Problem.query.with_entities(Problem.id, Problem.summary).order_by(Problem.id).all()
+        with self._lock:
+            self._reset()
+            # 先统计文档频率，使初始构建时每行的向量模长使用完整的IDF
+            grams_by_row = [(problem_id, extract_ngrams(summary or '')) for problem_id, summary in rows]
+            doc_freq = Counter()
+            for _, grams in grams_by_row:
+                doc_freq.update(grams.keys())
+            idf = {
+                gram: math.log((len(grams_by_row) + 1) / (freq + 1)) + 1.0
+                for gram, freq in doc_freq.items()
+            }
+            for problem_id, grams in grams_by_row:
+                self._append_grams(problem_id, grams, idf)
+                self._max_problem_id = max(self._max_problem_id, problem_id)
+            self._norms_doc_count = len(self._problem_rows)
+            self._loaded = True
+            self._last_refresh = time.monotonic()
+
+    def refresh(self):
+        """
+        增量加载其他进程新建的问题（id大于已加载的最大id）
+        """
+        rows = Problem.query.with_entities(Problem.id, Problem.summary).filter(
+            Problem.id > self._max_problem_id
+        ).order_by(Problem.id).all()
+        with self._lock:
+            for problem_id, summary in rows:
+                if problem_id not in self._problem_rows:
+                    self.add(problem_id, summary)
+            self._last_refresh = time.monotonic()
+
+    def _ensure_fresh(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+        elif time.monotonic() - self._last_refresh >= current_app.config.get('SIMILARITY_INDEX_REFRESH_SECONDS', 5):
+            self.refresh()
+
+    def _idf(self, gram_id):
+        doc_freq = len(self._posting_rows[gram_id]) if gram_id is not None else 0
+        return math.log((len(self._problem_rows) + 1) / (doc_freq + 1)) + 1.0
+
+    def _gram_id(self, gram):
+        gram_id = self._gram_ids.get(gram)
+        if gram_id is None:
+            gram_id = len(self._posting_rows)
+            self._gram_ids[gram] = gram_id
+            self._posting_rows.append(array('i'))
+            self._posting_tfs.append(array('f'))
+        return gram_id
+
+    def _append_row(self, problem_id, summary):
+        self._append_grams(problem_id, extract_ngrams(summary))
+
+    def _append_grams(self, problem_id, grams, idf=None):
+        if self._size == self._capacity:
+            self._grow()
+        row = self._size
+        self._size += 1
+
+        norm_sq = 0.0
+        for gram, tf in grams.items():
+            gram_id = self._gram_id(gram)
+            self._posting_rows[gram_id].append(row)
+            self._posting_tfs[gram_id].append(tf)
+            weight = tf * (idf[gram] if idf is not None else self._idf(gram_id))
+            norm_sq += weight * weight
+
+        self._row_problem_ids[row] = problem_id
+        self._row_norms[row] = math.sqrt(norm_sq) or 1.0
+        self._row_alive[row] = True
+        self._problem_rows[problem_id] = row
+
+    def _recompute_norms(self):
+        if self._size == 0:
+            return
+        lengths = np.fromiter((len(rows) for rows in self._posting_rows), dtype=np.int64, count=len(self._posting_rows))
+        idf = np.log((len(self._problem_rows) + 1) / (lengths + 1)) + 1.0
+        rows = np.concatenate([np.frombuffer(rows, dtype=np.int32) for rows in self._posting_rows])
+        tfs = np.concatenate([np.frombuffer(tfs, dtype=np.float32) for tfs in self._posting_tfs])
+        weights = tfs * np.repeat(idf, lengths)
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=self._size))
+        norms[norms == 0] = 1.0
+        self._row_norms[:self._size] = norms
+        self._norms_doc_count = len(self._problem_rows)
+
+    def _remove_row(self, problem_id):
+        row = self._problem_rows.pop(problem_id, None)
+        if row is not None:
+            self._row_alive[row] = False
+            self._dead_rows += 1
+
+    def _grow(self):
+        self._capacity *= 2
+        self._row_problem_ids = np.resize(self._row_problem_ids, self._capacity)
+        self._row_norms = np.resize(self._row_norms, self._capacity)
+        alive = np.zeros(self._capacity, dtype=bool)
+        alive[:self._size] = self._row_alive[:self._size]
+        self._row_alive = alive
+
+    def _compact(self):
+        live = [(problem_id, row) for problem_id, row in self._problem_rows.items()]
+        texts = {}
+        for gram, gram_id in self._gram_ids.items():
+            rows = self._posting_rows[gram_id]
+            tfs = self._posting_tfs[gram_id]
+            for row, tf in zip(rows, tfs):
+                if self._row_alive[row]:
+                    texts.setdefault(row, Counter())[gram] = int(tf)
+        max_problem_id = self._max_problem_id
+        self._reset()
+        for problem_id, row in sorted(live, key=lambda item: item[1]):
+            self._append_grams(problem_id, texts.get(row, Counter()))
+        self._max_problem_id = max_problem_id
+
+
+# 创建全局的问题相似度索引
+problem_index = ProblemIndex()
+
+
+# 问题新增或摘要修改时同步更新索引
+@event.listens_for(Problem, 'after_insert')
+def _index_new_problem(mapper, connection, target):
+    if problem_index._loaded:
+        problem_index.add(target.id, target.summary)
+
+
+@event.listens_for(Problem, 'after_update')
+def _index_updated_problem(mapper, connection, target):
+    if problem_index._loaded and inspect(target).attrs.summary.history.has_changes():
+        problem_index.add(target.id, target.summary)
+
+
+@event.listens_for(Problem, 'after_delete')
+def _unindex_deleted_problem(mapper, connection, target):
+    if problem_index._loaded:
+        problem_index.remove(target.id)
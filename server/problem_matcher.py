@@ -0,0 +1,13 @@
+from flask import current_app
+from problem_index import problem_index
+from embedding_index import embedding_index
+
+
+def get_problem_matcher():
+    """
+    按配置PROBLEM_MATCHER返回归并反馈时使用的相似问题索引：
+    tfidf（默认）为字符n-gram TF-IDF倒排索引，embedding为向量索引
+    """
+    if current_app.config.get('PROBLEM_MATCHER', 'tfidf') == 'embedding':
+        return embedding_index
+    return problem_index
@@ -0,0 +1,157 @@
+import html
+from sqlalchemy import Float, Integer, cast, func, literal, select, type_coerce, union_all
+from sqlalchemy.dialects.mysql import match
+from database import db, Problem, FeedbackExample
+
+# 问题摘要/描述命中的权重高于反馈示例命中
+PROBLEM_MATCH_WEIGHT = 2.0
+
+# 相关度排序键的放大倍数：排序和游标比较使用放大后取整的相关度，不直接比较浮点数
+RELEVANCE_SCALE = 10000
+
+# 高亮片段中关键词前后保留的字符数
+SNIPPET_CONTEXT = 30
+
+
+def use_fulltext():
+    """
+    MySQL使用FULLTEXT索引（ngram分词，支持中文），其他数据库（如开发用的SQLite）退化为LIKE匹配
+    """
+    return db.engine.dialect.name == 'mysql'
+
+
+def split_keywords(keyword):
+    return [term for term in (keyword or '').split() if term]
+
+
+def relevance_subquery(keyword):
+    """
+    构建关键词相关度子查询，列为 (problem_id, relevance, rank)，每个命中的问题一行
+
+    问题摘要和描述的命中按PROBLEM_MATCH_WEIGHT加权，再加上该问题反馈示例中的最高得分。
+    rank为相关度乘以RELEVANCE_SCALE后取整的整数，排序和游标分页使用rank，
+    浮点得分经过JSON往返后不能作为稳定的比较键
+    """
+    if use_fulltext():
+        problem_score = type_coerce(
+            match(Problem.summary, Problem.description, against=keyword).in_natural_language_mode(), Float
+        )
+        example_score = type_coerce(
+            match(FeedbackExample.content, against=keyword).in_natural_language_mode(), Float
+        )
+        problem_hits = select(
+            Problem.id.label('problem_id'),
+            (problem_score * PROBLEM_MATCH_WEIGHT).label('score')
+        ).where(problem_score > 0)
+        example_hits = select(
+            FeedbackExample.problem_id.label('problem_id'),
+            func.max(example_score).label('score')
+        ).where(example_score > 0).group_by(FeedbackExample.problem_id)
+        hits = union_all(problem_hits, example_hits).subquery()
+    else:
+        terms = split_keywords(keyword)
+        problem_hits = select(
+            Problem.id.label('problem_id'),
+            (sum(_occurrences(Problem.summary, term) + _occurrences(Problem.description, term)
+                 for term in terms) * PROBLEM_MATCH_WEIGHT).label('score')
+        ).where(db.or_(*(
+            Problem.summary.contains(term, autoescape=True) | Problem.description.contains(term, autoescape=True)
+            for term in terms
+        )))
+        example_hits = select(
+            FeedbackExample.problem_id.label('problem_id'),
+            func.max(sum(_occurrences(FeedbackExample.content, term) for term in terms)).label('score')
+        ).where(db.or_(*(
+            FeedbackExample.content.contains(term, autoescape=True) for term in terms
+        ))).group_by(FeedbackExample.problem_id)
+        hits = union_all(problem_hits, example_hits).subquery()
+
+    return select(
+        hits.c.problem_id,
+        func.sum(hits.c.score).label('relevance'),
+        cast(func.round(func.sum(hits.c.score) * RELEVANCE_SCALE), Integer).label('rank')
+    ).group_by(hits.c.problem_id).subquery()
+
+
+def load_match_snippets(problems, keyword):
+    """
+    为一页问题生成关键词高亮片段：优先取摘要/描述中的命中，否则取第一条命中的反馈示例
+
+    参数:
+        problems: Problem对象列表
+        keyword: 搜索关键词
+
+    返回:
+        字典 problem_id -> 片段HTML（命中处用<mark>包裹，其余内容已转义），没有命中时为None
+    """
+    terms = split_keywords(keyword)
+    snippets = {}
+    missing = []
+    for problem in problems:
+        snippet = make_snippet(problem.summary, terms) or make_snippet(problem.description, terms)
+        snippets[problem.id] = snippet
+        if snippet is None:
+            missing.append(problem.id)
+
+    if missing and terms:
+        # 一次查询取出剩余问题的命中示例
+        rows = db.session.execute(
+            select(FeedbackExample.problem_id, FeedbackExample.content)
+            .where(FeedbackExample.problem_id.in_(missing))
+            .where(db.or_(*(FeedbackExample.content.contains(term, autoescape=True) for term in terms)))
+            .order_by(FeedbackExample.problem_id, FeedbackExample.id)
+        )
+        for problem_id, content in rows:
+            if snippets.get(problem_id) is None:
+                snippets[problem_id] = make_snippet(content, terms)
+    return snippets
+
+
+def make_snippet(content, terms, context=SNIPPET_CONTEXT):
+    """
+    截取content中第一个命中词前后context个字符，并用<mark>标出所有命中词
+    """
+    if not content or not terms:
+        return None
+    lowered = content.lower()
+    positions = [lowered.find(term.lower()) for term in terms]
+    positions = [position for position in positions if position >= 0]
+    if not positions:
+        return None
+
+    first = min(positions)
+    start = max(0, first - context)
+    end = min(len(content), first + context * 2)
+    window = content[start:end]
+
+    # 在窗口内标出所有命中区间，重叠区间合并
+    lowered_window = window.lower()
+    spans = []
+    for term in terms:
+        term = term.lower()
+        position = lowered_window.find(term)
+        while position >= 0:
+            spans.append((position, position + len(term)))
+            position = lowered_window.find(term, position + len(term))
+    spans.sort()
+    merged = []
+    for span_start, span_end in spans:
+        if merged and span_start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], span_end))
+        else:
+            merged.append((span_start, span_end))
+
+    parts = ['…' if start > 0 else '']
+    cursor = 0
+    for span_start, span_end in merged:
+        parts.append(html.escape(window[cursor:span_start]))
+        parts.append(f'<mark>{html.escape(window[span_start:span_end])}</mark>')
+        cursor = span_end
+    parts.append(html.escape(window[cursor:]))
+    parts.append('…' if end < len(content) else '')
+    return ''.join(parts)
+
+
+def _occurrences(column, term):
+    # 关键词在列中出现的次数：(LENGTH(col) - LENGTH(REPLACE(col, term, ''))) / LENGTH(term)
+    return (func.length(column) - func.length(func.replace(column, term, ''))) / literal(len(term))
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import threading
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from database import db, AnalysisResult, TaskLock
+from analytics import analytics, DEFAULT_REPORT_DAYS
+from llm_interface import llm_interface
+from response_cache import response_cache
+
+
+class ReportSummaryScheduler:
+    """
+    分析报告总结的后台生成器：按REPORT_SUMMARY_INTERVAL定期，或新导入的反馈达到
+    REPORT_SUMMARY_MIN_NEW_FEEDBACK条时，根据汇总统计数据调用大模型生成总结并保存到analysis_results。
+
+    保存时记录输入统计数据的哈希，输入不变时直接复用已有总结，不再调用大模型；
+    报表接口只读取已保存的总结，不会在请求中调用大模型。
+    多个工作进程时按日期范围加锁（task_locks表），同一范围只有一个进程生成总结。
+    """
+
+    def __init__(self):
+        self._app = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._new_feedback = 0
+        self._pending_ranges = set()  # 报表请求过、尚无总结的日期范围
+
+    def start(self, app):
+        """
+        启动后台生成线程，在app的应用上下文中生成总结
+        """
+        if not app.config.get('REPORT_SUMMARY_ENABLED', True):
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._app = app
+            self._thread = threading.Thread(target=self._run, name='report-summary', daemon=True)
+        self._thread.start()
+
+    def notify_feedback(self, count):
+        """
+        导入反馈后调用，新反馈累计达到阈值时提前触发一次生成
+        """
+        with self._lock:
+            self._new_feedback += count
+            if self._new_feedback < current_app.config.get('REPORT_SUMMARY_MIN_NEW_FEEDBACK', 200):
+                return
+            self._new_feedback = 0
+        self._wakeup.set()
+
+    def get_summary(self, start_date, end_date):
+        """
+        读取该日期范围已保存的总结，没有时把该范围加入后台待生成队列。
+        不返回其他范围的总结，避免总结与报表中的统计数据不一致
+
+        返回:
+            AnalysisResult对象，该范围还没有总结时返回None
+        """
+        summary = AnalysisResult.query.filter_by(
+            analysis_type='summary', start_date=start_date, end_date=end_date
+        ).order_by(AnalysisResult.update_time.desc()).first()
+        if summary:
+            return summary
+        with self._lock:
+            # 队列只保留少量范围，避免任意日期组合堆积大模型调用
+            if len(self._pending_ranges) < 20:
+                self._pending_ranges.add((start_date, end_date))
+        self._wakeup.set()
+        return None
+
+    def is_running(self):
+        """
+        后台生成线程是否已启动（未启用或未由服务器入口启动时不会生成总结）
+        """
+        return self._thread is not None
+
+    def refresh(self, start_date, end_date):
+        """
+        为日期范围生成总结，统计数据与上次生成时相同则直接返回
+
+        返回:
+            True表示调用了大模型并保存了新的总结
+        """
+        lock_name = f'summary:{start_date}:{end_date}'
+        if not self._acquire(lock_name):
+            # 其他工作进程正在生成该范围的总结
+            return False
+        try:
+            return self._refresh(start_date, end_date)
+        finally:
+            self._release(lock_name)
+
+    def _refresh(self, start_date, end_date):
+        # 持有锁后再比较输入哈希，其他进程刚保存的总结不会被重复生成
+        report = analytics.report(start_date, end_date)
+        input_hash = self.input_hash(report)
+
+        summary = AnalysisResult.query.filter_by(
+            analysis_type='summary', start_date=start_date, end_date=end_date
+        ).order_by(AnalysisResult.update_time.desc()).first()
+        if summary and summary.input_hash == input_hash:
+            return False
+
+        # 范围内没有反馈时不生成总结
+        if not sum(report['typeDistribution']['values']):
+            return False
+        content = llm_interface.generate_report_summary(report, start_date, end_date)
+        if not content:
+            print(f'生成分析总结失败: {start_date} 至 {end_date}')
+            return False
+
+        if summary is None:
+            summary = AnalysisResult(analysis_type='summary', start_date=start_date, end_date=end_date)
+            db.session.add(summary)
+        summary.content = content
+        summary.input_hash = input_hash
+        summary.update_time = datetime.now()
+        db.session.commit()
+        response_cache.invalidate('summary')
+        return True
+
+    def _acquire(self, name):
+        # 插入锁行，已存在时用带条件的UPDATE接管过期的锁，保证多个进程中只有一个能持有
+        expire_time = datetime.now() + timedelta(seconds=current_app.config.get('REPORT_SUMMARY_LOCK_SECONDS', 600))
+        try:
+            db.session.add(TaskLock(name=name, expire_time=expire_time))
+            db.session.commit()
+            return True
+        except IntegrityError:
+            db.session.rollback()
+        claimed = TaskLock.query.filter(
+            TaskLock.name == name, TaskLock.expire_time < datetime.now()
+        ).update({'expire_time': expire_time}, synchronize_session=False)
+        db.session.commit()
+        return bool(claimed)
+
+    def _release(self, name):
+        db.session.rollback()
+        TaskLock.query.filter_by(name=name).delete(synchronize_session=False)
+        db.session.commit()
+
+    def input_hash(self, report):
+        payload = {
+            'version': llm_interface.REPORT_SUMMARY_PROMPT_VERSION,
+            'model': llm_interface.model,
+            'report': report
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def _run(self):
+        # 启动后先检查一次，之后按间隔或被新反馈、新的报表范围唤醒
+        while True:
+            with self._lock:
+                ranges = self._pending_ranges
+                self._pending_ranges = set()
+            # 默认报表范围始终刷新
+            end_date = date.today()
+            ranges.add((end_date - timedelta(days=DEFAULT_REPORT_DAYS - 1), end_date))
+            for start_date, end_date in sorted(ranges):
+                try:
+                    with self._app.app_context():
+                        self.refresh(start_date, end_date)
+                except Exception as e:
+                    print(f'生成分析总结失败: {e}')
+            self._wakeup.wait(self._app.config.get('REPORT_SUMMARY_INTERVAL', 3600))
+            self._wakeup.clear()
+
+
+# 创建全局的报告总结生成器
+report_summarizer = ReportSummaryScheduler()
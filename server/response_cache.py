@@ -0,0 +1,171 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+from flask import request, make_response, current_app, has_app_context
+
+
+class ResponseCache:
+    """
+    读多写少接口的响应缓存：按请求路径和参数缓存响应体，每个接口可配置缓存时间，
+    响应带ETag，客户端携带If-None-Match且内容未变时返回304。
+
+    缓存条目带有标签（如feedback、problems），写入反馈或修改问题后按标签失效。
+    每个标签记录失效次数，视图执行期间标签被失效时不保存本次结果，避免并发写入前读到的旧数据在失效后被缓存。
+    缓存条目保存在进程内；失效次数保存在RESPONSE_CACHE_STATE_PATH指定的SQLite文件中，由同一台机器上的
+    工作进程共享，条目记录保存时的失效次数，命中时与共享的失效次数不同说明其他进程已使其失效。
+    未配置共享文件时失效次数只在本进程内记录，其他进程的条目在缓存时间到期后才刷新。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()  # 保护共享失效次数的SQLite连接
+        self._entries = {}  # key -> (响应体, mimetype, etag, 过期时间, 标签, 保存时的失效次数)
+        self._generations = {}  # 标签 -> 失效次数（未配置共享文件时使用）
+        self._conn = None
+        self._conn_pid = None
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'notModified': 0,
+            'invalidations': 0
+        }
+
+    def cached(self, ttl_config, tags=()):
+        """
+        视图装饰器
+
+        参数:
+            ttl_config: 缓存时间（秒）的配置项名称，配置为0时不缓存，但仍支持ETag
+            tags: 条目的标签，invalidate这些标签时失效
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                ttl = current_app.config.get(ttl_config, 0)
+                key = f'{request.endpoint}:{request.full_path}'
+                now = time.monotonic()
+
+                entry = None
+                generations = None
+                if ttl > 0:
+                    # 在执行视图之前记录标签的失效次数
+                    generations = self._tag_generations(tags)
+                    with self._lock:
+                        entry = self._entries.get(key)
+                        if entry is not None and (entry[3] <= now or entry[5] != generations):
+                            # 已过期，或保存之后被本进程或其他进程失效
+                            del self._entries[key]
+                            entry = None
+                        self._stats['hits' if entry is not None else 'misses'] += 1
+
+                if entry is None:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    body = response.get_data()
+                    etag = hashlib.sha1(body).hexdigest()
+                    entry = (body, response.mimetype, etag, now + ttl, frozenset(tags), generations)
+                    # 视图执行期间有写入使标签失效时，结果可能已过期，不保存
+                    if ttl > 0 and generations is not None and self._tag_generations(tags) == generations:
+                        with self._lock:
+                            self._entries[key] = entry
+                else:
+                    response = make_response(entry[0])
+                    response.mimetype = entry[1]
+
+                response.set_etag(entry[2])
+                response.headers['Cache-Control'] = 'no-cache'
+                response = response.make_conditional(request)
+                if response.status_code == 304:
+                    with self._lock:
+                        self._stats['notModified'] += 1
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags):
+        """
+        使带有任一指定标签的缓存条目失效
+        """
+        tags = set(tags)
+        conn = self._shared_connection()
+        if conn is not None:
+            try:
+                with self._db_lock:
+                    conn.executemany(
+                        'INSERT INTO tag_generations (tag, generation) VALUES (?, 1) '
+                        'ON CONFLICT(tag) DO UPDATE SET generation = generation + 1',
+                        [(tag,) for tag in sorted(tags)]
+                    )
+                    conn.commit()
+            except sqlite3.Error as e:
+                print(f'更新共享缓存失效次数失败: {e}')
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            stale = [key for key, entry in self._entries.items() if entry[4] & tags]
+            for key in stale:
+                del self._entries[key]
+            self._stats['invalidations'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _tag_generations(self, tags):
+        """
+        返回标签的失效次数元组，读取共享文件失败时返回None（本次结果不缓存）
+        """
+        conn = self._shared_connection()
+        if conn is None:
+            with self._lock:
+                return tuple(self._generations.get(tag, 0) for tag in tags)
+        try:
+            with self._db_lock:
+                rows = dict(conn.execute(
+                    f'SELECT tag, generation FROM tag_generations WHERE tag IN ({",".join("?" * len(tags))})',
+                    tuple(tags)
+                ).fetchall()) if tags else {}
+        except sqlite3.Error as e:
+            print(f'读取共享缓存失效次数失败: {e}')
+            return None
+        return tuple(rows.get(tag, 0) for tag in tags)
+
+    def _shared_connection(self):
+        # 未配置共享文件或不在应用上下文中时返回None，只使用进程内的失效次数
+        if not has_app_context():
+            return None
+        path = current_app.config.get('RESPONSE_CACHE_STATE_PATH')
+        if not path:
+            return None
+        with self._db_lock:
+            # 预加载应用的gunicorn主进程fork出工作进程后，子进程不能沿用主进程的SQLite连接
+            if self._conn is None or self._conn_pid != os.getpid():
+                try:
+                    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+                    conn.execute('PRAGMA journal_mode=WAL')
+                    conn.execute(
+                        'CREATE TABLE IF NOT EXISTS tag_generations ('
+                        'tag TEXT PRIMARY KEY, generation INTEGER NOT NULL)'
+                    )
+                    conn.commit()
+                except sqlite3.Error as e:
+                    print(f'打开共享缓存失效文件失败: {e}')
+                    return None
+                self._conn = conn
+                self._conn_pid = os.getpid()
+            return self._conn
+
+
+# 创建全局的响应缓存
+response_cache = ResponseCache()
@@ -1,5 +1,24 @@
-# 导入所有路由模块
-from .dashboard import *
-from .feedback import *
-from .analysis import *
-from .problems import *
\ No newline at end of file
+# 路由模块按蓝图组织，导入时不注册、不启动任何后台任务，由app.create_app统一注册
+from .dashboard import dashboard_bp
+from .feedback import feedback_bp
+from .analysis import analysis_bp
+from .problems import problems_bp
+from .system import system_bp
+
+from jobs import job_manager
+from report_summary import report_summarizer
+from problem_counters import problem_counters
+
+BLUEPRINTS = (dashboard_bp, feedback_bp, analysis_bp, problems_bp, system_bp)
+
+# 注册全部蓝图
+def register_blueprints(app):
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(blueprint)
+
+# 启动全部后台线程：导入任务线程池（并接管重启前未完成的任务）、分析总结生成和反馈次数合并，
+# 只由服务器入口调用（gunicorn工作进程的post_worker_init、python app.py），导入应用和执行命令时不启动
+def start_background_tasks(app):
+    job_manager.start(app)
+    report_summarizer.start(app)
+    problem_counters.start(app)
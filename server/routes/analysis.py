@@ -1,7 +1,9 @@
-from flask import Blueprint, request, jsonify
-from app import app
-from database import db, AnalysisResult
-import json
+from flask import Blueprint, request, jsonify, current_app
+from database import db
+from analytics import analytics
+from response_cache import response_cache
+from report_summary import report_summarizer
+from llm_interface import sanitize_summary_html
 from datetime import datetime
 
 # 创建蓝图
@@ -9,50 +11,57 @@ analysis_bp = Blueprint('analysis', __name__)
 
 # 获取分析报告
 @analysis_bp.route('/api/analysis/report', methods=['GET'])
+@response_cache.cached('REPORT_CACHE_SECONDS', tags=('feedback', 'problems', 'summary'))
 def get_analysis_report():
     try:
         # 获取查询参数
         start_date = request.args.get('startDate')
         end_date = request.args.get('endDate')
+        granularity = request.args.get('granularity')
         
-        with app.app_context():
-            # 构建查询条件
-            query = AnalysisResult.query
+        with current_app.app_context():
+            # 按日期范围统计，只传一端时另一端使用默认值
+            try:
+                start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+                end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+            except ValueError:
+                return jsonify({'success': False, 'message': '日期格式应为YYYY-MM-DD'}), 400
+            if start_date_obj and not end_date_obj:
+                end_date_obj = max(start_date_obj, datetime.now().date())
             
-            # 如果有日期参数，添加日期过滤
-            if start_date and end_date:
-                try:
-                    start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
-                    end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
-                    query = query.filter(AnalysisResult.start_date >= start_date_obj, AnalysisResult.end_date <= end_date_obj)
-                except ValueError:
-                    # 如果日期格式不正确，使用默认数据
-                    pass
+            # 类型分布、时间趋势、严重程度分布和高频问题由按天/周/月汇总的统计数据组合得到
+            analysis_report = analytics.report(start_date_obj, end_date_obj, granularity=granularity)
             
-            # 查询所有分析结果
-            results = query.all()
-            
-            # 构建返回结果
-            analysis_report = {}
-            for result in results:
-                if result.analysis_type == 'summary':
-                    # 摘要直接使用文本
-                    analysis_report[result.analysis_type] = result.content
-                else:
-                    # 其他类型解析JSON
-                    try:
-                        analysis_report[result.analysis_type] = json.loads(result.content)
-                    except json.JSONDecodeError:
-                        # 如果JSON解析失败，使用空字典
-                        analysis_report[result.analysis_type] = {}
+            # 分析总结由后台任务生成，这里只读取已保存的结果
+            summary = report_summarizer.get_summary(
+                datetime.strptime(analysis_report['startDate'], '%Y-%m-%d').date(),
+                datetime.strptime(analysis_report['endDate'], '%Y-%m-%d').date()
+            )
+            # summaryStatus: ready已有总结，empty范围内没有反馈，generating等待后台生成，unavailable未启用后台生成
+            if summary:
+                # 修复前保存的总结未经清理，返回前再清理一次
+                analysis_report['summary'] = sanitize_summary_html(summary.content)
+                analysis_report['summaryTime'] = summary.update_time.strftime('%Y-%m-%d %H:%M:%S') if summary.update_time else None
+                analysis_report['summaryStatus'] = 'ready'
+            elif not sum(analysis_report['typeDistribution']['values']):
+                analysis_report['summaryStatus'] = 'empty'
+            elif report_summarizer.is_running():
+                analysis_report['summaryStatus'] = 'generating'
+            else:
+                analysis_report['summaryStatus'] = 'unavailable'
             
             return jsonify(analysis_report)
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
-# 注册蓝图
-def register_routes():
-    app.register_blueprint(analysis_bp)
-
-# 自动注册路由
-register_routes()
\ No newline at end of file
+# 根据原始反馈重新生成汇总统计数据
+@analysis_bp.route('/api/analysis/rebuild', methods=['POST'])
+def rebuild_analysis():
+    try:
+        with current_app.app_context():
+            groups = analytics.rebuild()
+            response_cache.invalidate('feedback', 'problems')
+            return jsonify({'success': True, 'message': f'已根据 {groups} 组反馈重新生成统计数据'})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 500
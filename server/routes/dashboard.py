@@ -1,29 +1,28 @@
-from flask import Blueprint, jsonify
-from app import app
+from flask import Blueprint, jsonify, current_app
+from sqlalchemy import case, func, select
 from database import db, Feedback, Problem
+from response_cache import response_cache
 
 # 创建蓝图
 dashboard_bp = Blueprint('dashboard', __name__)
 
 # 获取仪表盘统计数据
 @dashboard_bp.route('/api/dashboard/stats', methods=['GET'])
+@response_cache.cached('DASHBOARD_CACHE_SECONDS', tags=('feedback', 'problems'))
 def get_dashboard_stats():
-    with app.app_context():
-        # 从数据库查询统计数据
-        total_feedbacks = Feedback.query.count()
-        pending_problems = Problem.query.filter_by(status='pending').count()
-        resolved_problems = Problem.query.filter_by(status='resolved').count()
+    with current_app.app_context():
+        # 一条查询统计反馈总数以及待处理、已解决的问题数
+        total_feedbacks, pending_problems, resolved_problems = db.session.execute(
+            select(
+                select(func.count()).select_from(Feedback).scalar_subquery(),
+                func.coalesce(func.sum(case((Problem.status == 'pending', 1), else_=0)), 0),
+                func.coalesce(func.sum(case((Problem.status == 'resolved', 1), else_=0)), 0)
+            ).select_from(Problem)
+        ).one()
         
         stats = {
             'totalFeedbacks': total_feedbacks,
-            'pendingProblems': pending_problems,
-            'resolvedProblems': resolved_problems
+            'pendingProblems': int(pending_problems),
+            'resolvedProblems': int(resolved_problems)
         }
         return jsonify(stats)
-
-# 注册蓝图
-def register_routes():
-    app.register_blueprint(dashboard_bp)
-
-# 自动注册路由
-register_routes()
\ No newline at end of file
@@ -1,10 +1,11 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 import os
-from app import app
-from database import db, Feedback, Problem, FeedbackExample
-from datetime import datetime
-# 导入新创建的LLM接口
-from llm_interface import llm_interface
+import json
+# 导入批量导入引擎和后台任务管理器
+from ingest import iter_import_events
+from report_summary import report_summarizer
+from ocr import ocr_pipeline, iter_upload_images
+from jobs import job_manager, job_to_dict, FINISHED_STATUSES
 
 # 创建蓝图
 feedback_bp = Blueprint('feedback', __name__)
@@ -16,37 +17,77 @@ def import_text_feedback():
         data = request.json
         content = data.get('content', '')
         
-        if not content:
+        if not content.strip():
             return jsonify({'success': False, 'message': '请输入反馈内容'}), 400
         
-        # 分割文本内容为多行
-        feedbacks = [line.strip() for line in content.split('\n') if line.strip()]
-        
-        # 处理每条反馈
-        processed_count = 0
-        failed_count = 0
-        
-        with app.app_context():
-            for feedback in feedbacks:
-                try:
-                    # 处理反馈
-                    process_feedback(feedback)
-                    processed_count += 1
-                except Exception as e:
-                    print(f'处理反馈失败: {e}')
-                    failed_count += 1
+        # 提交后台导入任务，立即返回任务ID
+        with current_app.app_context():
+            job = job_manager.submit_text(content)
+            return jsonify({
+                'success': True,
+                'message': f'已提交导入任务，共 {job.total} 条反馈',
+                'jobId': job.id,
+                'job': job_to_dict(job)
+            }), 202
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# 流式导入文本反馈：以Server-Sent Events逐条推送分析结果，适合少量反馈的交互式导入
+@feedback_bp.route('/api/feedback/import/stream', methods=['POST'])
+def import_text_feedback_stream():
+    try:
+        data = request.json or {}
+        lines = [line.strip() for line in data.get('content', '').splitlines() if line.strip()]
         
-        return jsonify({
-            'success': True,
-            'message': f'成功导入 {len(feedbacks)} 条反馈',
-            'stats': {
-                'total': len(feedbacks),
-                'success': processed_count,
-                'failed': failed_count
-            }
-        })
+        if not lines:
+            return jsonify({'success': False, 'message': '请输入反馈内容'}), 400
+        max_lines = current_app.config.get('STREAM_IMPORT_MAX_LINES', 200)
+        if len(lines) > max_lines:
+            return jsonify({'success': False, 'message': f'流式导入最多 {max_lines} 条反馈，请使用后台导入'}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
+    
+    def generate():
+        stats = {'total': len(lines), 'success': 0, 'failed': 0, 'duplicates': 0}
+        yield sse_event('start', {'total': len(lines)})
+        # 近似重复的反馈不调用大模型，直接归入原反馈所在的问题；其余反馈分析完成后立即写入数据库，再推送结果
+        for event in iter_import_events(lines):
+            if event[0] == 'delta':
+                _, index, content = event
+                yield sse_event('delta', {'index': index, 'content': content})
+                continue
+            
+            _, index, result, error, problem_id, duplicate = event
+            stats['success' if error is None else 'failed'] += 1
+            stats['duplicates'] += error is None and duplicate
+            yield sse_event('result', {
+                'index': index,
+                'feedback': lines[index],
+                'success': error is None,
+                'message': str(error) if error is not None else None,
+                'problemId': problem_id,
+                'duplicate': duplicate,
+                'analysis': {
+                    'type': result.get('type'),
+                    'summary': result.get('summary'),
+                    'severity': result.get('severity'),
+                    'sentiment': result.get('sentiment')
+                } if error is None else None
+            })
+        report_summarizer.notify_feedback(stats['success'])
+        yield sse_event('done', stats)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def sse_event(name, data):
+    """
+    格式化一条Server-Sent Events事件
+    """
+    return f'event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
 
 # 导入文件反馈
 @feedback_bp.route('/api/feedback/import/file', methods=['POST'])
@@ -62,145 +103,92 @@ def import_file_feedback():
         if file.filename == '':
             return jsonify({'success': False, 'message': '请选择文件'}), 400
         
-        # 读取文件内容
-        content = file.read().decode('utf-8')
-        
-        # 分割文件内容为多行
-        feedbacks = [line.strip() for line in content.split('\n') if line.strip()]
-        
-        # 处理每条反馈
-        processed_count = 0
-        failed_count = 0
-        
-        with app.app_context():
-            for feedback in feedbacks:
-                try:
-                    process_feedback(feedback)
-                    processed_count += 1
-                except Exception as e:
-                    print(f'处理反馈失败: {e}')
-                    failed_count += 1
-        
-        return jsonify({
-            'success': True,
-            'message': f'成功导入 {len(feedbacks)} 条反馈',
-            'stats': {
-                'total': len(feedbacks),
-                'success': processed_count,
-                'failed': failed_count
-            }
-        })
+        # 可选参数：文件格式（默认按扩展名判断）、要导入的列/字段、第一行是否为表头
+        file_format = request.form.get('format', '')
+        column = request.form.get('column', '')
+        has_header = request.form.get('hasHeader', 'true').lower() != 'false'
+        
+        # 提交后台导入任务，立即返回任务ID
+        with current_app.app_context():
+            try:
+                job = job_manager.submit_file(file, file_format, column, has_header)
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+            return jsonify({
+                'success': True,
+                'message': f'已提交导入任务，共 {job.total} 条反馈',
+                'jobId': job.id,
+                'job': job_to_dict(job)
+            }), 202
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# 查询导入任务进度
+@feedback_bp.route('/api/feedback/jobs/<job_id>', methods=['GET'])
+def get_import_job(job_id):
+    try:
+        with current_app.app_context():
+            job = job_manager.get(job_id)
+            
+            if not job:
+                return jsonify({'success': False, 'message': '导入任务不存在'}), 404
+            
+            return jsonify(job_to_dict(job))
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# 取消导入任务
+@feedback_bp.route('/api/feedback/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_import_job(job_id):
+    try:
+        with current_app.app_context():
+            job = job_manager.cancel(job_id)
+            
+            if not job:
+                return jsonify({'success': False, 'message': '导入任务不存在'}), 404
+            
+            if job.status in FINISHED_STATUSES:
+                message = '导入任务已结束' if job.status != 'cancelled' else '导入任务已取消'
+            else:
+                message = '已请求取消，当前反馈处理完成后停止'
+            
+            return jsonify({'success': True, 'message': message, 'job': job_to_dict(job)})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
-# 导入图片识别反馈
+# 导入图片识别反馈：支持一次上传多张图片或包含图片的zip压缩包，识别出的每行文字作为一条反馈导入
 @feedback_bp.route('/api/feedback/import/image', methods=['POST'])
 def import_image_feedback():
     try:
-        # 检查是否有图片上传
-        if 'image' not in request.files:
-            return jsonify({'success': False, 'message': '请选择图片'}), 400
-        
-        image = request.files['image']
-        
-        # 检查文件名
-        if image.filename == '':
+        # 检查是否有图片上传（images为多文件字段，兼容原来的单文件字段image）
+        files = [file for file in request.files.getlist('images') + request.files.getlist('image') if file.filename]
+        if not files:
             return jsonify({'success': False, 'message': '请选择图片'}), 400
         
-        # 在实际应用中，这里应该调用OCR服务识别图片中的文字
-        # 这里使用模拟数据
-        recognized_text = "这是模拟的图片识别结果，客户反馈系统登录困难，希望能够优化登录流程。"
-        
-        # 处理识别到的文本
-        with app.app_context():
-            process_feedback(recognized_text)
-        
-        return jsonify({
-            'success': True,
-            'message': '图片识别并导入成功',
-            'stats': {
-                'total': 1,
-                'success': 1,
-                'failed': 0
-            }
-        })
+        try:
+            ocr_pipeline.check_available()
+        except RuntimeError as e:
+            return jsonify({'success': False, 'message': str(e)}), 503
+        
+        # 在OCR进程池中识别图片
+        try:
+            lines, report = ocr_pipeline.recognize(iter_upload_images(files))
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        print(f"图片识别: {report['images']} 张图片, {report['lines']} 行文字, 耗时(ms) {report['timings']}")
+        
+        if not lines:
+            return jsonify({'success': False, 'message': '未识别到文字', 'ocr': report}), 400
+        
+        # 识别出的文字与文本导入一样提交后台导入任务，批量分析和分块写入
+        with current_app.app_context():
+            job = job_manager.submit_text('\n'.join(lines), source='image')
+            return jsonify({
+                'success': True,
+                'message': f"已识别 {report['images']} 张图片，提交导入任务，共 {job.total} 条反馈",
+                'jobId': job.id,
+                'job': job_to_dict(job),
+                'ocr': report
+            }), 202
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
-
-# 处理单条反馈的函数
-def process_feedback(feedback_text):
-    # 构建反馈对象
-    feedback = Feedback(
-        content=feedback_text,
-        status='pending',
-        create_time=datetime.now(),
-        update_time=datetime.now()
-    )
-    
-    # 添加到数据库
-    db.session.add(feedback)
-    
-    # 使用LLM接口分析反馈
-    analysis_result = llm_interface.analyze_feedback(feedback_text)
-    
-    # 从分析结果中提取信息
-    problem_type = analysis_result.get('type', '其他')
-    summary = analysis_result.get('summary', '')
-    severity = analysis_result.get('severity', '中')
-    
-    # 查询所有现有问题
-    existing_problems = Problem.query.all()
-    
-    # 检查是否已有类似问题
-    similar_problem = llm_interface.find_similar_problems(summary, existing_problems)
-    
-    if similar_problem:
-        # 如果有类似问题，增加反馈次数
-        similar_problem.feedback_count += 1
-        similar_problem.update_time = datetime.now()
-        
-        # 添加反馈示例
-        feedback_example = FeedbackExample(
-            problem_id=similar_problem.id,
-            content=feedback_text,
-            create_time=datetime.now()
-        )
-        db.session.add(feedback_example)
-        
-        # 关联反馈到问题
-        feedback.problem_id = similar_problem.id
-    else:
-        # 如果没有类似问题，创建新问题
-        problem = Problem(
-            summary=summary,
-            description=feedback_text,
-            type=problem_type,
-            severity=severity,
-            feedback_count=1,
-            status='pending',
-            create_time=datetime.now(),
-            update_time=datetime.now()
-        )
-        db.session.add(problem)
-        db.session.flush()  # 获取problem.id
-        
-        # 添加反馈示例
-        feedback_example = FeedbackExample(
-            problem_id=problem.id,
-            content=feedback_text,
-            create_time=datetime.now()
-        )
-        db.session.add(feedback_example)
-        
-        # 关联反馈到问题
-        feedback.problem_id = problem.id
-    
-    # 提交更改
-    db.session.commit()
-
-# 注册蓝图
-def register_routes():
-    app.register_blueprint(feedback_bp)
-
-# 自动注册路由
-register_routes()
\ No newline at end of file
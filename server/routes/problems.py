@@ -1,33 +1,149 @@
-from flask import Blueprint, request, jsonify
-from app import app
+import base64
+import json
+import threading
+import time
+from flask import Blueprint, request, jsonify, current_app
 from database import db, Problem, FeedbackExample
+from problem_search import relevance_subquery, load_match_snippets
+from response_cache import response_cache
+from problem_clustering import recluster_job
 from datetime import datetime
+from sqlalchemy import and_, func, or_, select
 
 # 创建蓝图
 problems_bp = Blueprint('problems', __name__)
 
+# 问题列表中每个问题返回的反馈示例条数
+LIST_EXAMPLE_LIMIT = 5
+
+
+def load_feedback_examples(problem_ids, limit=LIST_EXAMPLE_LIMIT):
+    """
+    用一条查询取出多个问题各自的前limit条反馈示例（按问题分区的row_number窗口）
+
+    参数:
+        problem_ids: 问题ID列表
+        limit: 每个问题最多返回的示例条数
+
+    返回:
+        字典 problem_id -> 反馈示例内容列表
+    """
+    examples = {problem_id: [] for problem_id in problem_ids}
+    if not problem_ids:
+        return examples
+
+    ranked = select(
+        FeedbackExample.problem_id,
+        FeedbackExample.content,
+        func.row_number().over(
+            partition_by=FeedbackExample.problem_id,
+            order_by=FeedbackExample.id
+        ).label('rank')
+    ).where(FeedbackExample.problem_id.in_(problem_ids)).subquery()
+
+    rows = db.session.execute(
+        select(ranked.c.problem_id, ranked.c.content)
+        .where(ranked.c.rank <= limit)
+        .order_by(ranked.c.problem_id, ranked.c.rank)
+    )
+    for problem_id, content in rows:
+        examples[problem_id].append(content)
+    return examples
+
+
+def encode_cursor(values):
+    """
+    把上一页最后一行的排序键编码为不透明的游标字符串
+    """
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValueError('无效的游标')
+    # 排序键都是整数（反馈次数或取整后的相关度），浮点数不能作为稳定的比较键
+    if not isinstance(values, list) or len(values) != 2 or not all(
+        isinstance(value, int) and not isinstance(value, bool) for value in values
+    ):
+        raise ValueError('无效的游标')
+    return values
+
+
+def after_cursor(sort_column, cursor_values):
+    """
+    游标条件：排序键 (sort_column DESC, id ASC) 排在cursor_values之后的行
+    """
+    sort_value, last_id = cursor_values
+    return or_(
+        sort_column < sort_value,
+        and_(sort_column == sort_value, Problem.id > last_id)
+    )
+
+
+class CountCache:
+    """
+    问题列表总数缓存：同一组过滤条件的COUNT(*)结果在PROBLEM_COUNT_CACHE_SECONDS秒内复用，
+    翻页时不再每次统计全表，返回的总数可能略有滞后
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}  # 过滤条件 -> (总数, 统计时间)
+
+    def get(self, key, query):
+        ttl = current_app.config.get('PROBLEM_COUNT_CACHE_SECONDS', 30)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._counts.get(key)
+            if entry is not None and now - entry[1] < ttl:
+                return entry[0]
+        total = query.order_by(None).count()
+        with self._lock:
+            # 过滤条件组合有限，超过上限时直接清空
+            if len(self._counts) >= 1000:
+                self._counts.clear()
+            self._counts[key] = (total, now)
+        return total
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+
+# 问题列表总数缓存
+problem_count_cache = CountCache()
+
 # 获取问题列表
 @problems_bp.route('/api/problems/list', methods=['GET'])
 def get_problems_list():
     try:
         # 获取查询参数
-        keyword = request.args.get('keyword', '')
+        keyword = request.args.get('keyword', '').strip()  # 只含空白的关键词按未搜索处理
         problem_type = request.args.get('type', '')
         severity = request.args.get('severity', '')
         status = request.args.get('status', '')
         page = int(request.args.get('page', 1))
         page_size = int(request.args.get('pageSize', 20))
+        # 传入cursor参数（第一页传空字符串）时使用游标分页，按 (排序键 DESC, id) 取下一页
+        cursor = request.args.get('cursor')
         
-        with app.app_context():
+        with current_app.app_context():
             # 构建查询
             query = Problem.query
             
-            # 按关键词过滤
+            # 按关键词全文搜索问题及其反馈示例，结果按取整的相关度排序；否则游标分页按反馈次数排序
+            sort_column = Problem.feedback_count
             if keyword:
-                query = query.filter(
-                    (Problem.summary.like(f'%{keyword}%')) | 
-                    (Problem.description.like(f'%{keyword}%'))
+                relevance = relevance_subquery(keyword)
+                sort_column = relevance.c.rank
+                query = query.join(relevance, relevance.c.problem_id == Problem.id)
+                query = query.add_columns(relevance.c.relevance, relevance.c.rank).order_by(
+                    relevance.c.rank.desc(), Problem.id
                 )
+            elif cursor is not None:
+                query = query.order_by(Problem.feedback_count.desc(), Problem.id)
             
             # 按问题类型过滤
             if problem_type:
@@ -57,18 +173,30 @@ def get_problems_list():
             if status:
                 query = query.filter(Problem.status == status)
             
-            # 计算总数量
-            total = query.count()
+            # 总数量使用缓存的统计结果
+            total = problem_count_cache.get((keyword, problem_type, severity, status), query)
+            
+            # 分页：游标分页直接从索引定位到上一页之后，耗时与页码深度无关
+            if cursor is not None:
+                if cursor:
+                    query = query.filter(after_cursor(sort_column, decode_cursor(cursor)))
+                rows = query.limit(page_size).all()
+            else:
+                rows = query.offset((page - 1) * page_size).limit(page_size).all()
+            if keyword:
+                paginated_problems = [problem for problem, _, _ in rows]
+                relevances = {problem.id: score for problem, score, _ in rows}
+                ranks = {problem.id: rank for problem, _, rank in rows}
+                snippets = load_match_snippets(paginated_problems, keyword)
+            else:
+                paginated_problems = rows
             
-            # 分页
-            paginated_problems = query.offset((page - 1) * page_size).limit(page_size).all()
+            # 一次查询取出本页所有问题的反馈示例，查询次数与每页条数无关
+            examples = load_feedback_examples([problem.id for problem in paginated_problems])
             
             # 转换为字典列表
             items = []
             for problem in paginated_problems:
-                # 查询反馈示例
-                feedback_examples = FeedbackExample.query.filter_by(problem_id=problem.id).limit(5).all()
-                
                 items.append({
                     'id': problem.id,
                     'summary': problem.summary,
@@ -80,15 +208,30 @@ def get_problems_list():
                     'createTime': problem.create_time.strftime('%Y-%m-%d %H:%M:%S'),
                     'updateTime': problem.update_time.strftime('%Y-%m-%d %H:%M:%S'),
                     'entities': [],  # 实体识别结果
-                    'feedbackExamples': [example.content for example in feedback_examples]
+                    'feedbackExamples': examples[problem.id]
                 })
+                if keyword:
+                    items[-1]['relevance'] = round(float(relevances[problem.id] or 0), 4)
+                    items[-1]['snippet'] = snippets.get(problem.id)
             
-            return jsonify({
+            result = {
                 'items': items,
                 'total': total,
                 'page': page,
                 'pageSize': page_size
-            })
+            }
+            if cursor is not None:
+                next_cursor = None
+                if len(paginated_problems) == page_size:
+                    last = paginated_problems[-1]
+                    sort_value = ranks[last.id] if keyword else last.feedback_count
+                    next_cursor = encode_cursor([sort_value, last.id])
+                result['nextCursor'] = next_cursor
+                del result['page']
+            
+            return jsonify(result)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -96,7 +239,7 @@ def get_problems_list():
 @problems_bp.route('/api/problems/<int:problem_id>', methods=['GET'])
 def get_problem_detail(problem_id):
     try:
-        with app.app_context():
+        with current_app.app_context():
             # 查找问题
             problem = Problem.query.get(problem_id)
             
@@ -129,7 +272,7 @@ def get_problem_detail(problem_id):
 @problems_bp.route('/api/problems/<int:problem_id>/resolve', methods=['POST'])
 def resolve_problem(problem_id):
     try:
-        with app.app_context():
+        with current_app.app_context():
             # 查找问题
             problem = Problem.query.get(problem_id)
             
@@ -142,6 +285,9 @@ def resolve_problem(problem_id):
             
             # 提交更改
             db.session.commit()
+            # 按状态过滤的总数和仪表盘统计已变化
+            problem_count_cache.clear()
+            response_cache.invalidate('problems')
             
             return jsonify({
                 'success': True,
@@ -156,7 +302,7 @@ def resolve_problem(problem_id):
 @problems_bp.route('/api/problems/<int:problem_id>/update-status', methods=['POST'])
 def update_problem_status(problem_id):
     try:
-        with app.app_context():
+        with current_app.app_context():
             # 查找问题
             problem = Problem.query.get(problem_id)
             
@@ -181,6 +327,9 @@ def update_problem_status(problem_id):
             
             # 提交更改
             db.session.commit()
+            # 按状态过滤的总数和仪表盘统计已变化
+            problem_count_cache.clear()
+            response_cache.invalidate('problems')
             
             return jsonify({'success': True, 'message': '问题状态已更新'})
     except Exception as e:
@@ -188,9 +337,23 @@ def update_problem_status(problem_id):
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
 
-# 注册蓝图
-def register_routes():
-    app.register_blueprint(problems_bp)
+# 启动离线重新聚类任务，合并向量相似度达到阈值的重复问题
+@problems_bp.route('/api/problems/recluster', methods=['POST'])
+def start_recluster():
+    try:
+        data = request.get_json(silent=True) or {}
+        threshold = data.get('threshold')
+        if threshold is not None:
+            threshold = float(threshold)
+            if not 0 < threshold <= 1:
+                return jsonify({'success': False, 'message': '阈值应在0到1之间'}), 400
+        if not recluster_job.start(threshold, bool(data.get('dryRun', False))):
+            return jsonify({'success': False, 'message': '重新聚类任务正在运行'}), 409
+        return jsonify({'success': True, 'message': '重新聚类任务已启动', 'job': recluster_job.status()}), 202
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
 
-# 自动注册路由
-register_routes()
\ No newline at end of file
+# 查询重新聚类任务状态
+@problems_bp.route('/api/problems/recluster', methods=['GET'])
+def get_recluster_status():
+    return jsonify(recluster_job.status())
@@ -0,0 +1,116 @@
+from flask import Blueprint, jsonify
+from database import db
+from analysis_cache import analysis_cache
+from feedback_classifier import feedback_classifier
+from feedback_dedup import feedback_deduplicator
+from llm_transport import llm_transport
+from llm_interface import llm_interface
+from llm_response_parser import llm_response_parser
+from problem_counters import problem_counters
+from response_cache import response_cache
+
+# 创建蓝图
+system_bp = Blueprint('system', __name__)
+
+# 获取LLM分析结果缓存的命中统计
+@system_bp.route('/api/system/llm-cache', methods=['GET'])
+def get_llm_cache_stats():
+    try:
+        return jsonify(analysis_cache.stats())
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# 清空LLM分析结果缓存
+@system_bp.route('/api/system/llm-cache/clear', methods=['POST'])
+def clear_llm_cache():
+    try:
+        analysis_cache.clear()
+        return jsonify({'success': True, 'message': '分析结果缓存已清空'})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# 获取快速分类路径和大模型各自处理的反馈条数
+@system_bp.route('/api/system/classifier', methods=['GET'])
+def get_classifier_stats():
+    try:
+        return jsonify(feedback_classifier.stats())
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# 重新读取快速分类的关键词词典
+@system_bp.route('/api/system/classifier/reload', methods=['POST'])
+def reload_classifier():
+    try:
+        feedback_classifier.reload()
+        return jsonify({'success': True, 'message': '关键词词典已重新加载'})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# 获取LLM传输层的请求、重试和限流统计
+@system_bp.route('/api/system/llm-transport', methods=['GET'])
+def get_llm_transport_stats():
+    try:
+        return jsonify(llm_transport.stats())
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# 获取大模型熔断器状态，degraded为true时分析和导入正在使用本地降级路径
+@system_bp.route('/api/system/llm-breaker', methods=['GET'])
+def get_llm_breaker_status():
+    try:
+        return jsonify(llm_interface.circuit_breaker.status())
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# 手动关闭熔断器，恢复调用大模型
+@system_bp.route('/api/system/llm-breaker/reset', methods=['POST'])
+def reset_llm_breaker():
+    try:
+        llm_interface.circuit_breaker.reset()
+        return jsonify({'success': True, 'message': '熔断器已重置'})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# 获取大模型回复的JSON解析成功率
+@system_bp.route('/api/system/llm-parser', methods=['GET'])
+def get_llm_parser_stats():
+    try:
+        return jsonify(llm_response_parser.stats())
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# 获取近似重复反馈检测的统计（检测条数、重复条数和指纹索引大小）
+@system_bp.route('/api/system/dedup', methods=['GET'])
+def get_dedup_stats():
+    try:
+        return jsonify(feedback_deduplicator.stats())
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# 获取问题反馈次数计数的统计（直接累加和分片累加次数、待合并的分片增量）
+@system_bp.route('/api/system/counters', methods=['GET'])
+def get_counter_stats():
+    try:
+        return jsonify(problem_counters.stats())
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# 立即把分片中的反馈次数增量合并到问题表
+@system_bp.route('/api/system/counters/fold', methods=['POST'])
+def fold_counters():
+    try:
+        folded = problem_counters.fold()
+        db.session.commit()
+        response_cache.invalidate('problems')
+        return jsonify({'success': True, 'folded': folded})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# 获取仪表盘和报表接口的响应缓存统计
+@system_bp.route('/api/system/response-cache', methods=['GET'])
+def get_response_cache_stats():
+    try:
+        return jsonify(response_cache.stats())
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
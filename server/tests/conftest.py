@@ -0,0 +1,49 @@
+import os
+import sys
+import tempfile
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+# create_app创建应用时读取环境变量，必须在此之前设置：使用临时SQLite数据库和缓存目录
+WORK_DIR = tempfile.mkdtemp()
+os.environ.update({
+    'DATABASE_URI': f'sqlite:///{os.path.join(WORK_DIR, "test.db")}',
+    'DB_AUTO_INIT': 'false',
+    'REPORT_SUMMARY_ENABLED': 'false',
+    'IMPORT_JOB_DIR': os.path.join(WORK_DIR, 'import_jobs'),
+    'ANALYSIS_CACHE_PATH': os.path.join(WORK_DIR, 'analysis_cache.sqlite3'),
+    'RESPONSE_CACHE_STATE_PATH': os.path.join(WORK_DIR, 'response_cache.sqlite3'),
+    'EMBEDDING_CACHE_PATH': '',
+    # 测试不访问真实的大模型接口
+    'LLM_API_URL': 'http://127.0.0.1:9/v1/chat/completions'
+})
+
+from app import create_app
+from database import db, create_schema
+from problem_index import problem_index
+from embedding_index import embedding_index
+from feedback_dedup import feedback_deduplicator
+
+flask_app = create_app()
+
+
+@pytest.fixture
+def app():
+    """
+    每个测试使用新建的表结构，测试结束后删除全部表；进程内的相似问题索引和指纹索引随之重建
+    """
+    with flask_app.app_context():
+        create_schema()
+        problem_index.load()
+        embedding_index.load()
+        feedback_deduplicator.clear()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
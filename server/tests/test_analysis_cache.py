@@ -0,0 +1,41 @@
+from analysis_cache import AnalysisCache
+
+
+def access_time(cache, text):
+    return cache._connection().execute(
+        'SELECT access_time FROM analysis_cache WHERE cache_key = ?', (cache.make_key(text, 'v1'),)
+    ).fetchone()[0]
+
+
+def test_disk_hits_write_access_time_in_batches(app, monkeypatch, tmp_path):
+    monkeypatch.setitem(app.config, 'ANALYSIS_CACHE_PATH', str(tmp_path / 'cache.sqlite3'))
+    monkeypatch.setitem(app.config, 'ANALYSIS_CACHE_TOUCH_BATCH', 3)
+    cache = AnalysisCache()
+    texts = [f'页面加载很慢{i}' for i in range(3)]
+    for text in texts:
+        cache.put(text, 'v1', {'type': '技术问题'})
+    stored = {text: access_time(cache, text) for text in texts}
+
+    # 清空内存层，之后的查询都从SQLite读取
+    cache._memory.clear()
+    assert cache.get(texts[0], 'v1') == {'type': '技术问题'}
+    assert cache.get(texts[1], 'v1') == {'type': '技术问题'}
+    assert access_time(cache, texts[0]) == stored[texts[0]]
+
+    # 达到批量大小时一起写回
+    assert cache.get(texts[2], 'v1') == {'type': '技术问题'}
+    assert all(access_time(cache, text) > stored[text] for text in texts)
+    assert cache.stats()['diskHits'] == 3
+
+
+def test_pending_access_time_is_written_with_next_put(app, monkeypatch, tmp_path):
+    monkeypatch.setitem(app.config, 'ANALYSIS_CACHE_PATH', str(tmp_path / 'cache.sqlite3'))
+    cache = AnalysisCache()
+    cache.put('客服态度差', 'v1', {'type': '服务态度'})
+    stored = access_time(cache, '客服态度差')
+    cache._memory.clear()
+
+    assert cache.get('客服态度差', 'v1') == {'type': '服务态度'}
+    assert access_time(cache, '客服态度差') == stored
+    cache.put('价格太贵', 'v1', {'type': '价格异议'})
+    assert access_time(cache, '客服态度差') > stored
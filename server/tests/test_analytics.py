@@ -0,0 +1,116 @@
+import random
+from collections import Counter
+from datetime import date, datetime, timedelta
+import pytest
+from sqlalchemy import func
+from analytics import analytics, bucket_end, decompose_range, TYPE_LABELS, SEVERITY_LABELS
+from database import db, Feedback, Problem
+
+FIRST_DAY = date(2023, 11, 20)
+LAST_DAY = date(2024, 4, 10)
+
+RANGES = [
+    (date(2024, 1, 1), date(2024, 1, 31)),  # 整月
+    (date(2024, 1, 17), date(2024, 3, 5)),  # 跨月和周，首尾都是不完整的月
+    (date(2023, 12, 28), date(2024, 1, 3)),  # 跨年的一周内
+    (date(2024, 2, 29), date(2024, 2, 29)),  # 单日（闰日）
+    (date(2024, 2, 5), date(2024, 2, 11)),  # 恰好一个整周
+    (date(2023, 11, 1), date(2024, 4, 30)),  # 超出数据的范围
+    (date(2024, 3, 31), date(2024, 3, 30)),  # 起止颠倒
+]
+
+
+@pytest.fixture
+def feedbacks(app):
+    # 在多个月份中随机分布反馈，统计行由导入时的增量累加生成
+    rng = random.Random(7)
+    problems = [
+        Problem(summary=f'问题{i}', description=f'问题{i}', type=TYPE_LABELS[i % len(TYPE_LABELS)],
+                severity=SEVERITY_LABELS[i % len(SEVERITY_LABELS)], feedback_count=0)
+        for i in range(8)
+    ]
+    db.session.add_all(problems)
+    db.session.flush()
+    entries = []
+    span = (LAST_DAY - FIRST_DAY).days
+    for i in range(600):
+        problem = rng.choice(problems)
+        day = FIRST_DAY + timedelta(days=rng.randint(0, span))
+        create_time = datetime.combine(day, datetime.min.time()) + timedelta(seconds=rng.randint(0, 86399))
+        db.session.add(Feedback(content=f'反馈{i}', status='processed', problem_id=problem.id,
+                                create_time=create_time, update_time=create_time))
+        entries.append((day, problem.id, problem.type, problem.severity))
+    analytics.record(entries)
+    db.session.commit()
+
+
+def raw_counts(start_date, end_date, column):
+    day = func.date(Feedback.create_time)
+    rows = db.session.query(column, func.count()).select_from(Feedback).join(
+        Problem, Problem.id == Feedback.problem_id
+    ).filter(
+        day >= start_date.isoformat(), day <= end_date.isoformat()
+    ).group_by(column).all()
+    return dict(rows)
+
+
+@pytest.mark.parametrize('start_date, end_date', RANGES)
+def test_decompose_range_covers_each_day_once(start_date, end_date):
+    days = []
+    for period, bucket_date in decompose_range(start_date, end_date):
+        day = bucket_date
+        while day <= bucket_end(bucket_date, period):
+            days.append(day)
+            day += timedelta(days=1)
+
+    expected = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    assert days == expected
+
+
+def test_decompose_range_uses_largest_buckets():
+    # 2023-12-25和2024-02-05是周一
+    assert decompose_range(date(2023, 12, 25), date(2024, 2, 13)) == [
+        ('week', date(2023, 12, 25)),
+        ('month', date(2024, 1, 1)),
+        ('day', date(2024, 2, 1)),
+        ('day', date(2024, 2, 2)),
+        ('day', date(2024, 2, 3)),
+        ('day', date(2024, 2, 4)),
+        ('week', date(2024, 2, 5)),
+        ('day', date(2024, 2, 12)),
+        ('day', date(2024, 2, 13)),
+    ]
+
+
+@pytest.mark.parametrize('start_date, end_date', RANGES)
+@pytest.mark.parametrize('granularity', [None, 'day', 'week', 'month'])
+def test_report_matches_raw_feedback_counts(feedbacks, start_date, end_date, granularity):
+    report = analytics.report(start_date, end_date, top_n=100, granularity=granularity)
+    start_date, end_date = min(start_date, end_date), max(start_date, end_date)
+
+    types = raw_counts(start_date, end_date, Problem.type)
+    severities = raw_counts(start_date, end_date, Problem.severity)
+    problems = raw_counts(start_date, end_date, Problem.summary)
+    assert dict(zip(report['typeDistribution']['labels'], report['typeDistribution']['values'])) == {
+        label: types.get(label, 0) for label in TYPE_LABELS
+    }
+    assert dict(zip(report['severityDistribution']['labels'], report['severityDistribution']['values'])) == {
+        label: severities.get(label, 0) for label in SEVERITY_LABELS
+    }
+    assert {item['summary']: item['count'] for item in report['highFrequencyProblems']} == problems
+
+    # 趋势的每个点统计从该点到下一个点前一天的反馈，各点之和等于范围内的总数
+    dates = [date.fromisoformat(value) for value in report['timeTrend']['dates']]
+    assert dates[0] == start_date
+    point_ends = [next_date - timedelta(days=1) for next_date in dates[1:]] + [end_date]
+    for point_start, point_end, count in zip(dates, point_ends, report['timeTrend']['counts']):
+        assert count == sum(raw_counts(point_start, point_end, Problem.type).values())
+    assert sum(report['timeTrend']['counts']) == sum(types.values())
+
+
+def test_rebuild_matches_incremental_stats(feedbacks):
+    expected = analytics.report(FIRST_DAY, LAST_DAY, granularity='week')
+
+    analytics.rebuild()
+
+    assert analytics.report(FIRST_DAY, LAST_DAY, granularity='week') == expected
@@ -0,0 +1,56 @@
+import pytest
+import requests
+from circuit_breaker import CircuitBreaker
+from llm_interface import llm_interface
+from llm_transport import llm_transport
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = f'HTTP {status_code}'
+
+
+@pytest.fixture
+def breaker(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'LLM_BREAKER_FAILURE_THRESHOLD', 2)
+    breaker = CircuitBreaker()
+    monkeypatch.setattr(llm_interface, 'circuit_breaker', breaker)
+    return breaker
+
+
+def call_with(monkeypatch, outcome):
+    def post(*args, **kwargs):
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FakeResponse(outcome)
+    monkeypatch.setattr(llm_transport, 'post', post)
+    return llm_interface.call_llm([{'role': 'user', 'content': '测试'}])
+
+
+@pytest.mark.parametrize('status_code', [400, 401, 413])
+def test_client_errors_do_not_open_breaker(monkeypatch, breaker, status_code):
+    for _ in range(3):
+        assert call_with(monkeypatch, status_code) is None
+    status = breaker.status()
+    assert status['state'] == CircuitBreaker.CLOSED
+    assert status['consecutiveFailures'] == 0
+
+
+@pytest.mark.parametrize('outcome', [429, 503, requests.ConnectionError('connection refused'), requests.Timeout()])
+def test_upstream_failures_open_breaker(monkeypatch, breaker, outcome):
+    for _ in range(2):
+        assert call_with(monkeypatch, outcome) is None
+    assert breaker.status()['state'] == CircuitBreaker.OPEN
+
+
+def test_client_error_keeps_half_open_breaker_probing(app, monkeypatch, breaker):
+    monkeypatch.setitem(app.config, 'LLM_BREAKER_RESET_SECONDS', 0)
+    for _ in range(2):
+        call_with(monkeypatch, 503)
+    assert breaker.status()['state'] == CircuitBreaker.OPEN
+
+    # 半开状态的探测请求返回400，熔断器不关闭，下一个请求仍可作为探测请求
+    call_with(monkeypatch, 400)
+    assert breaker.status()['state'] == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
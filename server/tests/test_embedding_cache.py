@@ -0,0 +1,103 @@
+import os
+import numpy as np
+import pytest
+from sqlalchemy import delete, insert, update
+from database import db, Problem
+from embedding_index import EmbeddingProblemIndex, HashingEmbedder
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__()
+        self.texts = []
+
+    def embed(self, texts):
+        self.texts.extend(texts)
+        return super().embed(texts)
+
+
+def new_index():
+    index = EmbeddingProblemIndex()
+    index._embedder = CountingEmbedder()
+    return index
+
+
+def vector_of(index, problem_id):
+    return index._vectors[index._problem_rows[problem_id]].astype(np.float32)
+
+
+def expected_vector(summary):
+    return HashingEmbedder().embed([summary])[0].astype(np.float16).astype(np.float32)
+
+
+@pytest.fixture
+def cache_path(app, tmp_path, monkeypatch):
+    path = str(tmp_path / 'problem_embeddings')
+    monkeypatch.setitem(app.config, 'EMBEDDING_CACHE_PATH', path)
+    return path
+
+
+def add_problems(*summaries):
+    problems = [Problem(summary=summary, description=summary, type='技术问题', severity='高') for summary in summaries]
+    db.session.add_all(problems)
+    db.session.commit()
+    return [problem.id for problem in problems]
+
+
+def test_unchanged_summaries_are_loaded_from_cache(cache_path):
+    add_problems('登录页面一直转圈', '会员价格太贵')
+    new_index().load()
+
+    index = new_index()
+    index.load()
+
+    assert index._embedder.texts == []
+    assert len(index) == 2
+
+
+def test_changed_summary_is_reembedded(cache_path):
+    first_id, second_id = add_problems('登录页面一直转圈', '会员价格太贵')
+    new_index().load()
+    # 其他进程（或直接执行SQL）修改摘要，不会触发本进程的索引事件
+    db.session.execute(update(Problem).where(Problem.id == first_id).values(summary='应用频繁闪退'))
+    db.session.commit()
+
+    index = new_index()
+    index.load()
+
+    assert index._embedder.texts == ['应用频繁闪退']
+    assert np.allclose(vector_of(index, first_id), expected_vector('应用频繁闪退'))
+    assert np.allclose(vector_of(index, second_id), expected_vector('会员价格太贵'))
+    # 重新计算后保存，下次启动不再计算
+    again = new_index()
+    again.load()
+    assert again._embedder.texts == []
+
+
+def test_reused_problem_id_is_reembedded(cache_path):
+    first_id, second_id = add_problems('登录页面一直转圈', '会员价格太贵')
+    new_index().load()
+    # 删除id最大的问题后，SQLite会把同一个id分配给新问题
+    db.session.execute(delete(Problem).where(Problem.id == second_id))
+    db.session.execute(insert(Problem).values(
+        id=second_id, summary='客服不回复', description='客服不回复', type='服务态度', severity='中'
+    ))
+    db.session.commit()
+
+    index = new_index()
+    index.load()
+
+    assert index._embedder.texts == ['客服不回复']
+    assert index.find_similar('客服不回复', threshold=0.9)[0] == second_id
+
+
+def test_cache_without_hashes_is_ignored(cache_path):
+    add_problems('登录页面一直转圈')
+    new_index().load()
+    # 旧版本保存的缓存没有摘要哈希文件
+    os.remove(f'{cache_path}.hashes.npy')
+
+    index = new_index()
+    index.load()
+
+    assert index._embedder.texts == ['登录页面一直转圈']
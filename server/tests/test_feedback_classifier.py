@@ -0,0 +1,105 @@
+import json
+import pytest
+from feedback_classifier import FeedbackClassifier, KeywordMatcher
+from ingest import store_feedback
+
+CRASH_ANALYSIS = {'type': '技术问题', 'summary': '应用闪退无法登录', 'severity': '高', 'sentiment': '负面'}
+
+
+@pytest.fixture
+def classifier(app):
+    return FeedbackClassifier()
+
+
+def test_matcher_finds_overlapping_keywords():
+    matcher = KeywordMatcher({'he': 'he', 'she': 'she', 'his': 'his', 'hers': 'hers'})
+
+    assert sorted(matcher.find_all('ushers')) == [(1, 4, 'she'), (2, 4, 'he'), (2, 6, 'hers')]
+    assert sorted(matcher.find_all('hishe')) == [(0, 3, 'his'), (2, 5, 'she'), (3, 5, 'he')]
+    assert matcher.find_all('xyz') == []
+
+
+def test_matcher_finds_contained_chinese_keywords():
+    matcher = KeywordMatcher({'满意': 'positive', '不满意': 'negative', '登录': 'login', '登录失败': 'login_failed'})
+
+    assert sorted(matcher.find_all('很不满意，登录失败')) == [
+        (1, 4, 'negative'), (2, 4, 'positive'), (5, 7, 'login'), (5, 9, 'login_failed')
+    ]
+
+
+def test_contained_keyword_is_not_counted(classifier):
+    # “不满意”中的“满意”被更长的关键词包含，不计入正面
+    result, confidence = classifier.classify('对这次更新很不满意')
+    assert result['sentiment'] == '负面'
+
+    result, _ = classifier.classify('对这次更新很满意')
+    assert result['sentiment'] == '正面'
+
+    # 同时独立出现时两者都计入：问题类型和严重程度确定，情感相互矛盾使置信度减半
+    _, confidence = classifier.classify('应用闪退让人不满意')
+    assert confidence == pytest.approx(1.0)
+    _, confidence = classifier.classify('应用闪退让人不满意，界面倒是满意')
+    assert confidence == pytest.approx(0.5)
+
+
+@pytest.mark.parametrize('text, expected_type, expected_confidence', [
+    ('应用闪退', '技术问题', 1.0),  # 一个强关键词
+    ('页面加载很久', '技术问题', 1.0),  # 两个弱关键词
+    ('页面很难看', '技术问题', 0.5),  # 只有一个弱关键词，证据不足
+    ('今天天气不错', '其他', 0.0),  # 没有命中类型关键词
+    ('应用闪退，而且太贵', '技术问题', 0.5),  # 两个类型的强关键词相互矛盾
+])
+def test_type_confidence(classifier, text, expected_type, expected_confidence):
+    result, confidence = classifier.classify(text)
+
+    assert result['type'] == expected_type
+    assert confidence == pytest.approx(expected_confidence)
+
+
+def test_severity_conflict_lowers_confidence(classifier):
+    result, confidence = classifier.classify('应用偶尔闪退')
+
+    # 严重程度“高”（闪退）与“低”（偶尔）各得1分
+    assert result['type'] == '技术问题'
+    assert confidence == pytest.approx(0.5)
+
+
+def test_keywords_file_overrides_dictionary(app, classifier, tmp_path, monkeypatch):
+    path = tmp_path / 'keywords.json'
+    path.write_text(json.dumps({'type': {'价格异议': {'会员续费': 2}}}, ensure_ascii=False), encoding='utf-8')
+    monkeypatch.setitem(app.config, 'CLASSIFIER_KEYWORDS_PATH', str(path))
+
+    result, confidence = classifier.classify('会员续费提醒')
+
+    assert (result['type'], confidence) == ('价格异议', 1.0)
+
+
+def test_fast_path_requires_existing_problem(app, classifier, monkeypatch):
+    monkeypatch.setitem(app.config, 'FAST_PATH_CONFIDENCE', 0.8)
+    text = '应用闪退无法登录'
+
+    # 置信度足够，但没有可归入的已有问题，仍交给大模型生成摘要
+    assert classifier.classify(text)[1] >= 0.8
+    assert classifier.fast_path(text) is None
+
+    store_feedback('应用一打开就闪退，无法登录', CRASH_ANALYSIS)
+    result = classifier.fast_path(text)
+
+    assert result['summary'] == CRASH_ANALYSIS['summary']
+    assert (result['type'], result['severity']) == ('技术问题', '高')
+    assert classifier.stats()['fastPath'] == 1
+    assert classifier.stats()['fastPathTypes'] == {'技术问题': 1}
+
+
+def test_fast_path_skips_low_confidence_and_disabled(app, classifier, monkeypatch):
+    store_feedback('页面很难看', dict(CRASH_ANALYSIS, summary='页面很难看'))
+
+    # 已有相似问题，但置信度不足
+    monkeypatch.setitem(app.config, 'FAST_PATH_CONFIDENCE', 0.8)
+    assert classifier.fast_path('页面很难看') is None
+    monkeypatch.setitem(app.config, 'FAST_PATH_CONFIDENCE', 0.5)
+    assert classifier.fast_path('页面很难看')['summary'] == '页面很难看'
+
+    monkeypatch.setitem(app.config, 'FAST_PATH_ENABLED', False)
+    assert classifier.fast_path('页面很难看') is None
+    assert classifier.stats()['fastPath'] == 1
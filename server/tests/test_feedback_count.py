@@ -0,0 +1,77 @@
+import threading
+import pytest
+from sqlalchemy.exc import OperationalError
+from database import db, Feedback, Problem, ProblemCounterShard
+from ingest import store_feedback
+from problem_clustering import merge_problems
+from problem_counters import problem_counters
+
+THREADS = 8
+WRITES = 25
+
+
+def create_problem(summary, feedback_count=0):
+    problem = Problem(summary=summary, description=summary, type='其他', severity='低', feedback_count=feedback_count)
+    db.session.add(problem)
+    db.session.commit()
+    return problem.id
+
+
+@pytest.mark.parametrize('shards', [0, 4])
+def test_concurrent_writes_keep_exact_count(app, monkeypatch, shards):
+    monkeypatch.setitem(app.config, 'COUNTER_SHARDS', shards)
+    problem_id = create_problem('并发写入')
+    errors = []
+    start_barrier = threading.Barrier(THREADS)
+
+    def worker(index):
+        with app.app_context():
+            start_barrier.wait()
+            for i in range(WRITES):
+                while True:
+                    try:
+                        store_feedback(f'并发写入反馈 {index}-{i}', {}, commit=False, match=(problem_id, 1.0))
+                        db.session.commit()
+                        break
+                    except OperationalError:
+                        # SQLite写锁超时时重试
+                        db.session.rollback()
+                    except Exception as e:
+                        db.session.rollback()
+                        errors.append(e)
+                        return
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    problem_counters.fold([problem_id])
+    db.session.commit()
+    db.session.expire_all()
+    assert db.session.get(Problem, problem_id).feedback_count == THREADS * WRITES
+    assert Feedback.query.filter_by(problem_id=problem_id).count() == THREADS * WRITES
+    assert ProblemCounterShard.query.count() == 0
+
+
+def test_merge_adds_pending_shard_counts(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'COUNTER_SHARDS', 4)
+    first = create_problem('合并问题A')
+    second = create_problem('合并问题B')
+    for i in range(5):
+        store_feedback(f'合并问题A的反馈{i}', {}, match=(first, 1.0))
+    for i in range(3):
+        store_feedback(f'合并问题B的反馈{i}', {}, match=(second, 1.0))
+
+    keeper = merge_problems([first, second])
+    db.session.commit()
+    problem_counters.fold()
+    db.session.commit()
+    db.session.expire_all()
+
+    assert keeper == first
+    assert db.session.get(Problem, second) is None
+    assert db.session.get(Problem, keeper).feedback_count == 8
+    assert Feedback.query.filter_by(problem_id=keeper).count() == 8
@@ -0,0 +1,155 @@
+import io
+import json
+import sys
+import types
+import pytest
+from feedback_reader import SNIFF_BYTES, detect_encoding, detect_format, iter_feedback_lines
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data if isinstance(data, bytes) else data.encode('utf-8'))
+    return str(path)
+
+
+def read(path, file_format, column=None, has_header=True):
+    return list(iter_feedback_lines(path, file_format, column, has_header))
+
+
+@pytest.mark.parametrize('data, encoding', [
+    ('登录失败\n'.encode('utf-8-sig'), 'utf-8-sig'),
+    ('登录失败\n'.encode('utf-8'), 'utf-8'),
+    ('登录失败\n'.encode('gbk'), 'gb18030'),
+    ('登录失败，验证码收不到\n'.encode('gb18030'), 'gb18030'),
+    (b'plain ascii\n', 'utf-8'),
+])
+def test_detect_encoding(data, encoding):
+    binary_file = io.BytesIO(b'xx' + data)
+    binary_file.seek(2)
+
+    assert detect_encoding(binary_file) == encoding
+    # 探测后回到原来的位置
+    assert binary_file.tell() == 2
+
+
+def test_detect_encoding_ignores_character_cut_at_sniff_boundary():
+    # 探测窗口的末尾截断在一个三字节汉字中间
+    data = b'a' * (SNIFF_BYTES - 1) + '登'.encode('utf-8')
+    assert detect_encoding(io.BytesIO(data)) == 'utf-8'
+
+
+@pytest.mark.parametrize('encoding', ['utf-8-sig', 'utf-8', 'gb18030'])
+def test_txt_lines_in_any_encoding(tmp_path, encoding):
+    path = write(tmp_path, 'feedback.txt', '登录失败\r\n\r\n  客服态度差  \n价格太贵'.encode(encoding))
+
+    assert read(path, 'txt') == ['登录失败', '客服态度差', '价格太贵']
+
+
+def test_csv_column_by_header_name_and_index(tmp_path):
+    content = '编号,反馈内容\n1,登录失败\n2,"客服态度差,\n回复很慢"\n3,\n4\n'
+    path = write(tmp_path, 'feedback.csv', content.encode('gb18030'))
+
+    # 单元格内的换行合并为空格，空单元格和缺列的行被跳过
+    assert read(path, 'csv', '反馈内容') == ['登录失败', '客服态度差, 回复很慢']
+    assert read(path, 'csv', ' 反馈内容 ') == ['登录失败', '客服态度差, 回复很慢']
+    assert read(path, 'csv', '1') == ['登录失败', '客服态度差, 回复很慢']
+    # 未指定列时取第一列
+    assert read(path, 'csv') == ['1', '2', '3', '4']
+
+
+def test_csv_without_header(tmp_path):
+    path = write(tmp_path, 'feedback.csv', '1,登录失败\n2,价格太贵\n')
+
+    assert read(path, 'csv', '1', has_header=False) == ['登录失败', '价格太贵']
+    assert read(path, 'csv', has_header=False) == ['1', '2']
+    with pytest.raises(ValueError, match='只能按列序号'):
+        read(path, 'csv', '反馈内容', has_header=False)
+
+
+def test_csv_unknown_column(tmp_path):
+    path = write(tmp_path, 'feedback.csv', '编号,反馈内容\n1,登录失败\n')
+
+    with pytest.raises(ValueError, match='不存在列: 内容'):
+        read(path, 'csv', '内容')
+    # 只有表头的空文件
+    assert read(write(tmp_path, 'empty.csv', ''), 'csv', '反馈内容') == []
+
+
+def test_jsonl_field_extraction(tmp_path, capsys):
+    lines = [
+        json.dumps({'content': '登录失败', 'text': '备用字段'}, ensure_ascii=False),
+        '',
+        '{"content": "截断的行',
+        json.dumps('直接是字符串的行', ensure_ascii=False),
+        json.dumps({'text': '没有content字段'}, ensure_ascii=False),
+        json.dumps([1, 2]),
+        json.dumps({'content': '  价格\n太贵 '}, ensure_ascii=False),
+    ]
+    path = write(tmp_path, 'feedback.jsonl', '\n'.join(lines).encode('utf-8-sig'))
+
+    assert read(path, 'jsonl') == ['登录失败', '直接是字符串的行', '价格 太贵']
+    assert '第3行解析失败' in capsys.readouterr().out
+    assert read(path, 'jsonl', 'text') == ['备用字段', '直接是字符串的行', '没有content字段']
+
+
+def test_detect_format():
+    assert detect_format('反馈.CSV') == 'csv'
+    assert detect_format('export.json') == 'jsonl'
+    assert detect_format('notes.md') == 'txt'
+    assert detect_format('data.csv', 'XLSX') == 'xlsx'
+    with pytest.raises(ValueError, match='不支持的文件格式'):
+        detect_format('data.csv', 'xls')
+
+
+class FakeWorkbook:
+    def __init__(self, rows):
+        self.rows = rows
+        self.closed = False
+        self.active = self
+
+    def iter_rows(self, values_only=False):
+        assert values_only
+        return iter(self.rows)
+
+    def close(self):
+        self.closed = True
+
+
+def test_xlsx_opened_read_only_and_closed(monkeypatch):
+    opened = []
+    workbook = FakeWorkbook([('编号', '反馈内容'), (1, '登录失败'), (2, None), (3, 42)])
+
+    def load_workbook(path, **kwargs):
+        opened.append(kwargs)
+        return workbook
+
+    monkeypatch.setitem(sys.modules, 'openpyxl', types.SimpleNamespace(load_workbook=load_workbook))
+
+    assert read('feedback.xlsx', 'xlsx', '反馈内容') == ['登录失败', '42']
+    # 只读模式逐行读取，读完后关闭工作簿
+    assert opened == [{'read_only': True, 'data_only': True}]
+    assert workbook.closed
+
+
+def test_xlsx_requires_openpyxl(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'openpyxl', None)
+
+    with pytest.raises(ValueError, match='openpyxl'):
+        read('feedback.xlsx', 'xlsx')
+
+
+def test_xlsx_file(tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(['编号', '反馈内容'])
+    sheet.append([1, '登录失败'])
+    sheet.append([2, None])
+    sheet.append([3, '客服态度差\n回复很慢'])
+    path = str(tmp_path / 'feedback.xlsx')
+    workbook.save(path)
+
+    assert read(path, 'xlsx', '反馈内容') == ['登录失败', '客服态度差 回复很慢']
+    assert read(path, 'xlsx', '1') == ['登录失败', '客服态度差 回复很慢']
+    with pytest.raises(ValueError, match='不存在列'):
+        read(path, 'xlsx', '内容')
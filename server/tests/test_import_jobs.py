@@ -0,0 +1,47 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+from database import db, Feedback, ImportJob
+from ingest import ImportAborted
+from jobs import job_manager
+from llm_interface import llm_interface
+
+
+@pytest.fixture
+def job(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'IMPORT_BATCH_MODE', False)
+    monkeypatch.setitem(app.config, 'IMPORT_CONCURRENCY', 1)
+    monkeypatch.setattr(llm_interface, 'analyze_feedback', lambda feedback_text, on_delta=None: {
+        'type': '技术问题', 'summary': feedback_text, 'severity': '高', 'sentiment': '负面'
+    })
+    path = tmp_path / 'job.txt'
+    path.write_text('登录页面一直转圈\n导出报表时提示服务器错误\n', encoding='utf-8')
+    job = ImportJob(id='job1', source='text', file_path=str(path), file_format='txt', status='queued',
+                    total=2, create_time=datetime.now(), update_time=datetime.now())
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def test_running_job_is_reclaimed_only_after_lease_expires(app, job):
+    assert job_manager._claim(job.id, 'owner-a') is not None
+    assert job_manager._claim(job.id, 'owner-b') is None
+
+    ImportJob.query.filter_by(id=job.id).update({'update_time': datetime.now() - timedelta(seconds=600)})
+    db.session.commit()
+
+    assert job_manager._claim(job.id, 'owner-b').owner == 'owner-b'
+
+
+def test_worker_that_lost_its_lease_does_not_commit(app, job):
+    job = job_manager._claim(job.id, 'owner-a')
+    # 其他进程在本进程处理期间接管了任务
+    ImportJob.query.filter_by(id=job.id).update({'owner': 'owner-b'})
+    db.session.commit()
+
+    with pytest.raises(ImportAborted):
+        job_manager._process(job, threading.Event(), 'owner-a')
+
+    db.session.refresh(job)
+    assert Feedback.query.count() == 0
+    assert (job.status, job.processed, job.owner) == ('running', 0, 'owner-b')
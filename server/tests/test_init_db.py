@@ -0,0 +1,17 @@
+from database import db, Feedback, FeedbackStat, Problem
+
+
+def test_init_db_backfills_stats_for_existing_feedback(app):
+    problem = Problem(summary='升级前的问题', description='升级前的问题', type='技术问题', severity='高', feedback_count=2)
+    db.session.add(problem)
+    db.session.flush()
+    db.session.add_all(Feedback(content=f'升级前的反馈{i}', problem_id=problem.id) for i in range(2))
+    db.session.commit()
+    assert FeedbackStat.query.count() == 0
+
+    result = app.test_cli_runner().invoke(args=['init-db'])
+
+    assert result.exit_code == 0, result.output
+    assert '已根据 1 组反馈生成汇总统计数据' in result.output
+    day_stats = FeedbackStat.query.filter_by(period='day').all()
+    assert [(stat.problem_type, stat.feedback_count) for stat in day_stats] == [('技术问题', 2)]
@@ -0,0 +1,28 @@
+import json
+import os
+import pytest
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'benchmarks', 'llm_response_corpus.jsonl')
+
+with open(CORPUS_PATH, encoding='utf-8') as f:
+    CASES = [json.loads(line) for line in f if line.strip()]
+
+
+# 语料每行一条：kind为object（单条分析）或array（批量分析）；expect为null表示应解析失败，
+# object语料的expect为解析结果应包含的字段，array语料的expect为应解析出的id列表
+@pytest.mark.parametrize('case', CASES, ids=[case['name'] for case in CASES])
+def test_corpus(app, case):
+    from llm_interface import llm_interface
+    from llm_response_parser import llm_response_parser
+
+    text, expect = case['text'], case['expect']
+    if case['kind'] == 'object':
+        result = llm_response_parser.parse_object(text, llm_interface._validate_analysis)
+        if expect is None:
+            assert result is None
+        else:
+            assert result is not None
+            assert {key: result.get(key) for key in expect} == expect
+    else:
+        assert (sorted(llm_interface._parse_batch_results(text)) or None) == expect
@@ -0,0 +1,202 @@
+import pytest
+import requests
+import llm_transport as transport_module
+from llm_transport import LLMTransport, TokenBucket
+
+
+class FakeClock:
+    """
+    替换llm_transport中的time模块：sleep只推进时间，不真正等待
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, body=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.body = body or {}
+        self.closed = False
+
+    def json(self):
+        return self.body
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    """
+    按顺序返回预设的结果，结果为异常时抛出
+    """
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def post(self, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(transport_module, 'time', clock)
+    # 退避取上限，便于断言等待时间
+    monkeypatch.setattr(transport_module.random, 'uniform', lambda low, high: high)
+    return clock
+
+
+@pytest.fixture
+def transport(app, clock, monkeypatch):
+    monkeypatch.setitem(app.config, 'LLM_MAX_RETRIES', 3)
+    monkeypatch.setitem(app.config, 'LLM_BACKOFF_BASE', 1.0)
+    monkeypatch.setitem(app.config, 'LLM_BACKOFF_MAX', 30.0)
+    monkeypatch.setitem(app.config, 'LLM_RETRY_AFTER_MAX', 60.0)
+    return LLMTransport()
+
+
+def post_with(transport, outcomes):
+    transport._session = FakeSession(outcomes)
+    return transport.post('http://llm/v1/chat/completions', {}, {'messages': []})
+
+
+@pytest.mark.parametrize('error', [requests.ConnectionError('reset'), requests.Timeout('read timeout')])
+def test_connection_errors_are_retried_with_backoff(transport, clock, error):
+    response = post_with(transport, [error, error, FakeResponse(200)])
+
+    assert response.status_code == 200
+    assert transport._session.calls == 3
+    assert clock.sleeps == [1.0, 2.0]
+    assert transport._stats['retries'] == 2
+
+
+@pytest.mark.parametrize('status_code', [429, 500, 502, 503, 504])
+def test_retryable_status_codes_are_retried(transport, clock, status_code):
+    failed = FakeResponse(status_code)
+    response = post_with(transport, [failed, FakeResponse(200)])
+
+    assert response.status_code == 200
+    # 重试前关闭失败的响应，归还连接
+    assert failed.closed
+    assert clock.sleeps == [1.0]
+
+
+def test_client_errors_are_not_retried(transport, clock):
+    response = post_with(transport, [FakeResponse(400), FakeResponse(200)])
+
+    assert response.status_code == 400
+    assert transport._session.calls == 1
+    assert clock.sleeps == []
+    assert transport._stats['failures'] == 1
+
+
+def test_retry_after_seconds_and_date_are_honoured(transport, clock):
+    retry_date = 'Thu, 01 Jan 1970 00:17:00 GMT'  # 时间戳1020，第一次等待7秒后为1007
+    response = post_with(transport, [
+        FakeResponse(429, {'Retry-After': '7'}),
+        FakeResponse(503, {'Retry-After': retry_date}),
+        FakeResponse(429, {'Retry-After': '3600'}),
+        FakeResponse(200)
+    ])
+
+    assert response.status_code == 200
+    # 日期形式按与当前时间的差值等待，超过LLM_RETRY_AFTER_MAX的等待时间被截断
+    assert clock.sleeps == [7.0, 13.0, 60.0]
+
+
+def test_gives_up_after_max_retries(transport, clock):
+    response = post_with(transport, [FakeResponse(503) for _ in range(4)])
+
+    assert response.status_code == 503
+    assert transport._session.calls == 4
+    assert clock.sleeps == [1.0, 2.0, 4.0]
+    assert transport._stats['failures'] == 1
+
+    with pytest.raises(requests.ConnectionError):
+        post_with(transport, [requests.ConnectionError('reset') for _ in range(4)])
+    assert transport._session.calls == 4
+
+
+def test_backoff_is_capped(transport, app, clock, monkeypatch):
+    monkeypatch.setitem(app.config, 'LLM_MAX_RETRIES', 6)
+    monkeypatch.setitem(app.config, 'LLM_BACKOFF_MAX', 5.0)
+    post_with(transport, [FakeResponse(500) for _ in range(6)] + [FakeResponse(200)])
+
+    assert clock.sleeps == [1.0, 2.0, 4.0, 5.0, 5.0, 5.0]
+
+
+def test_token_bucket_paces_requests(clock):
+    bucket = TokenBucket(60, capacity=2)  # 每秒补充1个令牌
+
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    # 桶已空，等待补充一个令牌
+    assert bucket.acquire() == pytest.approx(1.0)
+    clock.now += 0.5
+    assert bucket.acquire() == pytest.approx(0.5)
+    # 空闲再久也不超过桶容量
+    clock.now += 100
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, pytest.approx(1.0)]
+
+
+def test_token_bucket_adjust_allows_debt(clock):
+    bucket = TokenBucket(600)  # 每秒补充10个令牌，容量600
+
+    assert bucket.acquire(500) == 0
+    # 实际消耗比预估多300个令牌，余额变为-200，下次需要等到补足
+    bucket.adjust(300)
+    assert bucket.acquire(100) == pytest.approx(30.0)
+    # 单次请求超过容量时按容量取，不会永久阻塞
+    clock.now += 1000
+    assert bucket.acquire(5000) == 0
+
+
+def throttled_transport(transport, app, monkeypatch, rpm, tpm):
+    monkeypatch.setitem(app.config, 'LLM_RATE_LIMIT_RPM', rpm)
+    monkeypatch.setitem(app.config, 'LLM_RATE_LIMIT_TPM', tpm)
+    transport._get_session()
+    transport._session = FakeSession([
+        FakeResponse(200, body={'usage': {'total_tokens': 100}}) for _ in range(100)
+    ])
+    return lambda: transport.post('http://llm', {}, {}, estimated_tokens=100)
+
+
+def test_transport_throttles_by_rpm(transport, app, clock, monkeypatch):
+    post = throttled_transport(transport, app, monkeypatch, rpm=60, tpm=0)
+
+    for _ in range(60):
+        post()
+    assert clock.sleeps == []
+    # 每分钟60次的配额用完，下一次请求等待补充一个令牌
+    post()
+    assert clock.sleeps == [pytest.approx(1.0)]
+    assert transport._stats['throttledSeconds'] == pytest.approx(1.0)
+
+
+def test_transport_throttles_by_tpm(transport, app, clock, monkeypatch):
+    post = throttled_transport(transport, app, monkeypatch, rpm=600, tpm=3000)
+
+    for _ in range(30):
+        post()
+    assert clock.sleeps == []
+    # 每秒补充50个token，下一次请求的100个token需要等待2秒
+    post()
+    assert clock.sleeps == [pytest.approx(2.0)]
@@ -0,0 +1,47 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from ocr import OCRPipeline
+
+
+class CrashedExecutor:
+    """
+    模拟子进程崩溃后的进程池：已提交的任务抛出BrokenProcessPool
+    """
+
+    def __init__(self):
+        self.shutdown_called = False
+
+    def submit(self, func, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool('子进程异常退出'))
+        return future
+
+    def shutdown(self, wait=True):
+        self.shutdown_called = True
+
+
+def test_broken_pool_is_rebuilt(app, monkeypatch):
+    pipeline = OCRPipeline()
+    monkeypatch.setattr(pipeline, 'check_available', lambda: None)
+    crashed = CrashedExecutor()
+    pipeline._executor = crashed
+
+    lines, report = pipeline.recognize([('a.png', b'data')])
+
+    assert lines == []
+    assert report['failed'] == 1
+    # 损坏的进程池被关闭并丢弃，下次请求重新创建
+    assert crashed.shutdown_called
+    assert pipeline._executor is None
+
+
+def test_reset_keeps_rebuilt_pool(app):
+    pipeline = OCRPipeline()
+    crashed = CrashedExecutor()
+    rebuilt = CrashedExecutor()
+    pipeline._executor = rebuilt
+
+    pipeline._reset_executor(crashed)
+
+    assert pipeline._executor is rebuilt
+    assert not rebuilt.shutdown_called
@@ -0,0 +1,104 @@
+import base64
+import json
+from datetime import datetime
+import pytest
+from sqlalchemy import event
+from database import db, Problem, FeedbackExample
+
+PROBLEMS = 60
+EXAMPLES_PER_PROBLEM = 4
+
+
+@pytest.fixture
+def problems(app):
+    now = datetime.now()
+    rows = [
+        Problem(summary=f'问题{i}', description=f'问题{i}的描述', type='技术问题', severity='中',
+                feedback_count=EXAMPLES_PER_PROBLEM, status='pending', create_time=now, update_time=now)
+        for i in range(PROBLEMS)
+    ]
+    db.session.add_all(rows)
+    db.session.flush()
+    db.session.add_all(
+        FeedbackExample(problem_id=problem.id, content=f'{problem.summary}的反馈{j}', create_time=now)
+        for problem in rows for j in range(EXAMPLES_PER_PROBLEM)
+    )
+    db.session.commit()
+    return rows
+
+
+@pytest.mark.parametrize('keyword', ['', '反馈'])
+def test_query_count_does_not_depend_on_page_size(app, client, problems, keyword, monkeypatch):
+    # 关闭总数缓存，每次请求都包含COUNT查询，便于比较
+    monkeypatch.setitem(app.config, 'PROBLEM_COUNT_CACHE_SECONDS', 0)
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count_statement)
+    try:
+        counts = {}
+        for page_size in (1, 10, 50):
+            statements.clear()
+            response = client.get(f'/api/problems/list?page=1&pageSize={page_size}&keyword={keyword}')
+            assert response.status_code == 200
+            assert len(response.get_json()['items']) == page_size
+            counts[page_size] = len(statements)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count_statement)
+
+    # 查询次数随每页条数变化说明存在N+1查询
+    assert len(set(counts.values())) == 1, counts
+
+
+def test_whitespace_keyword_is_ignored(client, problems):
+    response = client.get('/api/problems/list?page=1&pageSize=10&keyword=%20%20')
+    assert response.status_code == 200
+    assert len(response.get_json()['items']) == 10
+
+
+@pytest.fixture
+def tied_problems(app):
+    # 反馈次数只有三种取值，关键词命中次数也只有两种取值：大量行的排序键相同
+    now = datetime.now()
+    rows = [
+        Problem(summary=f'登录失败{i}' + ('，登录失败' if i % 4 == 0 else ''), description='无法登录',
+                type='技术问题', severity='中', feedback_count=i % 3 + 1, status='pending',
+                create_time=now, update_time=now)
+        for i in range(47)
+    ]
+    db.session.add_all(rows)
+    db.session.commit()
+    return rows
+
+
+def page_through(client, keyword, page_size):
+    ids = []
+    cursor = ''
+    while True:
+        response = client.get('/api/problems/list', query_string={
+            'keyword': keyword, 'pageSize': page_size, 'cursor': cursor
+        })
+        assert response.status_code == 200
+        data = response.get_json()
+        ids.extend(item['id'] for item in data['items'])
+        cursor = data['nextCursor']
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize('keyword', ['', '登录', '登录 失败'])
+@pytest.mark.parametrize('page_size', [1, 5, 20])
+def test_cursor_pages_have_no_gaps_or_duplicates(client, tied_problems, keyword, page_size):
+    ids = page_through(client, keyword, page_size)
+
+    assert len(ids) == len(set(ids)) == len(tied_problems)
+    # 与一页取出全部结果的顺序一致
+    assert ids == page_through(client, keyword, 100)
+
+
+def test_cursor_rejects_float_sort_value(client, tied_problems):
+    cursor = base64.urlsafe_b64encode(json.dumps([1.5, 3]).encode('utf-8')).decode('ascii')
+    response = client.get('/api/problems/list', query_string={'keyword': '登录', 'cursor': cursor})
+    assert response.status_code == 400
@@ -0,0 +1,103 @@
+from datetime import date
+import numpy as np
+from database import db, Feedback, FeedbackExample, Problem, ProblemCounterShard, ProblemStat
+from problem_clustering import find_duplicate_groups, merge_problems, recluster_job
+from problem_counters import problem_counters
+
+BUCKET = date(2024, 1, 1)
+
+
+def add_problem(summary, feedback_count, problem_type='技术问题'):
+    problem = Problem(summary=summary, description=summary, type=problem_type, severity='高',
+                      feedback_count=feedback_count)
+    db.session.add(problem)
+    db.session.flush()
+    for index in range(feedback_count):
+        content = f'{summary}-{problem.id}-{index}'
+        db.session.add(Feedback(content=content, status='processed', problem_id=problem.id))
+        db.session.add(FeedbackExample(problem_id=problem.id, content=content))
+    db.session.add(ProblemStat(period='day', bucket_date=BUCKET, problem_id=problem.id, feedback_count=feedback_count))
+    db.session.commit()
+    return problem.id
+
+
+def test_recluster_endpoint_merges_duplicates(client):
+    keeper_id = add_problem('登录页面一直转圈', 3)
+    duplicate_id = add_problem('登录页面一直转圈', 2)
+    other_id = add_problem('会员价格太贵', 1, '价格异议')
+
+    response = client.post('/api/problems/recluster', json={'threshold': 0.99})
+    assert response.status_code == 202
+    recluster_job._thread.join(timeout=30)
+
+    job = client.get('/api/problems/recluster').get_json()
+    assert job['status'] == 'completed', job
+    assert (job['groups'], job['merged']) == (1, 1)
+    db.session.expire_all()
+    assert db.session.get(Problem, duplicate_id) is None
+    assert db.session.get(Problem, keeper_id).feedback_count == 5
+    assert db.session.get(Problem, other_id).feedback_count == 1
+    assert Feedback.query.filter_by(problem_id=keeper_id).count() == 5
+
+
+def test_find_duplicate_groups_uses_centers_in_order():
+    vectors = np.array([
+        [1.0, 0.0, 0.0],
+        [0.6, 0.8, 0.0],
+        [0.0, 1.0, 0.0],
+        [0.0, 0.0, 1.0],
+        [1.0, 0.0, 0.0]
+    ], dtype=np.float32)
+    problem_ids = np.array([10, 11, 12, 13, 14])
+
+    # 11与10、12都相似，但10与12不相似：相似关系不链式合并
+    assert find_duplicate_groups(problem_ids, vectors, 0.5) == [[10, 11, 14]]
+    # 按order先取11作为中心时，10、12、14都归入11的组
+    assert find_duplicate_groups(problem_ids, vectors, 0.5, order=[1, 0, 2, 3, 4]) == [[11, 10, 12, 14]]
+    assert find_duplicate_groups(problem_ids, vectors, 0.99) == [[10, 14]]
+    assert find_duplicate_groups(problem_ids[:0], vectors[:0], 0.5) == []
+
+
+def test_merge_problems_moves_everything_to_keeper(app):
+    duplicate_id = add_problem('登录页面一直转圈', 2)
+    keeper_id = add_problem('登录页面一直转圈，进不去', 3)
+    other_id = add_problem('会员价格太贵', 1, '价格异议')
+    db.session.add(ProblemStat(period='day', bucket_date=date(2024, 1, 2), problem_id=duplicate_id, feedback_count=2))
+    db.session.commit()
+
+    assert merge_problems([duplicate_id, keeper_id]) == keeper_id
+
+    db.session.expire_all()
+    assert db.session.get(Problem, duplicate_id) is None
+    assert db.session.get(Problem, keeper_id).feedback_count == 5
+    assert Feedback.query.filter_by(problem_id=keeper_id).count() == 5
+    assert FeedbackExample.query.filter_by(problem_id=keeper_id).count() == 5
+    assert FeedbackExample.query.filter_by(problem_id=duplicate_id).count() == 0
+    stats = {
+        row.bucket_date: row.feedback_count
+        for row in ProblemStat.query.filter_by(period='day', problem_id=keeper_id)
+    }
+    assert stats == {BUCKET: 5, date(2024, 1, 2): 2}
+    assert ProblemStat.query.filter_by(problem_id=duplicate_id).count() == 0
+    # 其他问题不受影响
+    assert db.session.get(Problem, other_id).feedback_count == 1
+    assert Feedback.query.filter_by(problem_id=other_id).count() == 1
+
+
+def test_merge_problems_folds_counter_shards(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'COUNTER_SHARDS', 4)
+    keeper_id = add_problem('登录页面一直转圈', 3)
+    duplicate_id = add_problem('登录页面一直转圈', 1)
+    # 分片中尚未合并到问题上的增量
+    problem_counters.increment({keeper_id: 2, duplicate_id: 4})
+    db.session.commit()
+
+    merge_problems([keeper_id, duplicate_id])
+
+    db.session.expire_all()
+    # 合并前先计入分片增量：重复问题的1+4次累加到保留问题的3+2次上
+    assert db.session.get(Problem, duplicate_id) is None
+    problem_counters.fold([keeper_id])
+    db.session.commit()
+    assert db.session.get(Problem, keeper_id).feedback_count == 10
+    assert ProblemCounterShard.query.filter_by(problem_id=duplicate_id).count() == 0
@@ -0,0 +1,66 @@
+from datetime import date
+from database import db, AnalysisResult
+from ingest import store_feedback
+from llm_interface import llm_interface, sanitize_summary_html
+from report_summary import report_summarizer
+from response_cache import response_cache
+
+ANALYSIS = {'type': '技术问题', 'summary': '登录页面一直转圈', 'severity': '高', 'sentiment': '负面'}
+UNSAFE_SUMMARY = '<p class="x" onclick="steal()">登录失败<img src=x onerror=alert(1)>增多，<strong>建议优先修复</p><script>alert(2)</script>'
+SAFE_SUMMARY = '<p>登录失败&lt;img src=x onerror=alert(1)&gt;增多，<strong>建议优先修复</strong></p>&lt;script&gt;alert(2)&lt;/script&gt;'
+
+
+def test_sanitize_keeps_only_bare_paragraph_and_strong_tags():
+    assert sanitize_summary_html(UNSAFE_SUMMARY) == SAFE_SUMMARY
+    assert sanitize_summary_html('<p>a<strong>b</strong></p><p>c</p>') == '<p>a<strong>b</strong></p><p>c</p>'
+    assert sanitize_summary_html('</strong></p>R&D <b>x</b>') == 'R&amp;D &lt;b&gt;x&lt;/b&gt;'
+
+
+def test_generated_summary_is_sanitized(app, monkeypatch):
+    reply = {'choices': [{'message': {'content': f'```html\n{UNSAFE_SUMMARY}\n```'}}]}
+    monkeypatch.setattr(llm_interface, 'call_llm', lambda *args, **kwargs: reply)
+    report = {
+        'typeDistribution': {'labels': ['技术问题'], 'values': [1]},
+        'severityDistribution': {'labels': ['高'], 'values': [1]},
+        'timeTrend': {'granularity': 'day', 'dates': ['2026-01-01'], 'counts': [1]},
+        'highFrequencyProblems': []
+    }
+
+    assert llm_interface.generate_report_summary(report, '2026-01-01', '2026-01-01') == SAFE_SUMMARY
+
+
+def add_summary(content, start_date=None, end_date=None):
+    db.session.add(AnalysisResult(analysis_type='summary', content=content, start_date=start_date, end_date=end_date))
+    db.session.commit()
+
+
+def test_report_sanitizes_previously_stored_summary(app, client):
+    add_summary(UNSAFE_SUMMARY, date(2026, 1, 1), date(2026, 1, 31))
+
+    response = client.get('/api/analysis/report?startDate=2026-01-01&endDate=2026-01-31')
+
+    assert response.status_code == 200
+    assert response.get_json()['summary'] == SAFE_SUMMARY
+    assert response.get_json()['summaryStatus'] == 'ready'
+
+
+def test_report_does_not_show_summary_of_other_range(app, client, monkeypatch):
+    # 其他范围的总结和旧版本写入的无范围示例总结都不返回
+    add_summary('<p>一月的总结</p>', date(2026, 1, 1), date(2026, 1, 31))
+    add_summary('<p>示例总结</p>')
+    store_feedback('登录页面一直转圈', ANALYSIS)
+    today = date.today().isoformat()
+
+    response = client.get(f'/api/analysis/report?startDate={today}&endDate={today}')
+    assert 'summary' not in response.get_json()
+    assert response.get_json()['summaryStatus'] == 'unavailable'
+    assert (date.today(), date.today()) in report_summarizer._pending_ranges
+
+    monkeypatch.setattr(report_summarizer, 'is_running', lambda: True)
+    response_cache.invalidate('summary')
+    response = client.get(f'/api/analysis/report?startDate={today}&endDate={today}')
+    assert response.get_json()['summaryStatus'] == 'generating'
+
+    response = client.get('/api/analysis/report?startDate=2025-06-01&endDate=2025-06-30')
+    assert 'summary' not in response.get_json()
+    assert response.get_json()['summaryStatus'] == 'empty'
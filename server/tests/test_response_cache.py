@@ -0,0 +1,93 @@
+from flask import Flask, jsonify
+from response_cache import ResponseCache
+
+
+def create_cached_app(cache, on_view, state_path=''):
+    app = Flask(__name__)
+    app.config['TEST_CACHE_SECONDS'] = 300
+    app.config['RESPONSE_CACHE_STATE_PATH'] = state_path
+    calls = []
+
+    @app.route('/stats')
+    @cache.cached('TEST_CACHE_SECONDS', tags=('feedback',))
+    def stats():
+        calls.append(len(calls))
+        on_view(len(calls))
+        return jsonify({'version': len(calls)})
+
+    return app, calls
+
+
+def test_result_computed_before_concurrent_invalidation_is_not_cached():
+    cache = ResponseCache()
+
+    def on_view(call):
+        # 第一次请求读取数据之后、保存结果之前，另一个请求写入反馈并使缓存失效
+        if call == 1:
+            cache.invalidate('feedback')
+
+    app, calls = create_cached_app(cache, on_view)
+    client = app.test_client()
+
+    assert client.get('/stats').get_json() == {'version': 1}
+    assert client.get('/stats').get_json() == {'version': 2}
+    assert client.get('/stats').get_json() == {'version': 2}
+    assert len(calls) == 2
+
+
+def test_invalidate_drops_cached_result():
+    cache = ResponseCache()
+    app, calls = create_cached_app(cache, lambda call: None)
+    client = app.test_client()
+
+    client.get('/stats')
+    client.get('/stats')
+    cache.invalidate('problems')
+    client.get('/stats')
+    assert len(calls) == 1
+
+    cache.invalidate('feedback')
+    assert client.get('/stats').get_json() == {'version': 2}
+
+
+def test_invalidation_in_other_worker_drops_cached_result(tmp_path):
+    # 两个ResponseCache模拟共享同一失效文件的两个工作进程
+    state_path = str(tmp_path / 'response_cache.sqlite3')
+    worker = ResponseCache()
+    other_worker = ResponseCache()
+    app, calls = create_cached_app(worker, lambda call: None, state_path)
+    other_app, _ = create_cached_app(other_worker, lambda call: None, state_path)
+    client = app.test_client()
+
+    client.get('/stats')
+    assert client.get('/stats').get_json() == {'version': 1}
+
+    # 另一个工作进程导入反馈后使feedback标签失效
+    with other_app.app_context():
+        other_worker.invalidate('feedback')
+    assert client.get('/stats').get_json() == {'version': 2}
+    assert client.get('/stats').get_json() == {'version': 2}
+
+    with other_app.app_context():
+        other_worker.invalidate('problems')
+    assert client.get('/stats').get_json() == {'version': 2}
+    assert len(calls) == 2
+
+
+def test_invalidation_in_other_worker_while_view_runs(tmp_path):
+    state_path = str(tmp_path / 'response_cache.sqlite3')
+    worker = ResponseCache()
+    other_worker = ResponseCache()
+    other_app, _ = create_cached_app(other_worker, lambda call: None, state_path)
+
+    def on_view(call):
+        if call == 1:
+            with other_app.app_context():
+                other_worker.invalidate('feedback')
+
+    app, calls = create_cached_app(worker, on_view, state_path)
+    client = app.test_client()
+
+    assert client.get('/stats').get_json() == {'version': 1}
+    assert client.get('/stats').get_json() == {'version': 2}
+    assert client.get('/stats').get_json() == {'version': 2}
@@ -0,0 +1,38 @@
+import os
+import re
+from sqlalchemy import inspect, text
+from database import db, create_schema
+
+SQL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'init_database.sql')
+
+
+def read_sql():
+    with open(SQL_PATH, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_models_declare_the_indexes_of_init_database_sql(app):
+    sql_indexes = set(re.findall(r'CREATE (?:FULLTEXT )?INDEX (\w+) ON (\w+)', read_sql()))
+    model_indexes = {(index.name, table.name) for table in db.metadata.sorted_tables for index in table.indexes}
+    assert model_indexes == sql_indexes
+
+
+def test_models_declare_the_foreign_key_actions_of_init_database_sql(app):
+    sql_foreign_keys = set()
+    for table, body in re.findall(r'CREATE TABLE IF NOT EXISTS (\w+) \((.*?)\) ENGINE', read_sql(), re.S):
+        for column, on_delete in re.findall(r'FOREIGN KEY \((\w+)\) REFERENCES \w+\(\w+\)(?: ON DELETE ([A-Z ]+))?', body):
+            sql_foreign_keys.add((table, column, on_delete.strip() or None))
+    model_foreign_keys = {
+        (table.name, fk.parent.name, fk.ondelete)
+        for table in db.metadata.sorted_tables for fk in table.foreign_keys
+    }
+    assert model_foreign_keys == sql_foreign_keys
+
+
+def test_create_schema_adds_missing_indexes_to_existing_tables(app):
+    db.session.execute(text('DROP INDEX idx_import_jobs_status'))
+    db.session.commit()
+
+    create_schema()
+
+    assert 'idx_import_jobs_status' in {index['name'] for index in inspect(db.engine).get_indexes('import_jobs')}
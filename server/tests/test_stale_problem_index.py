@@ -0,0 +1,46 @@
+from sqlalchemy import delete
+from database import db, Feedback, Problem
+from feedback_dedup import feedback_deduplicator
+from ingest import ingest_feedbacks, store_feedback
+from llm_interface import llm_interface
+from problem_index import problem_index
+
+ANALYSIS = {'type': '技术问题', 'summary': '登录页面一直转圈', 'severity': '高', 'sentiment': '负面'}
+OTHER_ANALYSIS = {'type': '价格异议', 'summary': '会员价格太贵', 'severity': '低', 'sentiment': '负面'}
+
+
+def delete_in_other_process(problem_id):
+    # 先写入一个无关的问题，被删除的问题不是id最大的行，SQLite不会把它的id分配给新问题
+    store_feedback('会员价格太贵了', OTHER_ANALYSIS)
+    # 其他工作进程合并删除问题：本进程的ORM删除事件不会触发，索引中仍保留该问题
+    db.session.execute(delete(Feedback).where(Feedback.problem_id == problem_id))
+    db.session.execute(delete(Problem).where(Problem.id == problem_id))
+    db.session.commit()
+
+
+def test_match_to_problem_deleted_elsewhere_creates_new_problem(app):
+    problem_id = store_feedback('登录页面一直转圈，进不去', ANALYSIS)
+    delete_in_other_process(problem_id)
+    assert problem_index.find_similar(ANALYSIS['summary'])[0] == problem_id
+
+    new_problem_id = store_feedback('登录页面一直转圈，刷新也没用', ANALYSIS)
+
+    assert new_problem_id != problem_id
+    assert db.session.get(Problem, new_problem_id) is not None
+    assert problem_index.find_similar(ANALYSIS['summary'])[0] == new_problem_id
+
+
+def test_duplicate_of_problem_deleted_elsewhere_is_analyzed(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'IMPORT_BATCH_MODE', False)
+    monkeypatch.setattr(llm_interface, 'analyze_feedback', lambda feedback_text, on_delta=None: dict(ANALYSIS))
+    text = '登录页面一直转圈，无法进入系统'
+    ingest_feedbacks([text], concurrency=1)
+    problem_id = Feedback.query.one().problem_id
+    delete_in_other_process(problem_id)
+
+    stats = ingest_feedbacks([text], concurrency=1)
+
+    assert (stats['success'], stats['duplicates']) == (1, 0)
+    feedback = Feedback.query.filter_by(content=text).one()
+    assert feedback.problem_id != problem_id and db.session.get(Problem, feedback.problem_id) is not None
+    assert feedback_deduplicator.find(*feedback_deduplicator.fingerprint(text)) == feedback.problem_id
@@ -0,0 +1,68 @@
+import json
+import pytest
+from database import Feedback
+from llm_interface import llm_interface
+
+
+@pytest.fixture
+def analyzed(monkeypatch):
+    calls = []
+
+    def analyze_feedback(feedback_text, on_delta=None):
+        calls.append(feedback_text)
+        return {'type': '技术问题', 'summary': feedback_text[:10], 'severity': '高', 'sentiment': '负面'}
+
+    monkeypatch.setattr(llm_interface, 'analyze_feedback', analyze_feedback)
+    return calls
+
+
+def stream_import(client, lines):
+    response = client.post('/api/feedback/import/stream', json={'content': '\n'.join(lines)})
+    assert response.status_code == 200
+    events = []
+    for block in response.get_data(as_text=True).strip().split('\n\n'):
+        name, data = block.split('\n', 1)
+        events.append((name[len('event: '):], json.loads(data[len('data: '):])))
+    return events
+
+
+def test_stream_import_skips_analysis_for_duplicates(app, client, analyzed):
+    lines = ['登录页面一直转圈，无法进入系统', '登录页面一直转圈！无法进入系统。', '导出报表时提示服务器错误']
+    events = stream_import(client, lines)
+
+    results = {data['index']: data for name, data in events if name == 'result'}
+    assert sorted(results) == [0, 1, 2]
+    assert all(result['success'] for result in results.values())
+    assert analyzed == [lines[0], lines[2]]
+    assert results[1]['duplicate'] and results[1]['problemId'] == results[0]['problemId']
+    assert results[1]['analysis']['type'] == '技术问题'
+    assert events[-1] == ('done', {'total': 3, 'success': 3, 'failed': 0, 'duplicates': 1})
+    assert Feedback.query.count() == 3
+
+
+def test_stream_import_reuses_problems_from_earlier_imports(app, client, analyzed):
+    first = stream_import(client, ['客服电话一直打不通，等了半个小时'])
+    problem_id = next(data['problemId'] for name, data in first if name == 'result')
+
+    events = stream_import(client, ['客服电话一直打不通，等了半个小时！'])
+
+    result = next(data for name, data in events if name == 'result')
+    assert result['duplicate'] and result['problemId'] == problem_id
+    assert len(analyzed) == 1
+
+
+def test_stream_import_reanalyzes_duplicates_of_failed_feedback(app, client, monkeypatch):
+    lines = ['支付成功后订单一直显示未付款', '支付成功后，订单一直显示未付款！']
+
+    def analyze_feedback(feedback_text, on_delta=None):
+        if feedback_text == lines[0]:
+            raise RuntimeError('大模型返回内容无法解析')
+        return {'type': '技术问题', 'summary': '订单状态未更新', 'severity': '高', 'sentiment': '负面'}
+
+    monkeypatch.setattr(llm_interface, 'analyze_feedback', analyze_feedback)
+    events = stream_import(client, lines)
+
+    results = {data['index']: data for name, data in events if name == 'result'}
+    assert not results[0]['success']
+    assert results[1]['success'] and not results[1]['duplicate']
+    assert events[-1] == ('done', {'total': 2, 'success': 1, 'failed': 1, 'duplicates': 0})
@@ -0,0 +1,10 @@
+"""
+生产环境的WSGI入口，使用gunicorn运行（配置见gunicorn.conf.py）:
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+后台线程不在这里启动，由gunicorn.conf.py的post_worker_init在每个工作进程中启动
+"""
+from app import create_app
+
+app = create_app()
+application = app